@@ -0,0 +1,39 @@
+"""Role scoping shared by the HTML views and the JSON API.
+
+Admins see everything, coaches see their own players and the goals they
+assigned, players see themselves, their goals and their coach.
+"""
+from .models import Coach, Goal, Player
+
+
+def visible_players(user):
+    if user.is_admin():
+        return Player.objects.all()
+    if user.is_coach():
+        try:
+            return user.coach_profile.players.all()
+        except Coach.DoesNotExist:
+            return Player.objects.none()
+    return Player.objects.filter(user=user)
+
+
+def visible_goals(user):
+    if user.is_admin():
+        return Goal.objects.all()
+    if user.is_coach():
+        try:
+            return user.coach_profile.assigned_goals.all()
+        except Coach.DoesNotExist:
+            return Goal.objects.none()
+    try:
+        return user.player_profile.goals.all()
+    except Player.DoesNotExist:
+        return Goal.objects.none()
+
+
+def visible_coaches(user):
+    if user.is_admin():
+        return Coach.objects.all()
+    if user.is_coach():
+        return Coach.objects.filter(user=user)
+    return Coach.objects.filter(players__user=user)
@@ -1,13 +1,106 @@
+from datetime import timedelta
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import User, Coach, Player, Goal, ProcessGoal
+from django.template.response import TemplateResponse
+from . import bulk, deletion, stats, sync
+from .admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from .deferral import defer_large_text
+from .models import (
+    User, Coach, Player, Goal, ProcessGoal, GoalComment, ProcessGoalComment, GoalTemplate, ProcessGoalTemplate,
+    Task, ArchivedGoal, ArchivedProcessGoal,
+)
+
+
+class ReassignCoachForm(forms.Form):
+    coach = forms.ModelChoiceField(queryset=Coach.objects.select_related('user'))
+    transfer_open_goals = forms.BooleanField(
+        required=False,
+        help_text='Also make the new coach responsible for the players\' unfinished goals.',
+    )
+    
+    def __init__(self, *args, admin_site, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['coach']
+        field.widget = AutocompleteSelect(Player._meta.get_field('coach'), admin_site)
+        field.widget.choices = field.choices
+        field.widget.is_required = True
+
+
+def count_subquery(queryset, fk_name):
+    """Correlated COUNT of ``queryset`` rows pointing at the outer row.
+
+    Unlike ``Count()`` with a JOIN and GROUP BY, the subquery is only evaluated
+    for the rows on the current changelist page.
+    """
+    counts = (
+        queryset.filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class FastDeleteMixin:
+    """Delete through ``core.deletion`` so large cascades never load every related row.
+    
+    The confirmation page lists per-model counts instead of each object.
+    """
+    
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, self.model._base_manager.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        stats.mark_stale_for_deletion(queryset)
+        sync.record_deletions(queryset)
+        deletion.fast_delete(queryset)
+    
+    def get_deleted_objects(self, objs, request):
+        if not deletion.can_fast_delete(self.model):
+            return super().get_deleted_objects(objs, request)
+        objs = list(objs)
+        counts = deletion.cascade_counts(self.model._base_manager.filter(pk__in=[obj.pk for obj in objs]))
+        summary = [
+            f"{count} {model._meta.verbose_name_plural}"
+            for model, count in counts.items()
+            if count and model is not self.model
+        ]
+        deleted_objects = [str(obj) for obj in objs] + ([summary] if summary else [])
+        model_count = {model._meta.verbose_name_plural: count for model, count in counts.items() if count}
+        perms_needed = {
+            model._meta.verbose_name
+            for model, count in counts.items()
+            if count and model in self.admin_site._registry
+            and not self.admin_site._registry[model].has_delete_permission(request)
+        }
+        return deleted_objects, model_count, perms_needed, []
+
+
+class DeferLargeTextChangeList(ChangeList):
+    def get_queryset(self, request, *args, **kwargs):
+        return defer_large_text(super().get_queryset(request, *args, **kwargs))
+
+
+class DeferLargeTextMixin:
+    """Leave long text columns out of the changelist query; the change form still reads them"""
+    
+    def get_changelist(self, request, **kwargs):
+        return DeferLargeTextChangeList
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(FastDeleteMixin, BaseUserAdmin):
     """Custom User Admin with role-based fields"""
     list_display = ('username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'date_joined')
     list_filter = ('role', 'is_active', 'is_staff', 'date_joined')
@@ -33,12 +126,13 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Coach)
-class CoachAdmin(admin.ModelAdmin):
+class CoachAdmin(FastDeleteMixin, DeferLargeTextMixin, admin.ModelAdmin):
     """Coach Admin with enhanced display"""
     list_display = ('user', 'specialization', 'experience_years', 'hire_date', 'players_count', 'user_email')
     list_filter = ('specialization', 'experience_years', 'hire_date')
     search_fields = ('user__first_name', 'user__last_name', 'user__email', 'specialization')
     ordering = ('user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
     
     fieldsets = (
         ('User Information', {
@@ -59,22 +153,29 @@ class CoachAdmin(admin.ModelAdmin):
     user_email.short_description = 'Email'
     
     def players_count(self, obj):
-        count = obj.get_players_count()
+        count = getattr(obj, '_players_count', None)
+        if count is None:
+            count = obj.get_players_count()
         return format_html('<span style="color: green; font-weight: bold;">{}</span>', count)
     players_count.short_description = 'Players Count'
+    players_count.admin_order_field = '_players_count'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user')
+        return super().get_queryset(request).select_related('user').annotate(
+            _players_count=count_subquery(Player.objects.all(), 'coach')
+        )
 
 
 @admin.register(Player)
-class PlayerAdmin(admin.ModelAdmin):
+class PlayerAdmin(FastDeleteMixin, DeferLargeTextMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     """Player Admin with enhanced display and coach assignment"""
     list_display = ('user', 'jersey_number', 'position', 'coach', 'is_active', 'join_date', 'age_display')
-    list_filter = ('position', 'is_active', 'join_date', 'coach')
+    list_filter = ('position', 'is_active', 'join_date', ('coach', AutocompleteFilter))
     search_fields = ('user__first_name', 'user__last_name', 'user__email', 'position', 'jersey_number')
     ordering = ('user__first_name', 'user__last_name')
-    list_editable = ('coach', 'is_active')
+    list_editable = ('is_active',)
+    autocomplete_fields = ('user', 'coach')
+    actions = ['reassign_coach', 'activate_players', 'deactivate_players']
     
     fieldsets = (
         ('User Information', {
@@ -104,19 +205,62 @@ class PlayerAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user', 'coach__user')
     
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Autocomplete widgets only query the selected coach; fetch its user with it
         if db_field.name == "coach":
-            kwargs["queryset"] = Coach.objects.select_related('user').order_by('user__first_name')
+            kwargs["queryset"] = Coach.objects.select_related('user')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    
+    @admin.action(description='Reassign selected players to a coach')
+    def reassign_coach(self, request, queryset):
+        form = ReassignCoachForm(
+            request.POST if 'apply' in request.POST else None,
+            admin_site=self.admin_site,
+        )
+        if form.is_valid():
+            coach = form.cleaned_data['coach']
+            moved, goals_moved = bulk.reassign_players(
+                queryset, coach, transfer_open_goals=form.cleaned_data['transfer_open_goals']
+            )
+            message = f'{moved} player(s) reassigned to {coach}.'
+            if form.cleaned_data['transfer_open_goals']:
+                message += f' {goals_moved} open goal(s) transferred.'
+            self.message_user(request, message)
+            return None
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Reassign players',
+            'opts': self.model._meta,
+            'form': form,
+            'media': self.media + form.media,
+            'queryset': queryset,
+            'count': queryset.count(),
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+            'selected_ids': queryset.values_list('pk', flat=True),
+        }
+        return TemplateResponse(request, 'admin/core/player/reassign_coach.html', context)
+    
+    @admin.action(description='Activate selected players')
+    def activate_players(self, request, queryset):
+        updated = bulk.set_players_active(queryset, True)
+        self.message_user(request, f'{updated} player(s) activated.')
+    
+    @admin.action(description='Deactivate selected players')
+    def deactivate_players(self, request, queryset):
+        updated = bulk.set_players_active(queryset, False)
+        self.message_user(request, f'{updated} player(s) deactivated.')
 
 
 @admin.register(Goal)
-class GoalAdmin(admin.ModelAdmin):
+class GoalAdmin(FastDeleteMixin, DeferLargeTextMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     """Goal Admin with enhanced display and filtering"""
     list_display = ('name', 'player', 'coach', 'area', 'timeframe', 'progress', 'target_date', 'is_overdue_display', 'get_process_goals_count')
-    list_filter = ('area', 'timeframe', 'progress', 'created_at', 'coach')
+    list_filter = ('area', 'timeframe', 'progress', 'created_at', ('coach', AutocompleteFilter), ('player', AutocompleteFilter))
     search_fields = ('name', 'player__user__first_name', 'player__user__last_name', 'coach__user__first_name')
     ordering = ('-created_at',)
     list_editable = ('progress',)
+    autocomplete_fields = ('player', 'coach')
+    actions = ['mark_completed', 'reset_process_goals']
     
     fieldsets = (
         ('Goal Information', {
@@ -126,7 +270,7 @@ class GoalAdmin(admin.ModelAdmin):
             'fields': ('player', 'coach')
         }),
         ('Progress Tracking', {
-            'fields': ('progress', 'notes')
+            'fields': ('progress',)
         }),
         ('Timeline', {
             'fields': ('created_at', 'updated_at')
@@ -142,28 +286,49 @@ class GoalAdmin(admin.ModelAdmin):
     is_overdue_display.short_description = 'Status'
     
     def get_process_goals_count(self, obj):
-        return obj.get_process_goals_count()
+        count = getattr(obj, '_process_goals_count', None)
+        if count is None:
+            count = obj.get_process_goals_count()
+        return count
     get_process_goals_count.short_description = 'Process Goals'
+    get_process_goals_count.admin_order_field = '_process_goals_count'
+    
+    @admin.action(description='Mark selected goals and their process goals completed')
+    def mark_completed(self, request, queryset):
+        goals, process_goals = bulk.complete_goals(queryset)
+        self.message_user(request, f'{goals} goal(s) and {process_goals} process goal(s) marked completed.')
+    
+    @admin.action(description='Reset selected goals and their process goals to not started')
+    def reset_process_goals(self, request, queryset):
+        goals, process_goals = bulk.reset_goal_process_goals(queryset)
+        self.message_user(request, f'{goals} goal(s) and {process_goals} process goal(s) reset.')
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('player__user', 'coach__user')
+        return super().get_queryset(request).select_related('player__user', 'coach__user').annotate(
+            _process_goals_count=count_subquery(ProcessGoal.objects.all(), 'main_goal')
+        )
     
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Goals can only be assigned to active players. The autocomplete
+        # search is shared with the player list filters, which must still
+        # find inactive players, so the form enforces it.
         if db_field.name == "player":
-            kwargs["queryset"] = Player.objects.select_related('user').filter(is_active=True).order_by('user__first_name')
+            kwargs["queryset"] = Player.objects.select_related('user').filter(is_active=True)
         elif db_field.name == "coach":
-            kwargs["queryset"] = Coach.objects.select_related('user').order_by('user__first_name')
+            kwargs["queryset"] = Coach.objects.select_related('user')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(ProcessGoal)
-class ProcessGoalAdmin(admin.ModelAdmin):
+class ProcessGoalAdmin(FastDeleteMixin, DeferLargeTextMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     """Process Goal Admin with enhanced display and filtering"""
     list_display = ('name', 'main_goal', 'progress', 'target_date', 'order', 'is_overdue_display')
-    list_filter = ('progress', 'created_at', 'main_goal__coach', 'main_goal__player')
+    list_filter = ('progress', 'created_at', ('main_goal__coach', AutocompleteFilter), ('main_goal__player', AutocompleteFilter))
     search_fields = ('name', 'main_goal__name', 'main_goal__player__user__first_name', 'main_goal__player__user__last_name')
     ordering = ('main_goal', 'order', 'created_at')
     list_editable = ('progress', 'order')
+    autocomplete_fields = ('main_goal',)
+    actions = ['mark_completed', 'reset_progress']
     
     fieldsets = (
         ('Process Goal Information', {
@@ -172,9 +337,6 @@ class ProcessGoalAdmin(admin.ModelAdmin):
         ('Goal Details', {
             'fields': ('progress', 'target_date', 'order')
         }),
-        ('Additional Information', {
-            'fields': ('notes',)
-        }),
         ('Timeline', {
             'fields': ('created_at', 'updated_at')
         }),
@@ -191,10 +353,129 @@ class ProcessGoalAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('main_goal__player__user', 'main_goal__coach__user')
     
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "main_goal":
-            kwargs["queryset"] = Goal.objects.select_related('player__user', 'coach__user').order_by('name')
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+    @admin.action(description='Mark selected process goals completed')
+    def mark_completed(self, request, queryset):
+        changed, goals = bulk.set_process_goals_progress(queryset, 'completed')
+        self.message_user(request, f'{changed} process goal(s) completed; {goals} goal(s) updated.')
+    
+    @admin.action(description='Reset selected process goals to not started')
+    def reset_progress(self, request, queryset):
+        changed, goals = bulk.set_process_goals_progress(queryset, 'not_started')
+        self.message_user(request, f'{changed} process goal(s) reset; {goals} goal(s) updated.')
+
+
+class CommentAdmin(DeferLargeTextMixin, admin.ModelAdmin):
+    """Notes can be read and removed here, but not written or edited"""
+    list_display = ('__str__', 'author', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('body', 'author__first_name', 'author__last_name')
+    ordering = ('-id',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(GoalComment)
+class GoalCommentAdmin(CommentAdmin):
+    list_display = CommentAdmin.list_display + ('goal',)
+    list_select_related = ('author', 'goal__player__user')
+
+
+@admin.register(ProcessGoalComment)
+class ProcessGoalCommentAdmin(CommentAdmin):
+    list_display = CommentAdmin.list_display + ('process_goal',)
+    list_select_related = ('author', 'process_goal__main_goal')
+
+
+class ProcessGoalTemplateInline(admin.TabularInline):
+    model = ProcessGoalTemplate
+    fields = ('order', 'name', 'description')
+    extra = 1
+
+
+@admin.register(GoalTemplate)
+class GoalTemplateAdmin(admin.ModelAdmin):
+    """Goal templates with their process goal steps edited inline"""
+    list_display = ('name', 'coach', 'area', 'timeframe', 'updated_at')
+    list_filter = ('area', 'timeframe')
+    search_fields = ('name', 'coach__user__first_name', 'coach__user__last_name')
+    autocomplete_fields = ('coach',)
+    inlines = [ProcessGoalTemplateInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('coach__user')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Background task queue with depth and latency overview"""
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'locked_by')
+    ordering = ('-run_at',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'last_error')
+    change_list_template = 'admin/core/task/change_list.html'
+    actions = ['requeue_tasks']
+    
+    def changelist_view(self, request, extra_context=None):
+        now = timezone.now()
+        depth = dict(Task.objects.values_list('status').annotate(total=Count('id')).order_by())
+        recent = Task.objects.filter(started_at__gte=now - timedelta(hours=1))
+        latency = recent.aggregate(
+            wait=Avg(ExpressionWrapper(F('started_at') - F('run_at'), output_field=DurationField())),
+            runtime=Avg(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())),
+        )
+        oldest_due = Task.objects.filter(status=Task.Status.QUEUED, run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+        extra_context = extra_context or {}
+        extra_context['queue_stats'] = {
+            'queued': depth.get(Task.Status.QUEUED, 0),
+            'running': depth.get(Task.Status.RUNNING, 0),
+            'done': depth.get(Task.Status.DONE, 0),
+            'failed': depth.get(Task.Status.FAILED, 0),
+            'oldest_due_age': now - oldest_due if oldest_due else None,
+            'avg_wait': latency['wait'],
+            'avg_runtime': latency['runtime'],
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    @admin.action(description='Requeue selected tasks now')
+    def requeue_tasks(self, request, queryset):
+        updated = queryset.exclude(status=Task.Status.RUNNING).update(
+            status=Task.Status.QUEUED, run_at=timezone.now(), attempts=0, locked_by=''
+        )
+        self.message_user(request, f'{updated} task(s) requeued.')
+
+
+class ArchivedProcessGoalInline(admin.TabularInline):
+    model = ArchivedProcessGoal
+    fields = ('order', 'name', 'progress', 'target_date', 'updated_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedGoal)
+class ArchivedGoalAdmin(FastDeleteMixin, admin.ModelAdmin):
+    """Read-only view of goals moved out by ``archive_goals``"""
+    list_display = ('name', 'player', 'coach', 'area', 'timeframe', 'updated_at', 'archived_at')
+    list_filter = ('area', 'timeframe', 'archived_at')
+    search_fields = ('name', 'player__user__first_name', 'player__user__last_name')
+    inlines = [ArchivedProcessGoalInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('player__user', 'coach__user')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # Customize admin site
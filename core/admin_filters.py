@@ -0,0 +1,67 @@
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Foreign key list filter backed by the admin autocomplete view.
+
+    ``RelatedFieldListFilter`` lists every related row in the sidebar; this
+    filter only loads the selected object and searches the rest on demand.
+    The related model admin needs ``search_fields``.
+    """
+    template = 'admin/core/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.rendered_widget = form_field.widget.render(
+            name=self.lookup_kwarg,
+            value=self.lookup_val,
+            attrs={
+                'id': f"filter_{self.lookup_kwarg}",
+                'class': 'admin-autocomplete-filter',
+                'style': 'width: 100%;',
+                'data-lookup': self.lookup_kwarg,
+            },
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'All',
+        }
+
+
+class AutocompleteFilterMixin:
+    """Add the select2 assets that ``AutocompleteFilter`` needs to the changelist"""
+
+    @property
+    def media(self):
+        extra = '' if settings.DEBUG else '.min'
+        return super().media + forms.Media(
+            js=(
+                f"admin/js/vendor/jquery/jquery{extra}.js",
+                f"admin/js/vendor/select2/select2.full{extra}.js",
+                "admin/js/jquery.init.js",
+                "admin/js/autocomplete.js",
+                "js/admin_autocomplete_filter.js",
+            ),
+            css={
+                'screen': (
+                    f"admin/css/vendor/select2/select2{extra}.css",
+                    "admin/css/autocomplete.css",
+                ),
+            },
+        )
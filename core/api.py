@@ -0,0 +1,310 @@
+"""Versioned read-only JSON API (``/api/v1/``).
+
+Rows are read with ``values()`` restricted to the requested ``fields=``, so
+only those columns are selected (as with ``.only()``) and no model instances
+are built. Lists use a keyset cursor on ``id`` instead of offsets, and every
+response carries an ETag so a client polling an unchanged page gets a 304.
+Note threads are read newest first, a page at a time, with the same cursor.
+``sync/`` returns what changed since the client's last sync (core/sync.py).
+"""
+import base64
+import binascii
+from functools import wraps
+
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, set_response_etag
+from django.views.decorators.http import require_safe
+
+from .access import visible_coaches, visible_goals, visible_players
+from .forms import player_label
+from .models import PROGRESS_PERCENTAGES, GoalComment, ProcessGoal, ProcessGoalComment
+from .sync import CursorError, changes, tombstones
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 1000
+
+# API field name -> ORM lookup
+PLAYER_FIELDS = {
+    'id': 'id',
+    'first_name': 'user__first_name',
+    'last_name': 'user__last_name',
+    'email': 'user__email',
+    'position': 'position',
+    'jersey_number': 'jersey_number',
+    'height': 'height',
+    'weight': 'weight',
+    'join_date': 'join_date',
+    'is_active': 'is_active',
+    'coach_id': 'coach_id',
+    'updated_at': 'updated_at',
+}
+COACH_FIELDS = {
+    'id': 'id',
+    'first_name': 'user__first_name',
+    'last_name': 'user__last_name',
+    'email': 'user__email',
+    'specialization': 'specialization',
+    'experience_years': 'experience_years',
+    'bio': 'bio',
+    'hire_date': 'hire_date',
+}
+GOAL_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'player_id': 'player_id',
+    'coach_id': 'coach_id',
+    'area': 'area',
+    'timeframe': 'timeframe',
+    'progress': 'progress',
+    'description': 'description',
+    'target_date': 'target_date',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    # Nested list, loaded with one extra query per page
+    'process_goals': None,
+}
+PLAYER_SEARCH_FIELDS = ('id', 'first_name', 'last_name', 'position', 'jersey_number')
+PROCESS_GOAL_FIELDS = ('id', 'name', 'progress', 'description', 'target_date', 'order', 'updated_at')
+COMMENT_FIELDS = {
+    'id': 'id',
+    'body': 'body',
+    'created_at': 'created_at',
+    'author_id': 'author_id',
+    'author_first_name': 'author__first_name',
+    'author_last_name': 'author__last_name',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(view):
+    """GET/HEAD only, JSON errors instead of login redirects, ETag validation"""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        try:
+            data = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+        response = JsonResponse(data)
+        # Responses depend on the user's role; let browsers revalidate rather than share
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        set_response_etag(response)
+        return get_conditional_response(request, etag=response.headers['ETag'], response=response)
+    return wrapper
+
+
+def _requested_fields(request, available):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}")
+    # The cursor needs the id of every row
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def _values(queryset, names, available):
+    """``values()`` for the requested columns, renaming related lookups to their API names"""
+    lookups = {name: available[name] for name in names if available[name] is not None}
+    return queryset.values(
+        *[name for name, lookup in lookups.items() if name == lookup],
+        **{name: F(lookup) for name, lookup in lookups.items() if name != lookup},
+    )
+
+
+def _with_percentages(rows):
+    for row in rows:
+        if 'progress' in row:
+            row['progress_percentage'] = PROGRESS_PERCENTAGES.get(row['progress'], 0)
+    return rows
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ApiError('Invalid cursor')
+
+
+def _limit(request, default, maximum):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return max(1, min(limit, maximum))
+
+
+def _paginate(request, queryset, descending=False):
+    """One page of ``queryset`` after the ``cursor`` row; returns ``(rows, next_url)``"""
+    limit = _limit(request, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    queryset = queryset.order_by('-id' if descending else 'id')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        if descending:
+            queryset = queryset.filter(id__lt=decode_cursor(cursor))
+        else:
+            queryset = queryset.filter(id__gt=decode_cursor(cursor))
+    # One extra row tells whether there is a next page without a COUNT
+    rows = list(queryset[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(rows[-1]['id'])
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return rows, next_url
+
+
+def _detail(queryset, pk):
+    row = queryset.filter(pk=pk).first()
+    if row is None:
+        raise ApiError('Not found', status=404)
+    return row
+
+
+def _attach_process_goals(goals):
+    """Nest the process goals of every goal row, in one query"""
+    by_goal = {goal['id']: goal for goal in goals}
+    for goal in goals:
+        goal['process_goals'] = []
+    process_goals = (
+        ProcessGoal.objects.filter(main_goal_id__in=by_goal)
+        .order_by('main_goal_id', 'order', 'created_at')
+        .values('main_goal_id', *PROCESS_GOAL_FIELDS)
+    )
+    for process_goal in _with_percentages(list(process_goals)):
+        by_goal[process_goal.pop('main_goal_id')]['process_goals'].append(process_goal)
+    return goals
+
+
+def comment_row(row):
+    """A note as the API returns it, from its ``COMMENT_FIELDS`` values"""
+    first_name, last_name = row.pop('author_first_name'), row.pop('author_last_name')
+    row['author'] = f"{first_name or ''} {last_name or ''}".strip() or None
+    return row
+
+
+def _comment_page(request, comments):
+    rows, next_url = _paginate(request, _values(comments, COMMENT_FIELDS, COMMENT_FIELDS), descending=True)
+    return {'results': [comment_row(row) for row in rows], 'next': next_url}
+
+
+@api_view
+def player_list(request):
+    fields = _requested_fields(request, PLAYER_FIELDS)
+    rows, next_url = _paginate(request, _values(visible_players(request.user), fields, PLAYER_FIELDS))
+    return {'results': rows, 'next': next_url}
+
+
+@api_view
+def player_search(request):
+    """Active players matching every word of ``q`` by name prefix or jersey number"""
+    queryset = visible_players(request.user).filter(is_active=True)
+    for term in request.GET.get('q', '').split():
+        match = Q(user__first_name__istartswith=term) | Q(user__last_name__istartswith=term)
+        if term.lstrip('#').isdigit():
+            match |= Q(jersey_number=int(term.lstrip('#')))
+        queryset = queryset.filter(match)
+    rows, next_url = _paginate(request, _values(queryset, PLAYER_SEARCH_FIELDS, PLAYER_FIELDS))
+    for row in rows:
+        row['label'] = player_label(f"{row['first_name']} {row['last_name']}".strip(), row['jersey_number'])
+    return {'results': rows, 'next': next_url}
+
+
+@api_view
+def player_detail(request, pk):
+    fields = _requested_fields(request, PLAYER_FIELDS)
+    return _detail(_values(visible_players(request.user), fields, PLAYER_FIELDS), pk)
+
+
+@api_view
+def coach_list(request):
+    fields = _requested_fields(request, COACH_FIELDS)
+    rows, next_url = _paginate(request, _values(visible_coaches(request.user), fields, COACH_FIELDS))
+    return {'results': rows, 'next': next_url}
+
+
+@api_view
+def coach_detail(request, pk):
+    fields = _requested_fields(request, COACH_FIELDS)
+    return _detail(_values(visible_coaches(request.user), fields, COACH_FIELDS), pk)
+
+
+@api_view
+def goal_list(request):
+    fields = _requested_fields(request, GOAL_FIELDS)
+    queryset = visible_goals(request.user)
+    player = request.GET.get('player')
+    if player:
+        if not player.isdigit():
+            raise ApiError('player must be an id')
+        queryset = queryset.filter(player_id=player)
+    rows, next_url = _paginate(request, _values(queryset, fields, GOAL_FIELDS))
+    _with_percentages(rows)
+    if 'process_goals' in fields:
+        _attach_process_goals(rows)
+    return {'results': rows, 'next': next_url}
+
+
+@api_view
+def goal_detail(request, pk):
+    fields = _requested_fields(request, GOAL_FIELDS)
+    row = _detail(_values(visible_goals(request.user), fields, GOAL_FIELDS), pk)
+    _with_percentages([row])
+    if 'process_goals' in fields:
+        _attach_process_goals([row])
+    return row
+
+
+@api_view
+def goal_comments(request, pk):
+    """The goal's notes, newest first"""
+    _detail(visible_goals(request.user).values('id'), pk)
+    return _comment_page(request, GoalComment.objects.filter(goal_id=pk))
+
+
+@api_view
+def process_goal_comments(request, pk):
+    """The process goal's notes, newest first"""
+    _detail(ProcessGoal.objects.filter(main_goal__in=visible_goals(request.user)).values('id'), pk)
+    return _comment_page(request, ProcessGoalComment.objects.filter(process_goal_id=pk))
+
+
+@api_view
+def sync_changes(request):
+    """Rows created, changed or removed from view since ``cursor``, at most ``limit`` per response"""
+    user = request.user
+    goals = visible_goals(user)
+    parts = [
+        ('deleted', tombstones(user)),
+        ('players', _values(visible_players(user), PLAYER_FIELDS, PLAYER_FIELDS).annotate(changed_at=F('updated_at'))),
+        ('goals', _values(goals, [name for name in GOAL_FIELDS if name != 'process_goals'], GOAL_FIELDS)
+         .annotate(changed_at=F('updated_at'))),
+        ('process_goals', ProcessGoal.objects.filter(main_goal__in=goals)
+         .values('main_goal_id', *PROCESS_GOAL_FIELDS).annotate(changed_at=F('updated_at'))),
+    ]
+    try:
+        body = changes(parts, request.GET.get('cursor'), _limit(request, DEFAULT_SYNC_PAGE_SIZE, MAX_SYNC_PAGE_SIZE))
+    except CursorError as error:
+        raise ApiError(str(error), status=error.status)
+    _with_percentages(body['goals'])
+    _with_percentages(body['process_goals'])
+    return body
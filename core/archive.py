@@ -0,0 +1,79 @@
+"""Move completed goals from past seasons into the archive tables.
+
+Rows are copied with ``values()`` + ``bulk_create`` and removed with
+:func:`core.deletion.fast_delete`, one batch per transaction, so the live
+``Goal``/``ProcessGoal`` tables only hold the current working set. Note
+threads are flattened into the archived rows' ``notes`` text.
+"""
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import make_aware
+
+from .deletion import fast_delete
+from .models import ArchivedGoal, ArchivedProcessGoal, Goal, GoalComment, ProcessGoal, ProcessGoalComment
+from .stats import mark_stale_for_deletion
+from .sync import record_deletions
+
+GOAL_FIELDS = (
+    'id', 'name', 'player_id', 'coach_id', 'area', 'timeframe', 'progress',
+    'description', 'target_date', 'created_at', 'updated_at',
+)
+PROCESS_GOAL_FIELDS = (
+    'id', 'name', 'main_goal_id', 'progress', 'description', 'target_date',
+    'created_at', 'updated_at', 'order',
+)
+
+
+def season_start(day, seasons_back=0):
+    """First day of the season containing ``day``, ``seasons_back`` seasons earlier"""
+    year = day.year if day.month >= settings.SEASON_START_MONTH else day.year - 1
+    return date(year - seasons_back, settings.SEASON_START_MONTH, 1)
+
+
+def flatten_comments(comments, fk_name):
+    """``{target_id: text}`` of every thread in ``comments``, oldest note first"""
+    threads = {}
+    rows = comments.order_by(fk_name, 'id').values_list(
+        fk_name, 'created_at', 'author__first_name', 'author__last_name', 'body',
+    )
+    for target_id, created_at, first_name, last_name, body in rows:
+        author = f"{first_name or ''} {last_name or ''}".strip() or 'Unknown'
+        threads.setdefault(target_id, []).append(f"{created_at:%Y-%m-%d %H:%M} {author}: {body}")
+    return {target_id: '\n\n'.join(notes) for target_id, notes in threads.items()}
+
+
+def archivable_goals(cutoff):
+    """Completed goals last updated before ``cutoff``"""
+    # A range on the column itself, unlike ``__date``, can use an index
+    return Goal.objects.filter(progress='completed', updated_at__lt=make_aware(datetime.combine(cutoff, time.min)))
+
+
+def archive_goals(goals, batch_size=1000):
+    """Archive ``goals`` with their process goals; returns ``(goals, process_goals)``"""
+    archived_goals = archived_process_goals = 0
+    goals = goals.order_by('pk')
+    while True:
+        with transaction.atomic():
+            ids = list(goals.select_for_update().values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            notes = flatten_comments(GoalComment.objects.filter(goal_id__in=ids), 'goal_id')
+            ArchivedGoal.objects.bulk_create([
+                ArchivedGoal(**row, notes=notes.get(row['id'], ''))
+                for row in Goal.objects.filter(pk__in=ids).values(*GOAL_FIELDS)
+            ])
+            step_notes = flatten_comments(
+                ProcessGoalComment.objects.filter(process_goal__main_goal_id__in=ids), 'process_goal_id',
+            )
+            process_goals = ArchivedProcessGoal.objects.bulk_create([
+                ArchivedProcessGoal(**row, notes=step_notes.get(row['id'], ''))
+                for row in ProcessGoal.objects.filter(main_goal_id__in=ids).values(*PROCESS_GOAL_FIELDS)
+            ], batch_size=500)
+            mark_stale_for_deletion(Goal.objects.filter(pk__in=ids))
+            record_deletions(Goal.objects.filter(pk__in=ids))
+            fast_delete(Goal.objects.filter(pk__in=ids))
+        archived_goals += len(ids)
+        archived_process_goals += len(process_goals)
+    return archived_goals, archived_process_goals
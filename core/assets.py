@@ -0,0 +1,80 @@
+"""Static asset bundles.
+
+Page scripts and styles live in ``static/js`` and ``static/css``. The
+``build_assets`` command concatenates and minifies each bundle below into
+``static/dist/``; ``collectstatic`` then fingerprints the result and writes
+gzip and Brotli copies next to it, which WhiteNoise serves with a far-future
+``immutable`` Cache-Control. Templates include a bundle with
+``{% asset_bundle 'app.js' %}``.
+"""
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+BUNDLE_DIR = 'dist'
+
+# Bundle name -> source files, in load order. Page styles are scoped by the
+# class each template puts on <body>, so one stylesheet serves every page.
+BUNDLES = {
+    'app.css': [
+        'css/style.css',
+        'css/pages/admin-dashboard.css',
+        'css/pages/coach-dashboard.css',
+        'css/pages/directory.css',
+        'css/pages/goal-detail.css',
+        'css/pages/goal-form.css',
+        'css/pages/goal-template-assign.css',
+        'css/pages/login.css',
+        'css/pages/player-dashboard.css',
+        'css/pages/player-detail.css',
+        'css/pages/process-goal-form.css',
+    ],
+    'app.js': [
+        'js/main.js',
+        'js/progress_updates.js',
+        'js/progress_stream.js',
+        'js/goal_template_assign.js',
+        'js/goal_workspace.js',
+        'js/player_picker.js',
+        'js/process_goal_reorder.js',
+        'js/comment_thread.js',
+    ],
+}
+
+
+class AssetError(Exception):
+    pass
+
+
+def minify(name, source):
+    # Only needed at build time, so the web process does not import them
+    if name.endswith('.css'):
+        from rcssmin import cssmin
+        return cssmin(source)
+    from rjsmin import jsmin
+    return jsmin(source)
+
+
+def build_bundle(name):
+    """Concatenated, minified contents of bundle ``name``"""
+    sources = []
+    for path in BUNDLES[name]:
+        found = finders.find(path)
+        if found is None:
+            raise AssetError(f'{name}: {path} is not in any static directory')
+        with open(found, encoding='utf-8') as file:
+            sources.append(file.read())
+    # Keep a script missing its last semicolon from running into the next one
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return minify(name, separator.join(sources))
+
+
+def bundle_urls(name):
+    """URLs to include for bundle ``name``: the built file, or its sources with ASSETS_DEBUG"""
+    if not settings.ASSETS_DEBUG:
+        try:
+            return [static(f'{BUNDLE_DIR}/{name}')]
+        except ValueError:
+            # Not in the manifest: build_assets did not run before collectstatic
+            pass
+    return [static(path) for path in BUNDLES[name]]
@@ -0,0 +1,54 @@
+"""Helpers for the async views.
+
+Django's async ORM methods (``acount()``, ``aget()``...) all run on one
+shared thread, so awaiting several of them still executes the queries one
+after another. Under ASGI :func:`run_concurrently` runs independent queries on
+their own threads, and therefore their own database connections, at the same
+time. A WSGI worker already gives each request its own thread, so there the
+queries run in order on the request's connection instead.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+
+def _run(query):
+    try:
+        return query()
+    finally:
+        # Pool threads never see request_finished; honour CONN_MAX_AGE here
+        close_old_connections()
+
+
+async def run_concurrently(request, **queries):
+    """Evaluate ``name=callable`` ORM queries, in parallel under ASGI, and return ``{name: result}``"""
+    if not isinstance(request, ASGIRequest):
+        return await sync_to_async(lambda: {name: query() for name, query in queries.items()})()
+    results = await asyncio.gather(*(
+        sync_to_async(_run, thread_sensitive=False)(query) for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+async def get_user(request):
+    """Load ``request.user`` without blocking the event loop (``request.auser()`` is Django 5.0+)"""
+    def load():
+        # Touching any attribute resolves the lazy object (session and user queries)
+        request.user.is_authenticated
+        return request.user
+    return await sync_to_async(load)()
+
+
+def async_login_required(view):
+    """``login_required`` for async views; Django 4.2's decorator only wraps sync ones"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await get_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,133 @@
+"""Set-based bulk operations used by the admin actions.
+
+Each operation runs a few ``UPDATE`` statements in one transaction instead
+of loading and saving rows one by one. ``update()`` skips ``auto_now``, so
+``updated_at`` is set explicitly, and since no ``post_save`` fires the
+progress changes are published to the coaches' live streams, the
+affected players' stats marked stale, and the sync tombstones of rows moved
+to another coach recorded, here.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .events import publish_progress
+from .logs import log_event
+from .metrics import GOAL_AUTO_COMPLETIONS
+from .models import Goal, Player, ProcessGoal
+from .stats import mark_stale
+from .sync import record_goal_moves, record_player_moves
+
+
+def reassign_players(players, coach, transfer_open_goals=False):
+    """Move ``players`` to ``coach``; returns ``(players_moved, goals_moved)``"""
+    now = timezone.now()
+    with transaction.atomic():
+        player_ids = list(players.values_list('pk', flat=True))
+        moving = Player.objects.filter(pk__in=player_ids).exclude(coach=coach)
+        record_player_moves(moving)
+        moved = moving.update(coach=coach, updated_at=now)
+        mark_stale(player_ids=player_ids)
+        goals_moved = 0
+        if transfer_open_goals:
+            goals = (
+                Goal.objects.filter(player_id__in=player_ids)
+                .exclude(progress='completed')
+                .exclude(coach=coach)
+            )
+            record_goal_moves(goals, coach=True)
+            goals_moved = goals.update(coach=coach, updated_at=now)
+    return moved, goals_moved
+
+
+def set_players_active(players, active):
+    return players.exclude(is_active=active).update(is_active=active, updated_at=timezone.now())
+
+
+def complete_goals(goals):
+    """Mark goals and all of their process goals completed; returns ``(goals, process_goals)``"""
+    now = timezone.now()
+    with transaction.atomic():
+        goal_ids = list(goals.values_list('pk', flat=True))
+        process_goal_ids = list(
+            ProcessGoal.objects.filter(main_goal_id__in=goal_ids)
+            .exclude(progress='completed')
+            .values_list('pk', flat=True)
+        )
+        process_goals = ProcessGoal.objects.filter(pk__in=process_goal_ids).update(progress='completed', updated_at=now)
+        completed = (
+            Goal.objects.filter(pk__in=goal_ids)
+            .exclude(progress='completed')
+            .update(progress='completed', updated_at=now)
+        )
+        publish_progress(goal_ids, process_goal_ids)
+        mark_stale(goal_ids=goal_ids)
+    return completed, process_goals
+
+
+def reset_goal_process_goals(goals):
+    """Reset the process goals of ``goals`` and the goals themselves to not started"""
+    now = timezone.now()
+    with transaction.atomic():
+        goal_ids = list(goals.values_list('pk', flat=True))
+        process_goal_ids = list(
+            ProcessGoal.objects.filter(main_goal_id__in=goal_ids)
+            .exclude(progress='not_started')
+            .values_list('pk', flat=True)
+        )
+        process_goals = ProcessGoal.objects.filter(pk__in=process_goal_ids).update(progress='not_started', updated_at=now)
+        reset = (
+            Goal.objects.filter(pk__in=goal_ids)
+            .exclude(progress='not_started')
+            .update(progress='not_started', updated_at=now)
+        )
+        publish_progress(goal_ids, process_goal_ids)
+        mark_stale(goal_ids=goal_ids)
+    return reset, process_goals
+
+
+def set_process_goals_progress(process_goals, progress):
+    """Set ``progress`` on process goals and roll the result up to their goals.
+
+    Returns ``(process_goals_changed, goals_changed)``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(process_goals.values_list('pk', 'main_goal_id'))
+        changed = (
+            ProcessGoal.objects.filter(pk__in=[pk for pk, _ in rows])
+            .exclude(progress=progress)
+            .update(progress=progress, updated_at=now)
+        )
+        goals_changed = sync_goal_completion({goal_id for _, goal_id in rows}, now=now)
+        # The goal events sent for these process goals carry the new rollup
+        publish_progress(process_goal_ids=[pk for pk, _ in rows])
+        mark_stale(goal_ids={goal_id for _, goal_id in rows})
+    return changed, goals_changed
+
+
+def sync_goal_completion(goal_ids, now=None):
+    """Recompute the process-goal rollup for ``goal_ids`` in two statements.
+
+    Goals whose process goals are all completed become completed; completed
+    goals that now have an unfinished process goal go back to in progress.
+    """
+    now = now or timezone.now()
+    has_steps = Exists(ProcessGoal.objects.filter(main_goal=OuterRef('pk')))
+    has_open_steps = Exists(
+        ProcessGoal.objects.filter(main_goal=OuterRef('pk')).exclude(progress='completed')
+    )
+    goals = Goal.objects.filter(pk__in=goal_ids)
+    completed = (
+        goals.filter(has_steps, ~has_open_steps)
+        .exclude(progress='completed')
+        .update(progress='completed', updated_at=now)
+    )
+    reopened = (
+        goals.filter(has_open_steps, progress='completed')
+        .update(progress='in_progress', updated_at=now)
+    )
+    if completed:
+        GOAL_AUTO_COMPLETIONS.labels('bulk').inc(completed)
+        log_event('goal_auto_completed', source='bulk', count=completed)
+    return completed + reopened
@@ -0,0 +1,41 @@
+"""Keep unbounded text columns out of list queries.
+
+A goal list only shows the first words of each description, and nothing
+that lists coaches shows their biography, yet a plain queryset reads every
+row's full text (again for each ``select_related`` coach). ``defer_large_text``
+defers those columns on the model and on every model it ``select_related``s;
+``excerpt=True`` instead annotates ``description_excerpt``, a prefix long
+enough for the templates' ``truncatewords``.
+"""
+from django.db.models.functions import Substr
+
+# Model label -> columns that can hold arbitrarily long text
+LARGE_TEXT_FIELDS = {
+    'core.Coach': ('bio',),
+    'core.Goal': ('description',),
+    'core.GoalComment': ('body',),
+    'core.ProcessGoal': ('description',),
+    'core.ProcessGoalComment': ('body',),
+}
+EXCERPT_LENGTH = 300
+
+
+def _deferred_paths(model, select_related, prefix=''):
+    for name in LARGE_TEXT_FIELDS.get(model._meta.label, ()):
+        yield prefix + name
+    for name, nested in select_related.items():
+        related_model = model._meta.get_field(name).related_model
+        yield from _deferred_paths(related_model, nested, f'{prefix}{name}__')
+
+
+def defer_large_text(queryset, excerpt=False):
+    """``queryset`` without the large text columns of its model and its ``select_related`` models.
+
+    Call it after ``select_related()``; with ``select_related()`` and no
+    arguments only the model's own columns are deferred.
+    """
+    select_related = queryset.query.select_related
+    paths = list(_deferred_paths(queryset.model, select_related if isinstance(select_related, dict) else {}))
+    if excerpt:
+        queryset = queryset.annotate(description_excerpt=Substr('description', 1, EXCERPT_LENGTH))
+    return queryset.defer(*paths) if paths else queryset
@@ -0,0 +1,99 @@
+"""Set-based deletion of coaches, players and goals.
+
+``QuerySet.delete()`` loads every object in the cascade into memory so it
+can send ``pre_delete``/``post_delete`` signals for each one. When no
+receivers are connected for any model in the cascade that work is wasted:
+:func:`fast_delete` walks the relations instead and issues one ``UPDATE``
+or ``DELETE ... WHERE fk IN (subquery)`` per relation, children first.
+
+Receivers registered with :func:`set_based` do not count: whoever calls
+``fast_delete`` does their work for the whole cascade instead (as the admin
+and core/archive.py do for the sync tombstones).
+"""
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import signals
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+SET_BASED_ON_DELETE = (models.CASCADE, models.SET_NULL, models.DO_NOTHING)
+
+_set_based_receivers = set()
+
+
+def set_based(receiver):
+    """Let ``fast_delete`` skip a delete signal receiver whose work its callers do set-based"""
+    _set_based_receivers.add(receiver)
+    return receiver
+
+
+def _has_receivers(model):
+    return any(
+        receiver not in _set_based_receivers
+        for signal in (signals.pre_delete, signals.post_delete, signals.m2m_changed)
+        for receiver in signal._live_receivers(model)
+    )
+
+
+def can_fast_delete(model, _path=()):
+    """True when ``model`` and everything it cascades to can be deleted in SQL"""
+    # Self-referencing cascades need the collector's ordering
+    if model in _path or _has_receivers(model) or model._meta.private_fields:
+        return False
+    for relation in get_candidate_relations_to_delete(model._meta):
+        on_delete = relation.field.remote_field.on_delete
+        if on_delete not in SET_BASED_ON_DELETE:
+            return False
+        if on_delete is models.CASCADE and not can_fast_delete(relation.related_model, _path + (model,)):
+            return False
+    return True
+
+
+def _related(relation, queryset):
+    return relation.related_model._base_manager.filter(
+        **{f"{relation.field.name}__in": queryset.values('pk')}
+    )
+
+
+def _delete(queryset, counts):
+    for relation in get_candidate_relations_to_delete(queryset.model._meta):
+        on_delete = relation.field.remote_field.on_delete
+        if on_delete is models.CASCADE:
+            _delete(_related(relation, queryset), counts)
+        elif on_delete is models.SET_NULL:
+            _related(relation, queryset).update(**{relation.field.name: None})
+    deleted = queryset._raw_delete(queryset.db)
+    if deleted:
+        counts[queryset.model._meta.label] += deleted
+
+
+def fast_delete(queryset):
+    """Delete ``queryset`` and its cascade; returns the same result as ``delete()``.
+
+    Falls back to ``QuerySet.delete()`` when a model in the cascade has delete
+    signal receivers or an ``on_delete`` that needs per-object handling.
+    """
+    if not can_fast_delete(queryset.model):
+        return queryset.delete()
+    counts = Counter()
+    # Freeze the selection so later statements do not see rows already removed
+    queryset = queryset.model._base_manager.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+    with transaction.atomic(using=queryset.db):
+        _delete(queryset, counts)
+    return sum(counts.values()), dict(counts)
+
+
+def cascade_querysets(queryset):
+    """``queryset`` and a queryset per relation its deletion cascades to, parents first"""
+    yield queryset
+    for relation in get_candidate_relations_to_delete(queryset.model._meta):
+        if relation.field.remote_field.on_delete is models.CASCADE:
+            yield from cascade_querysets(_related(relation, queryset))
+
+
+def cascade_counts(queryset):
+    """Count the rows deleting ``queryset`` would remove, per model, without loading them"""
+    counts = Counter()
+    for related in cascade_querysets(queryset):
+        counts[related.model] += related.count()
+    return counts
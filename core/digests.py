@@ -0,0 +1,147 @@
+"""Overdue and due-soon digest emails.
+
+All data is loaded with a handful of set-based queries and grouped in
+memory, so the cost does not grow with one query per coach or player.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Coach, Goal, Player, ProcessGoal
+
+GOAL_FIELDS = (
+    'id', 'name', 'target_date', 'progress', 'coach_id', 'player_id',
+    'player__user__first_name', 'player__user__last_name',
+)
+PROCESS_GOAL_FIELDS = (
+    'id', 'name', 'target_date', 'progress', 'main_goal__name',
+    'main_goal__coach_id', 'main_goal__player_id',
+    'main_goal__player__user__first_name', 'main_goal__player__user__last_name',
+)
+
+
+class Digest:
+    """Items collected for one recipient"""
+
+    def __init__(self, email, name):
+        self.email = email
+        self.name = name
+        self.overdue_goals = []
+        self.upcoming_goals = []
+        self.overdue_process_goals = []
+        self.upcoming_process_goals = []
+        self.pending_goals = 0
+        self.pending_process_goals = 0
+
+    def has_items(self):
+        return bool(
+            self.overdue_goals or self.upcoming_goals
+            or self.overdue_process_goals or self.upcoming_process_goals
+            or self.pending_goals or self.pending_process_goals
+        )
+
+
+def _recipients(queryset):
+    rows = (
+        queryset.filter(user__is_active=True)
+        .exclude(user__email='')
+        .values_list('id', 'user__email', 'user__first_name', 'user__last_name')
+    )
+    return {pk: Digest(email, f"{first} {last}".strip()) for pk, email, first, last in rows}
+
+
+def build_digests(today=None, coaches=True, players=True):
+    """Return ``(coach_digests, player_digests)`` keyed by coach/player id"""
+    today = today or timezone.localdate()
+    week_end = today + timedelta(days=7)
+    coach_digests = _recipients(Coach.objects.all()) if coaches else {}
+    player_digests = _recipients(Player.objects.filter(is_active=True)) if players else {}
+
+    goals = (
+        Goal.objects.filter(target_date__lte=week_end)
+        .exclude(progress='completed')
+        .order_by('target_date')
+        .values(*GOAL_FIELDS)
+    )
+    for goal in goals.iterator(chunk_size=2000):
+        goal['player_name'] = f"{goal['player__user__first_name']} {goal['player__user__last_name']}".strip()
+        bucket = 'overdue_goals' if goal['target_date'] < today else 'upcoming_goals'
+        for digest in (coach_digests.get(goal['coach_id']), player_digests.get(goal['player_id'])):
+            if digest is not None:
+                getattr(digest, bucket).append(goal)
+
+    process_goals = (
+        ProcessGoal.objects.filter(target_date__lte=week_end)
+        .exclude(progress='completed')
+        .order_by('target_date')
+        .values(*PROCESS_GOAL_FIELDS)
+    )
+    for process_goal in process_goals.iterator(chunk_size=2000):
+        process_goal['player_name'] = (
+            f"{process_goal['main_goal__player__user__first_name']} "
+            f"{process_goal['main_goal__player__user__last_name']}"
+        ).strip()
+        bucket = 'overdue_process_goals' if process_goal['target_date'] < today else 'upcoming_process_goals'
+        for digest in (
+            coach_digests.get(process_goal['main_goal__coach_id']),
+            player_digests.get(process_goal['main_goal__player_id']),
+        ):
+            if digest is not None:
+                getattr(digest, bucket).append(process_goal)
+
+    if player_digests:
+        pending_goals = (
+            Goal.objects.exclude(progress='completed')
+            .values_list('player_id').annotate(total=Count('id')).order_by()
+        )
+        for player_id, total in pending_goals:
+            if player_id in player_digests:
+                player_digests[player_id].pending_goals = total
+        pending_process_goals = (
+            ProcessGoal.objects.exclude(progress='completed')
+            .values_list('main_goal__player_id').annotate(total=Count('id')).order_by()
+        )
+        for player_id, total in pending_process_goals:
+            if player_id in player_digests:
+                player_digests[player_id].pending_process_goals = total
+
+    return coach_digests, player_digests
+
+
+def render_digest(digest, role, today):
+    return EmailMessage(
+        subject=f"Your goal digest for {today:%b %d, %Y}",
+        body=render_to_string('core/emails/digest.txt', {
+            'digest': digest,
+            'role': role,
+            'today': today,
+        }),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[digest.email],
+    )
+
+
+def send_digests(today=None, coaches=True, players=True, batch_size=100, dry_run=False):
+    """Render and send every non-empty digest; returns the number of messages"""
+    today = today or timezone.localdate()
+    coach_digests, player_digests = build_digests(today, coaches=coaches, players=players)
+    messages = [
+        render_digest(digest, role, today)
+        for role, digests in (('coach', coach_digests), ('player', player_digests))
+        for digest in digests.values()
+        if digest.has_items()
+    ]
+    if dry_run:
+        return len(messages)
+
+    sent = 0
+    connection = get_connection()
+    for start in range(0, len(messages), batch_size):
+        # One connection per batch keeps SMTP sessions short but avoids a handshake per email
+        with connection:
+            sent += connection.send_messages(messages[start:start + batch_size]) or 0
+    return sent
@@ -0,0 +1,171 @@
+"""Live progress events pushed to coaches over Server-Sent Events.
+
+Saves of goals and process goals publish an event on the owning coach's
+channel once the transaction commits; ``progress_stream`` relays the channel
+to the coach's browser. The broadcaster named by ``EVENTS_BROADCASTER`` only
+has to provide ``publish(channel, event)``, an async ``subscribe(channel)``
+iterator and ``has_listeners(channel=None)``, so the in-process one below can
+be replaced by a database polling or LISTEN/NOTIFY backend when several server
+processes must share events. Nothing is queried or published while nobody is
+listening, which is always the case under WSGI.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import PROGRESS_PERCENTAGES, Goal, ProcessGoal
+
+
+class Subscription:
+    """Async iterator over the events of one channel for one listener"""
+
+    def __init__(self, broadcaster, channel, maxsize):
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client must not grow memory; it will reload on resync
+            self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync'})
+
+    async def get(self, timeout=None):
+        """Next event, or ``None`` after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """Fan events out to the listeners connected to this server process"""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.maxsize)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            listeners = self.subscriptions.get(subscription.channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self.subscriptions[subscription.channel]
+
+    def has_listeners(self, channel=None):
+        """Whether anyone listens on ``channel``, or on any channel when it is ``None``"""
+        with self.lock:
+            return bool(self.subscriptions) if channel is None else channel in self.subscriptions
+
+    def publish(self, channel, event):
+        # Publishers run in sync request threads; hand the event to each listener's loop
+        with self.lock:
+            listeners = list(self.subscriptions.get(channel, ()))
+        for subscription in listeners:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = import_string(settings.EVENTS_BROADCASTER)()
+    return _broadcaster
+
+
+def coach_channel(coach_id):
+    return f'coach:{coach_id}'
+
+
+def goal_events(goal_ids):
+    """Card state for each goal in ``goal_ids`` as ``(coach_id, event)``, in one query"""
+    today = timezone.localdate()
+    goals = (
+        Goal.objects.filter(pk__in=goal_ids)
+        .annotate(
+            process_goals_total=Count('process_goals'),
+            process_goals_completed=Count('process_goals', filter=Q(process_goals__progress='completed')),
+        )
+        .values(
+            'id', 'coach_id', 'name', 'progress', 'target_date',
+            'player__user__first_name', 'player__user__last_name',
+            'process_goals_total', 'process_goals_completed',
+        )
+    )
+    progress_labels = dict(Goal.PROGRESS_CHOICES)
+    for goal in goals:
+        total, completed = goal['process_goals_total'], goal['process_goals_completed']
+        yield goal['coach_id'], {
+            'type': 'goal',
+            'id': goal['id'],
+            'name': goal['name'],
+            'player': f"{goal['player__user__first_name']} {goal['player__user__last_name']}".strip(),
+            'progress': goal['progress'],
+            'progress_display': str(progress_labels[goal['progress']]),
+            'progress_percentage': PROGRESS_PERCENTAGES[goal['progress']],
+            'process_goals_total': total,
+            'process_goals_completed': completed,
+            'completion_percentage': int(completed / total * 100) if total else PROGRESS_PERCENTAGES[goal['progress']],
+            'is_overdue': bool(goal['target_date'] and goal['progress'] != 'completed' and goal['target_date'] < today),
+        }
+
+
+def process_goal_events(process_goal_ids):
+    progress_labels = dict(ProcessGoal.PROGRESS_CHOICES)
+    process_goals = ProcessGoal.objects.filter(pk__in=process_goal_ids).values(
+        'id', 'name', 'progress', 'main_goal_id', 'main_goal__coach_id',
+    )
+    for process_goal in process_goals:
+        yield process_goal['main_goal__coach_id'], {
+            'type': 'process_goal',
+            'id': process_goal['id'],
+            'goal_id': process_goal['main_goal_id'],
+            'name': process_goal['name'],
+            'progress': process_goal['progress'],
+            'progress_display': str(progress_labels[process_goal['progress']]),
+            'progress_percentage': PROGRESS_PERCENTAGES[process_goal['progress']],
+        }
+
+
+def publish_progress(goal_ids=(), process_goal_ids=()):
+    """Publish the current state of the given rows to their coaches after commit"""
+    goal_ids, process_goal_ids = set(goal_ids), set(process_goal_ids)
+    if not goal_ids and not process_goal_ids or not get_broadcaster().has_listeners():
+        return
+
+    def send():
+        broadcaster = get_broadcaster()
+        if not broadcaster.has_listeners():
+            return
+        events = list(process_goal_events(process_goal_ids)) if process_goal_ids else []
+        # A process goal change moves its goal's completion bar too
+        related_goal_ids = goal_ids | {event['goal_id'] for _, event in events}
+        events += goal_events(related_goal_ids)
+        for coach_id, event in events:
+            channel = coach_channel(coach_id)
+            if broadcaster.has_listeners(channel):
+                broadcaster.publish(channel, event)
+
+    transaction.on_commit(send)
@@ -0,0 +1,58 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils.functional import cached_property
+
+
+def code_choices(enum):
+    """``[('not_started', 'Not Started'), ...]`` for an ``IntegerChoices`` enum"""
+    return [(member.name.lower(), member.label) for member in enum]
+
+
+class CodedChoiceField(models.PositiveSmallIntegerField):
+    """Small integer column for an ``IntegerChoices`` enum, exposed by member name.
+
+    Python code, forms and templates keep using codes such as
+    ``'good_progress'`` while the database stores the enum value, so rows and
+    indexes stay compact and lookups follow the enum order
+    (``progress__gte='good_progress'``).
+    """
+
+    def __init__(self, *args, enum, **kwargs):
+        self.enum = enum
+        self.code_to_value = {member.name.lower(): member.value for member in enum}
+        self.value_to_code = {value: code for code, value in self.code_to_value.items()}
+        kwargs['choices'] = code_choices(enum)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['choices']
+        kwargs['enum'] = self.enum
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # The integer range validators would compare against codes
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.value_to_code.get(value, value)
+
+    def to_python(self, value):
+        if value is None or value in self.code_to_value:
+            return value
+        try:
+            return self.value_to_code[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+
+    def get_prep_value(self, value):
+        if isinstance(value, str) and value in self.code_to_value:
+            return self.code_to_value[value]
+        return super().get_prep_value(value)
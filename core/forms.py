@@ -0,0 +1,72 @@
+from django import forms
+from django.urls import reverse_lazy
+
+from .models import Player
+
+
+def player_label(full_name, jersey_number):
+    if jersey_number is not None:
+        return f"{full_name} (#{jersey_number})"
+    return full_name
+
+
+class PlayerChoiceField(forms.ModelMultipleChoiceField):
+    def label_from_instance(self, obj):
+        return player_label(obj.user.get_full_name(), obj.jersey_number)
+
+
+class PlayerPicker(forms.Select):
+    """Player ``<select>`` that renders only the chosen option.
+
+    static/js/player_picker.js adds a search box that looks players up on the
+    ``api_player_search`` endpoint, so the page never lists the whole squad.
+    The field's queryset still decides which ids are accepted on submit.
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            'class': 'form-select',
+            'data-player-picker': reverse_lazy('core:api_player_search'),
+            **(attrs or {}),
+        })
+
+    def optgroups(self, name, value, attrs=None):
+        # One query for the chosen player instead of one per player in the squad
+        chosen = [pk for pk in value if str(pk).isdigit()]
+        players = self.choices.queryset.filter(pk__in=chosen).select_related('user') if chosen else []
+        options = []
+        if self.choices.field.empty_label is not None:
+            options.append(self.create_option(name, '', self.choices.field.empty_label, not players, 0))
+        for player in players:
+            label = player_label(player.user.get_full_name(), player.jersey_number)
+            options.append(self.create_option(name, player.pk, label, True, len(options)))
+        return [(None, options, 0)]
+
+
+def use_player_picker(field, queryset):
+    """Render ``field`` with a ``PlayerPicker`` and accept only ``queryset``"""
+    field.widget = PlayerPicker()
+    field.widget.is_required = field.required
+    # Setting the queryset after the widget hands the widget its choices
+    field.queryset = queryset
+
+
+class AssignGoalTemplateForm(forms.Form):
+    """Pick the players a goal template is assigned to - limited to the coach's squad"""
+    players = PlayerChoiceField(
+        queryset=Player.objects.none(),
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
+    )
+    target_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        help_text="Target completion date for every assigned goal",
+    )
+
+    def __init__(self, *args, coach, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['players'].queryset = (
+            coach.players.filter(is_active=True)
+            .select_related('user')
+            .order_by('user__first_name', 'user__last_name')
+        )
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the work factor from ``PASSWORD_HASH_ITERATIONS``.
+
+    The algorithm name is unchanged, so existing hashes verify, and Django's
+    ``must_update()`` sees the different iteration count and re-hashes the
+    password on the user's next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,152 @@
+"""Helpers shared by the load-testing commands (``benchmark_servers``, ``run_workload``)"""
+import http.client
+import os
+import subprocess
+import sys
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    """Count, mean and p50/p95/p99 of ``latencies`` in milliseconds"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+
+def process_tree_rss(pid):
+    """Resident memory of ``pid`` and its children in MiB (Linux only)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # The command name may contain spaces; fields after it are fixed
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total / 1024
+
+
+def start_gunicorn(port, mode='wsgi', workers=2, threads=1, env=None):
+    """Start gunicorn from the project root and wait until it answers"""
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(workers),
+        '--bind', f'127.0.0.1:{port}',
+        '--log-level', 'warning',
+    ]
+    if mode == 'wsgi' and threads > 1:
+        command += ['--threads', str(threads)]
+    # Keep the server's output off stdout, where reports are written
+    server = subprocess.Popen(
+        command, cwd=settings.BASE_DIR, env={**os.environ, **(env or {}), 'SERVER_MODE': mode},
+        stdout=sys.stderr,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise LoadTestError(f'gunicorn exited with status {server.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/login/')
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise LoadTestError('gunicorn did not start within 30 seconds')
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait(timeout=30)
+
+
+class Session:
+    """Keep-alive HTTP connection with a cookie jar, playing one browser"""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.cookies = SimpleCookie()
+        self.connection = None
+
+    @property
+    def cookie_header(self):
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in self.cookies.items())
+
+    def request(self, method, path, data=None, headers=None):
+        """Send one request; returns the response with its body read into ``.body``"""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = self.cookie_header
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            if 'csrftoken' in self.cookies:
+                headers['X-CSRFToken'] = self.cookies['csrftoken'].value
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        for header in response.headers.get_all('Set-Cookie', []):
+            self.cookies.load(header)
+        return response
+
+    def login(self, username, password):
+        self.request('GET', '/login/')
+        if 'csrftoken' not in self.cookies:
+            raise LoadTestError('The login page did not set a CSRF cookie')
+        response = self.request('POST', '/login/', data={
+            'csrfmiddlewaretoken': self.cookies['csrftoken'].value,
+            'username': username,
+            'password': password,
+        })
+        if 'sessionid' not in self.cookies:
+            raise LoadTestError(f'Login failed for {username}; check the username and password')
+        return response
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
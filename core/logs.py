@@ -0,0 +1,122 @@
+"""Structured logging that never blocks a request on log I/O.
+
+``BackgroundHandler`` only puts records on a bounded in-memory queue; a
+listener thread formats them with ``JsonFormatter`` and writes one JSON
+object per line. When the queue is full, records are dropped rather than
+making the request wait, and counted in ``pms_log_records_dropped_total``. ``log_event`` records domain events (progress
+changes, auto-completions, permission denials) with the request's method,
+path and user, and with credentials removed from any headers it includes.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger('core.domain')
+
+REDACTED_HEADERS = {'authorization', 'cookie', 'proxy-authorization', 'set-cookie', 'x-csrftoken'}
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def redact_headers(headers):
+    """``headers`` as a dict, with cookies, tokens and credentials masked"""
+    return {
+        name: '[redacted]' if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def request_context(request, headers=False):
+    context = {
+        'method': request.method,
+        'path': request.path,
+        'user_id': getattr(getattr(request, 'user', None), 'pk', None),
+    }
+    if headers:
+        context['headers'] = redact_headers(request.headers)
+    return context
+
+
+def log_event(event, request=None, level=logging.INFO, headers=False, **fields):
+    """Log domain event ``event`` with ``fields`` (and ``request``'s context)"""
+    if request is not None:
+        fields['request'] = request_context(request, headers=headers)
+    logger.log(level, event, extra={'event': event, 'data': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with ``extra`` fields as keys"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """Queue records for a listener thread that writes them to ``stream``"""
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.dropped = 0
+        # The formatter set by LOGGING is applied here, on the listener thread
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+        # Threads do not survive fork(); gunicorn workers need their own
+        os.register_at_fork(after_in_child=self.restart)
+
+    def restart(self):
+        self.queue = self.listener.queue = queue.Queue(self.maxsize)
+        self.listener._thread = None
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, while args and exc_info are
+        # still valid; the listener thread only sees the copy
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.args = record.exc_info = None
+        request = getattr(record, 'request', None)
+        if hasattr(request, 'headers'):
+            # django.request passes the HttpRequest itself. Its user may not be
+            # loaded yet, and loading it here could hit the database.
+            record.request = {
+                'method': request.method,
+                'path': request.path,
+                'headers': redact_headers(request.headers),
+            }
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            # Imported here: logging is configured before the apps are loaded
+            from .metrics import LOG_RECORDS_DROPPED
+            LOG_RECORDS_DROPPED.inc()
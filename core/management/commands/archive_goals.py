@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import archivable_goals, archive_goals, season_start
+from core.models import ProcessGoal
+
+
+class Command(BaseCommand):
+    help = 'Move completed goals from past seasons into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seasons', type=int, default=2,
+            help='Archive goals completed before the start of the season this many seasons ago',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of goals moved per transaction',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many goals would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if options['seasons'] < 0:
+            raise CommandError('--seasons must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        cutoff = season_start(timezone.localdate(), seasons_back=options['seasons'])
+        goals = archivable_goals(cutoff)
+
+        if options['dry_run']:
+            process_goals = ProcessGoal.objects.filter(main_goal__in=goals).count()
+            self.stdout.write(
+                f'{goals.count()} goal(s) and {process_goals} process goal(s) completed before {cutoff} would be archived.'
+            )
+            return
+
+        started = time.monotonic()
+        archived, process_goals = archive_goals(goals, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} goal(s) and {process_goals} process goal(s) completed before {cutoff} '
+            f'in {time.monotonic() - started:.2f}s.'
+        ))
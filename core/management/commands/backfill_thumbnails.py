@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.models import User
+from core.thumbnails import has_thumbnails, record_thumbnails, render_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate profile picture thumbnails for existing users in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=max(settings.THUMBNAIL_WORKERS, 1),
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Render pictures whose variants are already recorded; changed variants get new names',
+        )
+
+    def handle(self, *args, **options):
+        users = (
+            User.objects.exclude(profile_picture='')
+            .exclude(profile_picture__isnull=True)
+            .only('profile_picture', 'profile_thumbnails')
+        )
+        # Users with the same content share one picture
+        names = sorted({
+            user.profile_picture.name for user in users.iterator()
+            if options['force'] or not has_thumbnails(user)
+        })
+        paths = {}
+        for name in names:
+            if default_storage.exists(name):
+                paths[default_storage.path(name)] = name
+            else:
+                self.stderr.write(f'Missing original: {name}')
+
+        rendered = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(render_thumbnails, path): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    record_thumbnails(paths[futures[future]], future.result())
+                    rendered += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'Failed {futures[future]}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(paths)} pictures: {rendered} rendered, {failed} failed.'
+        ))
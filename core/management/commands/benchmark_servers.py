@@ -0,0 +1,108 @@
+import http.client
+import sys
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import LoadTestError, Session, percentile, process_tree_rss, start_gunicorn, stop_server
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI and ASGI gunicorn throughput and tail latency with the same worker count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes in both modes')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per WSGI worker')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per mode')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Seconds of unmeasured load first')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--username', help='Log in as this user before the run')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError('Memory is measured from /proc; run this on Linux')
+        paths = options['paths'] or ['/dashboard/', '/api/v1/goals/']
+        results = []
+        for mode in options['modes']:
+            self.stdout.write(f'Benchmarking {mode}...')
+            try:
+                server = start_gunicorn(options['port'], mode, options['workers'], options['threads'])
+                try:
+                    cookie = self.login(options) if options['username'] else ''
+                    self.run_load(options, paths, cookie, options['warmup'])
+                    result = self.run_load(options, paths, cookie, options['duration'])
+                    result['rss'] = process_tree_rss(server.pid)
+                finally:
+                    stop_server(server)
+            except LoadTestError as error:
+                raise CommandError(error)
+            result['mode'] = mode
+            results.append(result)
+
+        self.stdout.write(
+            f"{'mode':<6}{'requests':>10}{'errors':>8}{'req/s':>10}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MiB':>10}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<6}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+                f"{result['p50']:>9.1f}{result['p95']:>9.1f}{result['p99']:>9.1f}{result['rss']:>10.1f}"
+            )
+
+    def login(self, options):
+        session = Session('127.0.0.1', options['port'])
+        session.login(options['username'], options['password'])
+        session.close()
+        return session.cookie_header
+
+    def run_load(self, options, paths, cookie, duration):
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+        headers = {'Cookie': cookie} if cookie else {}
+
+        def client(offset):
+            connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=30)
+            local, failed, count = [], 0, offset
+            while time.monotonic() < deadline:
+                path = paths[count % len(paths)]
+                count += 1
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status >= 400:
+                        failed += 1
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    connection.close()
+                    continue
+                local.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+        }
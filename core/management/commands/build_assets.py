@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import BUNDLE_DIR, BUNDLES, AssetError, build_bundle
+
+
+class Command(BaseCommand):
+    help = (
+        'Concatenate and minify the static bundles in core/assets.py into static/dist/. '
+        'Run before collectstatic, which fingerprints and compresses them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundles', nargs='*', help='Bundles to build (default: all)')
+
+    def handle(self, *args, **options):
+        names = options['bundles'] or list(BUNDLES)
+        unknown = set(names) - set(BUNDLES)
+        if unknown:
+            raise CommandError(f"Unknown bundle(s): {', '.join(sorted(unknown))}")
+
+        output_dir = settings.STATICFILES_DIRS[0] / BUNDLE_DIR
+        output_dir.mkdir(exist_ok=True)
+        for name in names:
+            try:
+                contents = build_bundle(name)
+            except AssetError as error:
+                raise CommandError(error)
+            except ImportError as error:
+                raise CommandError(f'{error}; install the packages in requirements.txt')
+            with open(output_dir / name, 'w', encoding='utf-8') as file:
+                file.write(contents)
+            self.stdout.write(f'{BUNDLE_DIR}/{name}: {len(BUNDLES[name])} files, {len(contents.encode()):,} bytes')
+        self.stdout.write(self.style.SUCCESS(f'Built {len(names)} bundle(s); now run collectstatic'))
@@ -0,0 +1,41 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired database sessions in small batches (a batched clearsessions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Sessions deleted per statement')
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between batches, to leave room for live traffic',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no session rows; nothing to clean up')
+            return
+
+        sessions = store.get_model_class().objects
+        now = timezone.now()
+        deleted = batches = 0
+        while True:
+            # Each batch is a short DELETE on the expire_date index instead of one long one
+            keys = list(
+                sessions.filter(expire_date__lt=now).values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            deleted += sessions.filter(pk__in=keys).delete()[0]
+            batches += 1
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions in {batches} batches'))
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: everything this command has imported already
+# would not show up
+IMPORT_SCRIPT = """
+import importlib, sys
+importlib.import_module(sys.argv[1])
+if sys.argv[2] == 'warm':
+    from core.warmup import warm_up
+    warm_up()
+"""
+
+
+def parse_importtime(output):
+    """``-X importtime`` lines -> ``[(module, self_us, cumulative_us)]``"""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Import the WSGI application in a fresh interpreter with -X importtime and '
+        'report the slowest imports (what every gunicorn worker or the preloading master pays)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='pms.wsgi', help='Module to import (default: pms.wsgi)')
+        parser.add_argument('--limit', type=int, default=25, help='Number of imports to report')
+        parser.add_argument(
+            '--sort', choices=['cumulative', 'self'], default='cumulative',
+            help='cumulative includes the imports a module triggers; self does not',
+        )
+        parser.add_argument(
+            '--warm-up', action='store_true',
+            help='Also run the server warm-up (core/warmup.py) and count the imports it triggers',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT,
+             options['module'], 'warm' if options['warm_up'] else 'cold'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+        )
+        imports = parse_importtime(result.stderr)
+        if result.returncode:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+            raise CommandError(f"Importing {options['module']} failed:\n" + '\n'.join(errors[-20:]))
+
+        column = 2 if options['sort'] == 'cumulative' else 1
+        slowest = sorted(imports, key=lambda row: row[column], reverse=True)[:options['limit']]
+        total_ms = sum(row[1] for row in imports) / 1000
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'module': options['module'],
+                'modules_imported': len(imports),
+                'total_ms': round(total_ms, 1),
+                'slowest': [
+                    {'module': module, 'self_ms': round(self_us / 1000, 1), 'cumulative_ms': round(cumulative_us / 1000, 1)}
+                    for module, self_us, cumulative_us in slowest
+                ],
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{len(imports)} modules imported by {options['module']} in {total_ms:.1f} ms")
+        self.stdout.write(f"{'self ms':>9} {'cumul. ms':>10}  module")
+        for module, self_us, cumulative_us in slowest:
+            self.stdout.write(f'{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {module}')
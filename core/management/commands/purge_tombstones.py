@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the delta-sync tombstones older than SYNC_TOMBSTONE_DAYS. Run daily; '
+        'clients whose cursor is older than that are told to resync.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tombstones deleted per statement')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        deleted = purge_tombstones(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstone(s) older than {settings.SYNC_TOMBSTONE_DAYS} days.'
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stats import rebuild_player_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the materialized goal statistics of every player. Run after migrating '
+        'and daily, so goals whose target date has passed are counted as overdue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of players recomputed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        started = time.monotonic()
+        players = rebuild_player_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the stats of {players} player(s) in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,74 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.queue import claim_tasks, execute_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default=settings.TASK_WORKER_POOL,
+            help='Use threads for I/O bound tasks or processes for CPU bound ones',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.TASK_WORKER_CONCURRENCY,
+            help='Number of tasks executed at the same time',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait before polling again when the queue is empty',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the currently due tasks and exit',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1')
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if options['pool'] == 'process':
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        self.stdout.write(f"Worker {worker_id} started ({options['pool']} pool, concurrency {concurrency})")
+        in_flight = set()
+        processed = 0
+        try:
+            while not self.stopping:
+                task_ids = claim_tasks(worker_id, concurrency - len(in_flight))
+                in_flight.update(executor.submit(execute_task, task_id) for task_id in task_ids)
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, in_flight = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                processed += len(done)
+        finally:
+            wait(in_flight)
+            processed += len(in_flight)
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id} stopped after {processed} tasks"))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,286 @@
+import http.client
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from core.access import visible_goals
+from core.loadtest import LoadTestError, Session, latency_summary, start_gunicorn, stop_server
+from core.models import Goal, ProcessGoal, User
+
+# The pages each role walks through, in order, on every iteration
+JOURNEYS = {
+    User.Role.ADMIN: ['dashboard', 'goal_list', 'goal_list_filtered', 'player_list'],
+    User.Role.COACH: [
+        'dashboard', 'goal_list', 'goal_list_filtered', 'goal_list_search',
+        'process_goal_list', 'goal_progress',
+    ],
+    User.Role.PLAYER: ['dashboard', 'goal_list', 'goal_progress', 'process_goal_progress'],
+}
+SEARCH_TERMS = ['touch', 'speed', 'aerial', 'tech', 'composure']
+AJAX_HEADERS = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+def parse_mix(value):
+    """``admin=1,coach=3,player=16`` -> ``{'admin': 1, 'coach': 3, 'player': 16}``"""
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        role = role.strip()
+        if role not in JOURNEYS or not weight.strip().isdigit():
+            raise CommandError(f'Invalid --mix entry {part!r}; expected role=weight with roles {", ".join(JOURNEYS)}')
+        mix[role] = int(weight)
+    if not sum(mix.values()):
+        raise CommandError('--mix weights must not all be zero')
+    return mix
+
+
+def allocate(users, mix):
+    """Split ``users`` virtual users between roles in proportion to ``mix``"""
+    total = sum(mix.values())
+    counts = {role: users * weight // total for role, weight in mix.items()}
+    # Hand the rounding remainder to the heaviest roles
+    for role in sorted(mix, key=mix.get, reverse=True)[:users - sum(counts.values())]:
+        counts[role] += 1
+    return counts
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class VirtualUser:
+    """One logged-in browser replaying its role's journey"""
+
+    def __init__(self, user, host, port, password, rng):
+        self.user = user
+        self.password = password
+        self.rng = rng
+        self.session = Session(host, port)
+        goals = visible_goals(user).order_by('pk')
+        self.goal_ids = list(goals.values_list('pk', flat=True)[:50])
+        self.process_goal_ids = list(
+            ProcessGoal.objects.filter(main_goal_id__in=self.goal_ids).values_list('pk', flat=True)[:100]
+        )
+
+    def login(self):
+        """Log in (login page and form post), keeping the timing for the report"""
+        started = time.monotonic()
+        response = self.session.login(self.user.username, self.password)
+        queries = response.headers.get('X-DB-Queries')
+        self.login_sample = ((time.monotonic() - started) * 1000, True, int(queries) if queries is not None else None)
+
+    def build(self, step):
+        """``(method, path, data, headers)`` for one journey step"""
+        rng = self.rng
+        progress = [code for code, _ in Goal.PROGRESS_CHOICES]
+        if step == 'dashboard':
+            return 'GET', reverse('core:dashboard'), None, None
+        if step == 'goal_list':
+            return 'GET', reverse('core:goal_list'), None, None
+        if step == 'goal_list_filtered':
+            query = urlencode({
+                'progress': rng.choice(progress),
+                'area': rng.choice([code for code, _ in Goal.AREA_CHOICES]),
+            })
+            return 'GET', f"{reverse('core:goal_list')}?{query}", None, None
+        if step == 'goal_list_search':
+            query = urlencode({'search': rng.choice(SEARCH_TERMS)})
+            return 'GET', f"{reverse('core:goal_list')}?{query}", None, None
+        if step == 'player_list':
+            return 'GET', reverse('core:player_list'), None, None
+        if step == 'process_goal_list' and self.goal_ids:
+            return 'GET', reverse('core:process_goal_list', args=[rng.choice(self.goal_ids)]), None, None
+        if step == 'goal_progress' and self.goal_ids:
+            path = reverse('core:goal_progress_update', args=[rng.choice(self.goal_ids)])
+            return 'POST', path, {'progress': rng.choice(progress)}, AJAX_HEADERS
+        if step == 'process_goal_progress' and self.process_goal_ids:
+            path = reverse('core:process_goal_progress_update', args=[rng.choice(self.process_goal_ids)])
+            return 'POST', path, {'progress': rng.choice(progress)}, AJAX_HEADERS
+        # The user has no goals to act on
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay role-based journeys (dashboard, goal lists, progress updates) against gunicorn '
+        'and report latency percentiles, throughput and queries per request as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument(
+            '--mix', default='admin=1,coach=4,player=15', type=parse_mix,
+            help='Relative share of each role among the virtual users',
+        )
+        parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+        parser.add_argument('--warmup', type=float, default=5.0, help='Seconds of unmeasured load first')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between steps (seconds)')
+        parser.add_argument('--prefix', default='bench', help='Username prefix used by seed_benchmark')
+        parser.add_argument('--password', default='bench')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--url',
+            help='Load an already running server (same database) instead of starting gunicorn',
+        )
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started_at = timezone.now()
+        accounts = self.pick_accounts(options)
+
+        server = None
+        if options['url']:
+            url = urlsplit(options['url'])
+            host, port = url.hostname, url.port or 80
+        else:
+            host, port = '127.0.0.1', options['port']
+            self.stderr.write(f"Starting gunicorn ({options['mode']}, {options['workers']} workers)...")
+            try:
+                server = start_gunicorn(
+                    port, options['mode'], options['workers'], options['threads'],
+                    env={'QUERY_COUNT_HEADER': 'True'},
+                )
+            except LoadTestError as error:
+                raise CommandError(error)
+        try:
+            users = [
+                VirtualUser(user, host, port, options['password'], random.Random(rng.random()))
+                for user in accounts
+            ]
+            self.stderr.write(f'Logging in {len(users)} users...')
+            self.parallel(users, lambda user: user.login())
+            self.stderr.write(f"Running for {options['warmup']:g}s warm-up + {options['duration']:g}s...")
+            results = self.run(users, options)
+            # Password hashing dominates logins; PASSWORD_HASH_ITERATIONS tunes it
+            results['login'] = self.summarise([user.login_sample for user in users], options['duration'])
+            del results['login']['rps']
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        report = {'meta': {
+            'commit': git_commit(),
+            'started_at': started_at.isoformat(),
+            'target': options['url'] or f"gunicorn {options['mode']} workers={options['workers']} threads={options['threads']}",
+            'users': {role: sum(1 for user in users if user.user.role == role) for role in options['mix']},
+            'duration': options['duration'],
+            'warmup': options['warmup'],
+            'think_time': options['think_time'],
+            'seed': options['seed'],
+        }, **results}
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def pick_accounts(self, options):
+        accounts = []
+        for role, count in allocate(options['users'], options['mix']).items():
+            found = list(
+                User.objects.filter(username__startswith=f"{options['prefix']}-", role=role)
+                .order_by('pk')[:count]
+            )
+            if len(found) < count:
+                raise CommandError(
+                    f'Need {count} {role} users prefixed "{options["prefix"]}-" but found {len(found)}; '
+                    f'run seed_benchmark first'
+                )
+            accounts += found
+        return accounts
+
+    def parallel(self, users, action):
+        errors = []
+
+        def run(user):
+            try:
+                action(user)
+            except (LoadTestError, OSError, http.client.HTTPException) as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(errors[0])
+
+    def run(self, users, options):
+        samples = defaultdict(list)  # step -> [(latency_ms, ok, queries)]
+        lock = threading.Lock()
+        measure_from = time.monotonic() + options['warmup']
+        deadline = measure_from + options['duration']
+        think_time = options['think_time']
+
+        def journey(user):
+            local = defaultdict(list)
+            steps = JOURNEYS[user.user.role]
+            position = user.rng.randrange(len(steps))
+            while time.monotonic() < deadline:
+                step = steps[position % len(steps)]
+                position += 1
+                request = user.build(step)
+                if request is None:
+                    continue
+                method, path, data, headers = request
+                started = time.monotonic()
+                try:
+                    response = user.session.request(method, path, data=data, headers=headers)
+                    # None of these pages redirect a logged-in user
+                    ok, queries = response.status < 300, response.headers.get('X-DB-Queries')
+                except (OSError, http.client.HTTPException):
+                    ok, queries = False, None
+                if started >= measure_from:
+                    latency = (time.monotonic() - started) * 1000
+                    local[step].append((latency, ok, int(queries) if queries is not None else None))
+                if think_time:
+                    time.sleep(user.rng.expovariate(1 / think_time))
+            user.session.close()
+            with lock:
+                for step, values in local.items():
+                    samples[step].extend(values)
+
+        threads = [threading.Thread(target=journey, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        endpoints = {step: self.summarise(values, options['duration']) for step, values in sorted(samples.items())}
+        overall = self.summarise([value for values in samples.values() for value in values], options['duration'])
+        return {'overall': overall, 'endpoints': endpoints}
+
+    def summarise(self, values, duration):
+        summary = latency_summary([latency for latency, _, _ in values])
+        counted = [queries for _, _, queries in values if queries is not None]
+        summary.update({
+            'errors': sum(1 for _, ok, _ in values if not ok),
+            'rps': round(len(values) / duration, 2),
+            # null when the server does not send X-DB-Queries (QUERY_COUNT_HEADER off)
+            'queries_per_request': round(sum(counted) / len(counted), 2) if counted else None,
+            'max_queries': max(counted) if counted else None,
+        })
+        return summary
@@ -0,0 +1,169 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.deletion import fast_delete
+from core.models import Coach, Goal, Player, ProcessGoal, User
+from core.ordering import GAP
+from core.stats import refresh_player_stats
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Riley', 'Jamie', 'Morgan', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Garcia', 'Kim', 'Okafor', 'Novak', 'Rossi', 'Silva', 'Muller', 'Haddad', 'Ito']
+POSITIONS = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+SPECIALIZATIONS = ['Fitness', 'Technique', 'Tactics', 'Goalkeeping', 'Mental skills']
+GOAL_NAMES = [
+    'Improve first touch', 'Weak foot passing', 'Sprint speed', 'Positional awareness',
+    'Aerial duels', 'Match composure', 'Set piece delivery', 'Pressing triggers',
+]
+STEP_NAMES = ['Drill practice', 'Video review', 'Conditioning block', 'Match application', 'Coach check-in']
+
+
+def bulk_create(model, objects, batch_size):
+    """``bulk_create`` from a generator without materialising all rows at once"""
+    objects = iter(objects)
+    created = 0
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic coaches, players, goals and process goals for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--coaches', type=int, default=10)
+        parser.add_argument('--players-per-coach', type=int, default=20)
+        parser.add_argument('--goals-per-player', type=int, default=5)
+        parser.add_argument('--process-goals-per-goal', type=int, default=4)
+        parser.add_argument('--prefix', default='bench', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='bench', help='Password of every generated user')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete users with this prefix (and everything they own) first',
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not prefix or '-' in prefix:
+            raise CommandError('--prefix must be non-empty and must not contain "-"')
+        users = User.objects.filter(username__startswith=f'{prefix}-')
+        started = time.monotonic()
+
+        if options['clear']:
+            deleted, _ = fast_delete(users)
+            self.stdout.write(f'Deleted {deleted} rows from a previous run')
+        elif users.exists():
+            raise CommandError(f'Users prefixed "{prefix}-" already exist; pass --clear to replace them')
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            counts = self.seed(prefix, options, rng)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['goals']} goals and "
+            f"{counts['process_goals']} process goals in {time.monotonic() - started:.1f}s. "
+            f"Log in as {prefix}-admin, {prefix}-coach-0 or {prefix}-player-0-0 "
+            f"with password {options['password']!r}."
+        ))
+
+    def seed(self, prefix, options, rng):
+        batch_size = options['batch_size']
+        # Hashing is deliberately slow; every generated user shares one hash
+        password = make_password(options['password'])
+        coach_count = options['coaches']
+        players_per_coach = options['players_per_coach']
+
+        def user(username, role):
+            return User(
+                username=username,
+                password=password,
+                role=role,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{username}@example.com',
+                is_staff=role == User.Role.ADMIN,
+            )
+
+        def users():
+            yield user(f'{prefix}-admin', User.Role.ADMIN)
+            for c in range(coach_count):
+                yield user(f'{prefix}-coach-{c}', User.Role.COACH)
+                for p in range(players_per_coach):
+                    yield user(f'{prefix}-player-{c}-{p}', User.Role.PLAYER)
+
+        user_count = bulk_create(User, users(), batch_size)
+        user_ids = dict(
+            User.objects.filter(username__startswith=f'{prefix}-').values_list('username', 'pk')
+        )
+
+        bulk_create(Coach, (
+            Coach(
+                user_id=user_ids[f'{prefix}-coach-{c}'],
+                specialization=rng.choice(SPECIALIZATIONS),
+                experience_years=rng.randint(0, 25),
+            )
+            for c in range(coach_count)
+        ), batch_size)
+        coach_ids = dict(
+            Coach.objects.filter(user__username__startswith=f'{prefix}-').values_list('user__username', 'pk')
+        )
+
+        today = timezone.localdate()
+        bulk_create(Player, (
+            Player(
+                user_id=user_ids[f'{prefix}-player-{c}-{p}'],
+                coach_id=coach_ids[f'{prefix}-coach-{c}'],
+                position=rng.choice(POSITIONS),
+                # height is DECIMAL(4, 2), so it only fits metres
+                height=Decimal(rng.randint(160, 200)) / 100,
+                weight=Decimal(rng.randint(55, 95)),
+            )
+            for c in range(coach_count)
+            for p in range(players_per_coach)
+        ), batch_size)
+        players = Player.objects.filter(user__username__startswith=f'{prefix}-').values_list('pk', 'coach_id')
+
+        progress_codes = [code for code, _ in Goal.PROGRESS_CHOICES]
+        area_codes = [code for code, _ in Goal.AREA_CHOICES]
+        timeframe_codes = [code for code, _ in Goal.TIMEFRAME_CHOICES]
+        goal_count = bulk_create(Goal, (
+            Goal(
+                name=rng.choice(GOAL_NAMES),
+                player_id=player_id,
+                coach_id=coach_id,
+                area=rng.choice(area_codes),
+                timeframe=rng.choice(timeframe_codes),
+                progress=rng.choice(progress_codes),
+                description='Synthetic goal for load testing.',
+                target_date=today + timedelta(days=rng.randint(-60, 180)),
+            )
+            for player_id, coach_id in players
+            for _ in range(options['goals_per_player'])
+        ), batch_size)
+
+        goal_ids = Goal.objects.filter(player__user__username__startswith=f'{prefix}-').values_list('pk', flat=True)
+        process_goal_count = bulk_create(ProcessGoal, (
+            ProcessGoal(
+                name=rng.choice(STEP_NAMES),
+                main_goal_id=goal_id,
+                progress=rng.choice(progress_codes),
+                target_date=today + timedelta(days=rng.randint(-30, 120)),
+                order=step * GAP,
+            )
+            for goal_id in goal_ids
+            for step in range(1, options['process_goals_per_goal'] + 1)
+        ), batch_size)
+        # bulk_create sends no post_save, so the stats rows are filled here
+        refresh_player_stats([pk for pk, _coach_id in players])
+
+        return {'users': user_count, 'goals': goal_count, 'process_goals': process_goal_count}
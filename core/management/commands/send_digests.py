@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Email coaches and players a digest of overdue and due-this-week goals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--role', choices=['all', 'coach', 'player'], default='all',
+            help='Only send digests to this role',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of messages sent per email backend connection',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Build the digests without sending them',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        started = time.monotonic()
+        count = send_digests(
+            coaches=options['role'] in ('all', 'coach'),
+            players=options['role'] in ('all', 'player'),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Prepared' if options['dry_run'] else 'Sent'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {count} digest(s) in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,160 @@
+"""Production media serving.
+
+Profile pictures (and their thumbnails) are stored under content-addressed
+names, so their URLs never change meaning and can be cached forever. When a
+reverse proxy is in front of the app the file transfer is handed off to it
+with ``X-Accel-Redirect`` / ``X-Sendfile``; otherwise the file is returned
+as a ``FileResponse``, which gunicorn sends with ``sendfile()``. Either way
+the file is only sent to signed-in users; the proxy location is internal.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Private: a shared cache would hand the files to users who are not signed in
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+class RangeFile:
+    """File wrapper that stops reading after ``length`` bytes.
+
+    ``fileno()`` is kept so gunicorn can still use ``sendfile()`` from the
+    current offset for the ``Content-Length`` of the response.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` for a single ``bytes=`` range, or ``None``.
+
+    Raises ``ValueError`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def cache_control_for(path):
+    if path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'private, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from ``MEDIA_ROOT`` to signed-in users with validators, caching and ranges"""
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden('Sign in to view media')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Media file not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = http_date(stat.st_mtime)
+    cache_control = cache_control_for(path)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if (if_none_match and etag in if_none_match) or (
+        not if_none_match and if_modified_since and int(stat.st_mtime) <= if_modified_since
+    ):
+        response = HttpResponseNotModified()
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE_BACKEND:
+        # The proxy performs the transfer and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE_BACKEND == 'nginx':
+            response.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response.headers['X-Sendfile'] = full_path
+    else:
+        response = _file_response(request, full_path, stat.st_size, content_type, etag)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def _file_response(request, full_path, size, content_type, etag):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range validator means the client must get the whole file
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            RangeFile(open(full_path, 'rb'), start, length),
+            content_type=content_type,
+            status=206,
+        )
+        response.headers['Content-Length'] = str(length)
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
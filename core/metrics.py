@@ -0,0 +1,204 @@
+"""Prometheus metrics, exposed in the text format at ``/metrics/``.
+
+Under gunicorn every worker has its own counters. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (gunicorn.conf.py sets it), each worker
+writes its samples to memory-mapped files in that directory and the
+endpoint adds them up, so any worker can answer a scrape. Without it the
+process's own registry is served, which is right for ``runserver``.
+
+The directory must be empty when the server starts; gunicorn.conf.py gives
+each master a new one unless the variable is already set.
+"""
+import contextvars
+import functools
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends import filebased, locmem, redis
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'pms_request_duration_seconds', 'Time spent handling a request, by URL name',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'pms_requests_total', 'Responses sent, by URL name and status code',
+    ['view', 'method', 'status'],
+)
+DB_QUERY_DURATION = Histogram(
+    'pms_db_query_duration_seconds', 'Time spent running one SQL query',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'pms_db_queries_per_request', 'SQL queries run while handling a request, by URL name',
+    ['view'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    'pms_db_seconds_per_request', 'Time spent in SQL while handling a request, by URL name',
+    ['view'],
+)
+PROGRESS_UPDATES = Counter(
+    'pms_progress_updates_total', 'AJAX progress updates, by target and outcome',
+    ['kind', 'outcome'],
+)
+GOAL_AUTO_COMPLETIONS = Counter(
+    'pms_goal_auto_completions_total', 'Goals completed because all their process goals were',
+    ['source'],
+)
+CACHE_REQUESTS = Counter(
+    'pms_cache_requests_total', 'Cache lookups, by cache and hit or miss',
+    ['cache', 'result'],
+)
+LOG_RECORDS_DROPPED = Counter(
+    'pms_log_records_dropped_total', 'Log records dropped because the background log queue was full',
+)
+
+OUTCOMES = {
+    200: 'success', 400: 'bad_request', 403: 'forbidden', 404: 'not_found',
+    409: 'in_flight', 422: 'key_reused', 429: 'throttled',
+}
+
+# [queries, seconds] for the request being handled, if any
+_request_db = contextvars.ContextVar('request_db', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        DB_QUERY_DURATION.observe(elapsed)
+        totals = _request_db.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class MetricsMiddleware:
+    """Record latency, status and database use of each request by URL name"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(install_query_timer)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, totals = time.perf_counter(), [0, 0.0]
+        token = _request_db.set(totals)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self.record(request, response, time.perf_counter() - started, totals)
+        return response
+
+    async def __acall__(self, request):
+        started, totals = time.perf_counter(), [0, 0.0]
+        token = _request_db.set(totals)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self.record(request, response, time.perf_counter() - started, totals)
+        return response
+
+    def record(self, request, response, elapsed, totals):
+        # resolver_match is None when no URL pattern matched; keep those in
+        # one series rather than one per path
+        match = request.resolver_match
+        view = match.view_name if match else '<unmatched>'
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        DB_QUERIES_PER_REQUEST.labels(view).observe(totals[0])
+        DB_SECONDS_PER_REQUEST.labels(view).observe(totals[1])
+
+
+def count_progress_updates(kind):
+    """Count an async progress endpoint's responses in ``pms_progress_updates_total``"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                response = await view(request, *args, **kwargs)
+            except Http404:
+                PROGRESS_UPDATES.labels(kind, 'not_found').inc()
+                raise
+            if response.has_header('Idempotent-Replayed'):
+                outcome = 'replayed'
+            else:
+                outcome = OUTCOMES.get(response.status_code, str(response.status_code))
+            PROGRESS_UPDATES.labels(kind, outcome).inc()
+            return response
+        return wrapper
+    return decorator
+
+
+class InstrumentedCacheMixin:
+    """Count hits and misses of ``get`` in ``pms_cache_requests_total``.
+
+    The series is labelled with the cache's ``METRICS_NAME`` from ``CACHES``.
+    """
+
+    _missing = object()
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', type(self).__name__)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            CACHE_REQUESTS.labels(self.metrics_name, 'miss').inc()
+            return default
+        CACHE_REQUESTS.labels(self.metrics_name, 'hit').inc()
+        return value
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+    pass
+
+
+def registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def metrics_view(request):
+    """Text exposition of every metric, for a bearer token or a staff user"""
+    authorization = request.headers.get('Authorization', '')
+    token_ok = bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode(),
+    )
+    if not (token_ok or request.user.is_staff):
+        return HttpResponseForbidden('Metrics require a bearer token or a staff login')
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:14
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_processgoal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to=core.models.profile_picture_upload_to, verbose_name='Profile Picture'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Goal name/description', max_length=200)),
+                ('area', models.CharField(choices=[('physical', 'Physical'), ('technical', 'Technical'), ('tactical', 'Tactical'), ('mental', 'Mental')], default='technical', max_length=20)),
+                ('timeframe', models.CharField(choices=[('short_term', 'Short Term'), ('medium_term', 'Medium Term'), ('long_term', 'Long Term')], default='medium_term', max_length=20)),
+                ('description', models.TextField(blank=True, help_text='Detailed description of the goal')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('coach', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goal_templates', to='core.coach')),
+            ],
+            options={
+                'verbose_name': 'Goal Template',
+                'verbose_name_plural': 'Goal Templates',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProcessGoalTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Process goal name/description', max_length=200)),
+                ('description', models.TextField(blank=True, help_text='Detailed description of the process goal')),
+                ('order', models.PositiveIntegerField(default=0, help_text='Order of the process goal')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='core.goaltemplate')),
+            ],
+            options={
+                'verbose_name': 'Process Goal Template',
+                'verbose_name_plural': 'Process Goal Templates',
+                'ordering': ['order', 'id'],
+            },
+        ),
+    ]
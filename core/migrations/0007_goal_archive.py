@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_goal_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGoal',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('area', models.CharField(choices=[('physical', 'Physical'), ('technical', 'Technical'), ('tactical', 'Tactical'), ('mental', 'Mental')], max_length=20)),
+                ('timeframe', models.CharField(choices=[('short_term', 'Short Term'), ('medium_term', 'Medium Term'), ('long_term', 'Long Term')], max_length=20)),
+                ('progress', models.CharField(choices=[('not_started', 'Not Started'), ('in_progress', 'In Progress'), ('good_progress', 'Good Progress'), ('excellent_progress', 'Excellent Progress'), ('completed', 'Completed')], max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('target_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('coach', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_goals', to='core.coach')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_goals', to='core.player')),
+            ],
+            options={
+                'verbose_name': 'Archived Goal',
+                'verbose_name_plural': 'Archived Goals',
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedProcessGoal',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('progress', models.CharField(choices=[('not_started', 'Not Started'), ('in_progress', 'In Progress'), ('good_progress', 'Good Progress'), ('excellent_progress', 'Excellent Progress'), ('completed', 'Completed')], max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('target_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('main_goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='process_goals', to='core.archivedgoal')),
+            ],
+            options={
+                'verbose_name': 'Archived Process Goal',
+                'verbose_name_plural': 'Archived Process Goals',
+                'ordering': ['order', 'created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations, models
+
+import core.fields
+import core.models
+
+# (model, field, enum, default) for every choice column converted to a small integer
+CODED_FIELDS = [
+    ('goal', 'area', core.models.Area, 'technical'),
+    ('goal', 'timeframe', core.models.Timeframe, 'medium_term'),
+    ('goal', 'progress', core.models.Progress, 'not_started'),
+    ('processgoal', 'progress', core.models.Progress, 'not_started'),
+    ('goaltemplate', 'area', core.models.Area, 'technical'),
+    ('goaltemplate', 'timeframe', core.models.Timeframe, 'medium_term'),
+    ('archivedgoal', 'area', core.models.Area, None),
+    ('archivedgoal', 'timeframe', core.models.Timeframe, None),
+    ('archivedgoal', 'progress', core.models.Progress, None),
+    ('archivedprocessgoal', 'progress', core.models.Progress, None),
+]
+
+
+def _models(apps):
+    fields = {}
+    for model_name, field, enum, default in CODED_FIELDS:
+        fields.setdefault(model_name, []).append((field, enum))
+    return [(apps.get_model('core', model_name), model_fields) for model_name, model_fields in fields.items()]
+
+
+def encode(apps, schema_editor):
+    # One UPDATE per table; the CASE maps every code to its enum value
+    for model, fields in _models(apps):
+        model.objects.update(**{
+            f'{field}_code': models.Case(
+                *[models.When(**{field: member.name.lower()}, then=models.Value(member.value)) for member in enum],
+                default=models.Value(0),
+                output_field=models.PositiveSmallIntegerField(),
+            )
+            for field, enum in fields
+        })
+
+
+def decode(apps, schema_editor):
+    for model, fields in _models(apps):
+        model.objects.update(**{
+            field: models.Case(
+                *[models.When(**{f'{field}_code': member.value}, then=models.Value(member.name.lower())) for member in enum],
+                output_field=models.CharField(),
+            )
+            for field, enum in fields
+        })
+
+
+def add_code_fields():
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name=f'{field}_code',
+            field=core.fields.CodedChoiceField(enum=enum, default=default or 0),
+            preserve_default=default is not None,
+        )
+        for model_name, field, enum, default in CODED_FIELDS
+    ]
+
+
+def replace_char_fields():
+    operations = []
+    for model_name, field, enum, default in CODED_FIELDS:
+        operations += [
+            migrations.RemoveField(model_name=model_name, name=field),
+            migrations.RenameField(model_name=model_name, old_name=f'{field}_code', new_name=field),
+        ]
+    return operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_goal_archive'),
+    ]
+
+    operations = [
+        *add_code_fields(),
+        migrations.RunPython(encode, decode),
+        *replace_char_fields(),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_coded_choice_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.player')),
+                ('goals_total', models.PositiveIntegerField(default=0)),
+                ('goals_completed', models.PositiveIntegerField(default=0)),
+                ('average_completion', models.FloatField(default=0, help_text="Mean of the goals' completion percentages")),
+                ('overdue_goals', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('coach', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.coach')),
+            ],
+            options={
+                'verbose_name': 'Player Stats',
+                'verbose_name_plural': 'Player Stats',
+                'indexes': [models.Index(fields=['coach', '-average_completion', '-goals_completed'], name='core_stats_coach_compl_idx'), models.Index(fields=['coach', '-goals_completed', '-average_completion'], name='core_stats_coach_done_idx'), models.Index(fields=['coach', '-goals_total', '-average_completion'], name='core_stats_coach_total_idx'), models.Index(fields=['coach', '-overdue_goals', 'average_completion'], name='core_stats_coach_overdue_idx'), models.Index(fields=['-average_completion', '-goals_completed'], name='core_stats_completion_idx')],
+            },
+        ),
+    ]
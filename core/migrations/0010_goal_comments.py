@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# (model holding a notes column, comment model, comment foreign key)
+THREADS = [
+    ('goal', 'goalcomment', 'goal'),
+    ('processgoal', 'processgoalcomment', 'process_goal'),
+]
+
+
+def notes_to_comments(apps, schema_editor):
+    # One INSERT ... SELECT per table; each non-empty notes blob becomes the
+    # first note of its thread, dated when the row was last saved
+    quote = schema_editor.quote_name
+    for model_name, comment_name, fk in THREADS:
+        model = apps.get_model('core', model_name)
+        comment = apps.get_model('core', comment_name)
+        schema_editor.execute(
+            f"INSERT INTO {quote(comment._meta.db_table)} ({quote(fk + '_id')}, {quote('body')}, {quote('created_at')}) "
+            f"SELECT {quote('id')}, {quote('notes')}, {quote('updated_at')} FROM {quote(model._meta.db_table)} "
+            f"WHERE {quote('notes')} <> ''"
+        )
+
+
+def comments_to_notes(apps, schema_editor):
+    for model_name, comment_name, fk in THREADS:
+        model = apps.get_model('core', model_name)
+        comment = apps.get_model('core', comment_name)
+        threads = {}
+        for target_id, body in comment.objects.order_by(fk, 'id').values_list(f'{fk}_id', 'body'):
+            threads.setdefault(target_id, []).append(body)
+        for target_id, bodies in threads.items():
+            model.objects.filter(pk=target_id).update(notes='\n\n'.join(bodies))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_player_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.TextField(max_length=5000)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('goal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.goal')),
+            ],
+            options={
+                'verbose_name': 'Goal Note',
+                'verbose_name_plural': 'Goal Notes',
+                'ordering': ['-id'],
+                'abstract': False,
+                'default_permissions': ('add', 'delete', 'view'),
+                'indexes': [models.Index(fields=['goal', '-id'], name='core_goalcomment_thread_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProcessGoalComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.TextField(max_length=5000)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('process_goal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.processgoal')),
+            ],
+            options={
+                'verbose_name': 'Process Goal Note',
+                'verbose_name_plural': 'Process Goal Notes',
+                'ordering': ['-id'],
+                'abstract': False,
+                'default_permissions': ('add', 'delete', 'view'),
+                'indexes': [models.Index(fields=['process_goal', '-id'], name='core_pgcomment_thread_idx')],
+            },
+        ),
+        migrations.RunPython(notes_to_comments, comments_to_notes),
+        migrations.RemoveField(
+            model_name='goal',
+            name='notes',
+        ),
+        migrations.RemoveField(
+            model_name='processgoal',
+            name='notes',
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_goal_comments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('player', 'Player'), ('goal', 'Goal'), ('process_goal', 'Process Goal')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=True, help_text='False when the row still exists but moved to another coach or player')),
+                ('removed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'ordering': ['removed_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['coach', 'updated_at'], name='core_goal_coach_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['player', 'updated_at'], name='core_goal_player_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['updated_at'], name='core_goal_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['coach', 'updated_at'], name='core_player_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['updated_at'], name='core_player_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processgoal',
+            index=models.Index(fields=['updated_at'], name='core_processgoal_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='coach',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.coach'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='player',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.player'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['coach', 'removed_at'], name='core_tombstone_coach_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['player', 'removed_at'], name='core_tombstone_player_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted', 'removed_at'], name='core_tombstone_deleted_idx'),
+        ),
+    ]
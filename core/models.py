@@ -1,7 +1,21 @@
+import hashlib
+import os
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
+from .fields import CodedChoiceField, code_choices
+
+
+def profile_picture_upload_to(instance, filename):
+    """Name profile pictures after their content hash so URLs can be cached forever"""
+    digest = hashlib.sha256()
+    for chunk in instance.profile_picture.chunks():
+        digest.update(chunk)
+    extension = os.path.splitext(filename)[1].lower()
+    return f"profile_pictures/{digest.hexdigest()[:32]}{extension}"
+
 
 class User(AbstractUser):
     """Custom User model with role-based authentication"""
@@ -20,16 +34,25 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
     profile_picture = models.ImageField(
-        upload_to='profile_pictures/',
+        upload_to=profile_picture_upload_to,
         blank=True,
         null=True,
         verbose_name=_('Profile Picture')
     )
+    # {'source': picture name, size: variant name} written by core/thumbnails.py
+    profile_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The thumbnails of a replaced picture are removed after the save
+        instance._loaded_profile_picture = instance.__dict__.get('profile_picture')
+        return instance
+    
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_role_display()})"
     
@@ -141,11 +164,24 @@ class Player(models.Model):
         default=True,
         verbose_name=_('Active Status')
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _('Player')
         verbose_name_plural = _('Players')
         ordering = ['user__first_name', 'user__last_name']
+        # Delta sync reads a coach's changed players in updated_at order
+        indexes = [
+            models.Index(fields=['coach', 'updated_at'], name='core_player_sync_idx'),
+            models.Index(fields=['updated_at'], name='core_player_updated_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # A player moved to another coach leaves the old coach's delta sync
+        instance._loaded_coach_id = instance.__dict__.get('coach_id')
+        return instance
     
     def __str__(self):
         return f"Player {self.user.get_full_name()} (#{self.jersey_number})"
@@ -163,60 +199,97 @@ class Player(models.Model):
         return None
 
 
-class Goal(models.Model):
+class Progress(models.IntegerChoices):
+    """Stored progress values; ordered so "at least good progress" is a range lookup"""
+    NOT_STARTED = 0, _('Not Started')
+    IN_PROGRESS = 1, _('In Progress')
+    GOOD_PROGRESS = 2, _('Good Progress')
+    EXCELLENT_PROGRESS = 3, _('Excellent Progress')
+    COMPLETED = 4, _('Completed')
+
+
+class Timeframe(models.IntegerChoices):
+    SHORT_TERM = 0, _('Short Term')
+    MEDIUM_TERM = 1, _('Medium Term')
+    LONG_TERM = 2, _('Long Term')
+
+
+class Area(models.IntegerChoices):
+    PHYSICAL = 0, _('Physical')
+    TECHNICAL = 1, _('Technical')
+    TACTICAL = 2, _('Tactical')
+    MENTAL = 3, _('Mental')
+
+
+PROGRESS_PERCENTAGES = {
+    'not_started': 0,
+    'in_progress': 25,
+    'good_progress': 50,
+    'excellent_progress': 75,
+    'completed': 100,
+}
+
+
+class ProgressTrackingMixin:
+    """Remember the progress a row was loaded with so saves can tell if it changed"""
+    
+    _loaded_progress = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_progress = instance.__dict__.get('progress')
+        return instance
+    
+    def progress_changed(self):
+        """True if progress differs from the last loaded or saved value"""
+        return 'progress' in self.__dict__ and self.progress != self._loaded_progress
+
+
+class Goal(ProgressTrackingMixin, models.Model):
     """Goal model for players to track their progress"""
     
-    PROGRESS_CHOICES = [
-        ('not_started', 'Not Started'),
-        ('in_progress', 'In Progress'),
-        ('good_progress', 'Good Progress'),
-        ('excellent_progress', 'Excellent Progress'),
-        ('completed', 'Completed'),
-    ]
-    
-    TIMEFRAME_CHOICES = [
-        ('short_term', 'Short Term'),
-        ('medium_term', 'Medium Term'),
-        ('long_term', 'Long Term'),
-    ]
-    
-    AREA_CHOICES = [
-        ('physical', 'Physical'),
-        ('technical', 'Technical'),
-        ('tactical', 'Tactical'),
-        ('mental', 'Mental'),
-    ]
+    PROGRESS_CHOICES = code_choices(Progress)
+    TIMEFRAME_CHOICES = code_choices(Timeframe)
+    AREA_CHOICES = code_choices(Area)
     
     name = models.CharField(max_length=200, help_text="Goal name/description")
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='goals')
     coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='assigned_goals')
-    area = models.CharField(max_length=20, choices=AREA_CHOICES, default='technical')
-    timeframe = models.CharField(max_length=20, choices=TIMEFRAME_CHOICES, default='medium_term')
-    progress = models.CharField(max_length=20, choices=PROGRESS_CHOICES, default='not_started')
+    area = CodedChoiceField(enum=Area, default='technical')
+    timeframe = CodedChoiceField(enum=Timeframe, default='medium_term')
+    progress = CodedChoiceField(enum=Progress, default='not_started')
     description = models.TextField(blank=True, help_text="Detailed description of the goal")
     target_date = models.DateField(null=True, blank=True, help_text="Target completion date")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    notes = models.TextField(blank=True, help_text="Additional notes or comments")
     
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Goal'
         verbose_name_plural = 'Goals'
+        # Delta sync reads a coach's or player's changed goals in updated_at order
+        indexes = [
+            models.Index(fields=['coach', 'updated_at'], name='core_goal_coach_sync_idx'),
+            models.Index(fields=['player', 'updated_at'], name='core_goal_player_sync_idx'),
+            models.Index(fields=['updated_at'], name='core_goal_updated_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # A goal moved to another player changes both players' stats, and a
+        # goal moved to another player or coach leaves their delta sync
+        instance._loaded_player_id = instance.__dict__.get('player_id')
+        instance._loaded_coach_id = instance.__dict__.get('coach_id')
+        return instance
     
     def __str__(self):
         return f"{self.name} - {self.player.user.get_full_name()}"
     
     def get_progress_percentage(self):
         """Calculate progress percentage based on status"""
-        progress_map = {
-            'not_started': 0,
-            'in_progress': 25,
-            'good_progress': 50,
-            'excellent_progress': 75,
-            'completed': 100,
-        }
-        return progress_map.get(self.progress, 0)
+        return PROGRESS_PERCENTAGES.get(self.progress, 0)
     
     def is_overdue(self):
         """Check if goal is overdue"""
@@ -231,6 +304,10 @@ class Goal(models.Model):
     
     def get_completed_process_goals_count(self):
         """Get number of completed process goals"""
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('process_goals')
+        if prefetched is not None:
+            # Count the rows prefetch_related('process_goals') already loaded
+            return sum(1 for process_goal in prefetched if process_goal.progress == 'completed')
         return self.process_goals.filter(progress='completed').count()
     
     def get_completion_percentage(self):
@@ -253,45 +330,34 @@ class Goal(models.Model):
         return completed_process_goals == total_process_goals
 
 
-class ProcessGoal(models.Model):
+class ProcessGoal(ProgressTrackingMixin, models.Model):
     """Process Goal model for sub-goals under main goals"""
     
-    PROGRESS_CHOICES = [
-        ('not_started', 'Not Started'),
-        ('in_progress', 'In Progress'),
-        ('good_progress', 'Good Progress'),
-        ('excellent_progress', 'Excellent Progress'),
-        ('completed', 'Completed'),
-    ]
+    PROGRESS_CHOICES = code_choices(Progress)
     
     name = models.CharField(max_length=200, help_text="Process goal name/description")
     main_goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='process_goals')
-    progress = models.CharField(max_length=20, choices=PROGRESS_CHOICES, default='not_started')
+    progress = CodedChoiceField(enum=Progress, default='not_started')
     description = models.TextField(blank=True, help_text="Detailed description of the process goal")
     target_date = models.DateField(null=True, blank=True, help_text="Target completion date")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    notes = models.TextField(blank=True, help_text="Additional notes or comments")
     order = models.PositiveIntegerField(default=0, help_text="Order of the process goal")
     
     class Meta:
         ordering = ['order', 'created_at']
         verbose_name = 'Process Goal'
         verbose_name_plural = 'Process Goals'
+        indexes = [
+            models.Index(fields=['updated_at'], name='core_processgoal_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.main_goal.name}"
     
     def get_progress_percentage(self):
         """Calculate progress percentage based on status"""
-        progress_map = {
-            'not_started': 0,
-            'in_progress': 25,
-            'good_progress': 50,
-            'excellent_progress': 75,
-            'completed': 100,
-        }
-        return progress_map.get(self.progress, 0)
+        return PROGRESS_PERCENTAGES.get(self.progress, 0)
     
     def is_overdue(self):
         """Check if process goal is overdue"""
@@ -299,3 +365,279 @@ class ProcessGoal(models.Model):
             from django.utils import timezone
             return self.target_date < timezone.now().date()
         return False
+
+
+COMMENT_MAX_LENGTH = 5000
+
+
+class Comment(models.Model):
+    """Note in a goal's or process goal's thread; rows are only ever added, newest read first"""
+    
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    body = models.TextField(max_length=COMMENT_MAX_LENGTH)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        abstract = True
+        ordering = ['-id']
+        # No change permission: notes are added and read, and only removed by admins
+        default_permissions = ('add', 'delete', 'view')
+    
+    def __str__(self):
+        return f"Note #{self.pk} by {self.author.get_full_name() if self.author else 'unknown'}"
+
+
+class GoalComment(Comment):
+    # Indexed together with id below so a page of the thread is one index range
+    goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='comments', db_index=False)
+    
+    class Meta(Comment.Meta):
+        verbose_name = 'Goal Note'
+        verbose_name_plural = 'Goal Notes'
+        indexes = [
+            models.Index(fields=['goal', '-id'], name='core_goalcomment_thread_idx'),
+        ]
+
+
+class ProcessGoalComment(Comment):
+    process_goal = models.ForeignKey(ProcessGoal, on_delete=models.CASCADE, related_name='comments', db_index=False)
+    
+    class Meta(Comment.Meta):
+        verbose_name = 'Process Goal Note'
+        verbose_name_plural = 'Process Goal Notes'
+        indexes = [
+            models.Index(fields=['process_goal', '-id'], name='core_pgcomment_thread_idx'),
+        ]
+
+
+class PlayerStats(models.Model):
+    """Goal totals of one player, kept up to date by ``core.stats`` for the leaderboards"""
+    
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    # Copy of player.coach so a coach's leaderboard is one index range
+    coach = models.ForeignKey(Coach, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    goals_total = models.PositiveIntegerField(default=0)
+    goals_completed = models.PositiveIntegerField(default=0)
+    average_completion = models.FloatField(default=0, help_text="Mean of the goals' completion percentages")
+    overdue_goals = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Player Stats'
+        verbose_name_plural = 'Player Stats'
+        # One index per leaderboard order in core.stats.LEADERBOARD_ORDERS
+        indexes = [
+            models.Index(fields=['coach', '-average_completion', '-goals_completed'], name='core_stats_coach_compl_idx'),
+            models.Index(fields=['coach', '-goals_completed', '-average_completion'], name='core_stats_coach_done_idx'),
+            models.Index(fields=['coach', '-goals_total', '-average_completion'], name='core_stats_coach_total_idx'),
+            models.Index(fields=['coach', '-overdue_goals', 'average_completion'], name='core_stats_coach_overdue_idx'),
+            models.Index(fields=['-average_completion', '-goals_completed'], name='core_stats_completion_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Stats of player #{self.player_id}"
+
+
+class GoalTemplate(models.Model):
+    """Reusable goal with an ordered process goal checklist that coaches assign to many players"""
+    
+    name = models.CharField(max_length=200, help_text="Goal name/description")
+    coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='goal_templates')
+    area = CodedChoiceField(enum=Area, default='technical')
+    timeframe = CodedChoiceField(enum=Timeframe, default='medium_term')
+    description = models.TextField(blank=True, help_text="Detailed description of the goal")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Goal Template'
+        verbose_name_plural = 'Goal Templates'
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def from_goal(cls, goal):
+        """Create a template (and its steps) from an existing goal"""
+        with transaction.atomic():
+            template = cls.objects.create(
+                name=goal.name,
+                coach=goal.coach,
+                area=goal.area,
+                timeframe=goal.timeframe,
+                description=goal.description,
+            )
+            ProcessGoalTemplate.objects.bulk_create([
+                ProcessGoalTemplate(template=template, name=step.name, description=step.description, order=step.order)
+                for step in goal.process_goals.all()
+            ])
+        return template
+    
+    def assign_to(self, players, target_date=None):
+        """Create one goal per player with a copy of every step, in two INSERTs"""
+        from .ordering import GAP
+        steps = list(self.steps.all())
+        with transaction.atomic():
+            goals = Goal.objects.bulk_create([
+                Goal(
+                    name=self.name,
+                    player=player,
+                    coach=self.coach,
+                    area=self.area,
+                    timeframe=self.timeframe,
+                    description=self.description,
+                    target_date=target_date,
+                )
+                for player in players
+            ])
+            ProcessGoal.objects.bulk_create([
+                ProcessGoal(
+                    name=step.name,
+                    main_goal=goal,
+                    description=step.description,
+                    # Gapped like the steps added in the UI, so they can be reordered
+                    order=(index + 1) * GAP,
+                )
+                for goal in goals
+                for index, step in enumerate(steps)
+            ], batch_size=500)
+            # bulk_create sends no post_save
+            from .stats import mark_stale
+            mark_stale(player_ids=[goal.player_id for goal in goals])
+        return goals
+
+
+class ProcessGoalTemplate(models.Model):
+    """Step of a goal template, copied into a process goal on assignment"""
+    
+    template = models.ForeignKey(GoalTemplate, on_delete=models.CASCADE, related_name='steps')
+    name = models.CharField(max_length=200, help_text="Process goal name/description")
+    description = models.TextField(blank=True, help_text="Detailed description of the process goal")
+    order = models.PositiveIntegerField(default=0, help_text="Order of the process goal")
+    
+    class Meta:
+        ordering = ['order', 'id']
+        verbose_name = 'Process Goal Template'
+        verbose_name_plural = 'Process Goal Templates'
+    
+    def __str__(self):
+        return f"{self.name} - {self.template.name}"
+
+
+class Task(models.Model):
+    """Background job stored in the database and executed by ``run_worker``"""
+    
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+    
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(help_text="Earliest time the task may start")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = 'Task'
+        verbose_name_plural = 'Tasks'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_task_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
+
+
+class ArchivedGoal(models.Model):
+    """Completed goal moved out of the live table by ``archive_goals``; keeps the original id"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='archived_goals')
+    coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='archived_goals')
+    area = CodedChoiceField(enum=Area)
+    timeframe = CodedChoiceField(enum=Timeframe)
+    progress = CodedChoiceField(enum=Progress)
+    description = models.TextField(blank=True)
+    target_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-updated_at']
+        verbose_name = 'Archived Goal'
+        verbose_name_plural = 'Archived Goals'
+    
+    def __str__(self):
+        return self.name
+
+
+class ArchivedProcessGoal(models.Model):
+    """Process goal archived together with its main goal"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    main_goal = models.ForeignKey(ArchivedGoal, on_delete=models.CASCADE, related_name='process_goals')
+    progress = CodedChoiceField(enum=Progress)
+    description = models.TextField(blank=True)
+    target_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    order = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['order', 'created_at']
+        verbose_name = 'Archived Process Goal'
+        verbose_name_plural = 'Archived Process Goals'
+    
+    def __str__(self):
+        return self.name
+
+
+class Tombstone(models.Model):
+    """A player, goal or process goal that was deleted or left someone's view, for delta sync"""
+    
+    class Kind(models.TextChoices):
+        PLAYER = 'player', _('Player')
+        GOAL = 'goal', _('Goal')
+        PROCESS_GOAL = 'process_goal', _('Process Goal')
+    
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    # Whose view the row left. No constraints: the coach or player may be deleted with it
+    coach = models.ForeignKey(
+        Coach, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True, related_name='+',
+    )
+    player = models.ForeignKey(
+        Player, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True, related_name='+',
+    )
+    deleted = models.BooleanField(
+        default=True, help_text="False when the row still exists but moved to another coach or player",
+    )
+    removed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['removed_at', 'id']
+        verbose_name = 'Tombstone'
+        verbose_name_plural = 'Tombstones'
+        indexes = [
+            models.Index(fields=['coach', 'removed_at'], name='core_tombstone_coach_idx'),
+            models.Index(fields=['player', 'removed_at'], name='core_tombstone_player_idx'),
+            models.Index(fields=['deleted', 'removed_at'], name='core_tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} removed {self.removed_at:%Y-%m-%d %H:%M}"
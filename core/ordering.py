@@ -0,0 +1,84 @@
+"""Gapped ordering of a goal's process goals.
+
+Steps are numbered ``GAP``, ``2 * GAP``, ``3 * GAP``... so a step moved
+between two others takes the midpoint of their ``order`` values and is the
+only row written. When two neighbours leave no integer between them (after
+many moves into the same spot, or with the small or duplicate numbers of
+older rows) the goal's steps are renumbered in a single ``UPDATE``.
+"""
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from django.utils import timezone
+
+from .models import ProcessGoal
+
+GAP = 1024
+
+
+class OrderingError(ValueError):
+    pass
+
+
+def next_order(goal):
+    """``order`` for a new step at the end of ``goal``'s list"""
+    last = goal.process_goals.aggregate(last=Max('order'))['last']
+    return (last or 0) + GAP
+
+
+def _slot(previous, following):
+    """A free ``order`` strictly between the neighbours' values, or ``None``"""
+    low = previous if previous is not None else 0
+    if following is None:
+        return low + GAP
+    if following - low < 2:
+        return None
+    return (low + following) // 2
+
+
+def rebalance(goal_id, ids, now=None):
+    """Renumber the steps ``ids`` (every step of the goal, in order) in one statement"""
+    now = now or timezone.now()
+    return ProcessGoal.objects.filter(main_goal_id=goal_id).update(
+        order=Case(*[When(pk=pk, then=Value((index + 1) * GAP)) for index, pk in enumerate(ids)]),
+        updated_at=now,
+    )
+
+
+def move_process_goal(process_goal, after=None, before=None):
+    """Place ``process_goal`` right after step ``after`` or right before step ``before``.
+
+    Both are process goal ids of the same goal; with neither the step moves to
+    the top. Returns ``(new_order, rebalanced)``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        siblings = list(
+            ProcessGoal.objects.select_for_update()
+            .filter(main_goal_id=process_goal.main_goal_id)
+            .exclude(pk=process_goal.pk)
+            .order_by('order', 'created_at', 'pk')
+            .values_list('pk', 'order')
+        )
+        ids = [pk for pk, _order in siblings]
+        anchor = after if after is not None else before
+        if anchor is not None and anchor not in ids:
+            raise OrderingError('The step to move next to is not part of this goal')
+        if after is not None:
+            position = ids.index(after) + 1
+        elif before is not None:
+            position = ids.index(before)
+        else:
+            position = 0
+
+        previous = siblings[position - 1][1] if position > 0 else None
+        following = siblings[position][1] if position < len(siblings) else None
+        order = _slot(previous, following)
+        if order is not None:
+            ProcessGoal.objects.filter(pk=process_goal.pk).update(order=order, updated_at=now)
+            process_goal.order = order
+            return order, False
+
+        ids.insert(position, process_goal.pk)
+        rebalance(process_goal.main_goal_id, ids, now=now)
+        process_goal.order = (position + 1) * GAP
+        return process_goal.order, True
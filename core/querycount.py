@@ -0,0 +1,59 @@
+"""``X-DB-Queries`` response header for load tests (``QUERY_COUNT_HEADER``).
+
+The counter lives in a context variable, which ``sync_to_async`` copies into
+its worker threads, so queries that ``run_concurrently`` sends over other
+connections are counted against the request too.
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+
+_counter = contextvars.ContextVar('query_counter', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class QueryCountMiddleware:
+    """Count the SQL queries run while handling each request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(install_counter)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = [0]
+        token = _counter.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _counter.reset(token)
+        response['X-DB-Queries'] = str(counter[0])
+        return response
+
+    async def __acall__(self, request):
+        counter = [0]
+        token = _counter.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _counter.reset(token)
+        response['X-DB-Queries'] = str(counter[0])
+        return response
@@ -0,0 +1,128 @@
+"""Database-backed background task queue.
+
+Request handlers call :func:`enqueue` to hand off slow work; ``manage.py
+run_worker`` claims queued rows and executes the registered callables. On
+databases that support it the claim uses ``SELECT ... FOR UPDATE SKIP
+LOCKED`` so several workers never block on each other; elsewhere (SQLite) a
+conditional ``UPDATE`` on the status column makes the claim atomic.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+def task(name):
+    """Register the decorated function as the handler for task ``name``"""
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, delay=0, max_attempts=None):
+    """Queue task ``name`` to run after ``delay`` seconds.
+
+    With ``TASKS_EAGER`` enabled the task runs inline instead, which keeps
+    development setups working without a worker process.
+    """
+    if name not in REGISTRY:
+        raise KeyError(f"Unknown task: {name}")
+    payload = {'args': list(args), 'kwargs': kwargs or {}}
+    if settings.TASKS_EAGER:
+        REGISTRY[name](*payload['args'], **payload['kwargs'])
+        return None
+    return Task.objects.create(
+        name=name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def claim_tasks(worker_id, limit):
+    """Mark up to ``limit`` due tasks as running for ``worker_id`` and return their ids.
+
+    Tasks left ``running`` longer than ``TASK_LEASE_SECONDS`` belong to a
+    worker that died and are claimed again.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    due = Q(status=Task.Status.QUEUED, run_at__lte=now) | Q(status=Task.Status.RUNNING, started_at__lt=stale)
+
+    with transaction.atomic():
+        candidates = Task.objects.filter(due).order_by('run_at')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # Re-checking ``due`` makes this a compare-and-set where rows cannot be locked
+        Task.objects.filter(due, id__in=ids).update(
+            status=Task.Status.RUNNING,
+            started_at=now,
+            locked_by=worker_id,
+        )
+    return list(
+        Task.objects.filter(id__in=ids, status=Task.Status.RUNNING, locked_by=worker_id, started_at=now)
+        .values_list('id', flat=True)
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds"""
+    base = settings.TASK_RETRY_BACKOFF * (2 ** (attempts - 1))
+    return min(base, settings.TASK_RETRY_BACKOFF_MAX) * random.uniform(0.8, 1.2)
+
+
+def execute_task(task_id):
+    """Run a claimed task and record the outcome. Safe to call from pool workers."""
+    try:
+        task_obj = Task.objects.get(pk=task_id)
+        handler = REGISTRY.get(task_obj.name)
+        try:
+            if handler is None:
+                raise KeyError(f"Unknown task: {task_obj.name}")
+            handler(*task_obj.payload.get('args', []), **task_obj.payload.get('kwargs', {}))
+        except Exception:
+            attempts = task_obj.attempts + 1
+            error = traceback.format_exc()
+            logger.warning("Task %s failed (attempt %s/%s)", task_obj, attempts, task_obj.max_attempts)
+            if attempts < task_obj.max_attempts:
+                Task.objects.filter(pk=task_id).update(
+                    status=Task.Status.QUEUED,
+                    attempts=attempts,
+                    run_at=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+                    locked_by='',
+                    last_error=error,
+                )
+            else:
+                Task.objects.filter(pk=task_id).update(
+                    status=Task.Status.FAILED,
+                    attempts=attempts,
+                    finished_at=timezone.now(),
+                    last_error=error,
+                )
+            return False
+        Task.objects.filter(pk=task_id).update(
+            status=Task.Status.DONE,
+            attempts=task_obj.attempts + 1,
+            finished_at=timezone.now(),
+        )
+        return True
+    finally:
+        # Pool threads keep their own connection; do not leak it
+        connection.close()
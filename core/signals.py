@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .deletion import set_based
+from .events import publish_progress
+from .models import Goal, Player, ProcessGoal, User
+from .stats import mark_stale
+from .sync import record_deletion, record_moved_goal, record_moved_player
+from .thumbnails import delete_thumbnails, has_thumbnails, schedule_thumbnails
+
+
+@receiver(post_save, sender=User)
+def generate_profile_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """Queue thumbnails for a user's new profile picture and remove those of the replaced one"""
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    picture = instance.profile_picture
+    # The record says whether the variants exist, without asking the storage
+    if picture and not has_thumbnails(instance):
+        schedule_thumbnails(picture)
+    previous = getattr(instance, '_loaded_profile_picture', None)
+    instance._loaded_profile_picture = picture.name or None
+    if previous and previous != picture.name:
+        variants = instance.profile_thumbnails or {}
+        if variants.get('source') == previous:
+            transaction.on_commit(lambda: _delete_unused_thumbnails(previous, variants))
+
+
+def _delete_unused_thumbnails(name, variants):
+    # Pictures are named after their content, so another user may have the same one
+    if not User.objects.filter(profile_picture=name).exists():
+        delete_thumbnails(variants)
+
+
+@receiver(post_save, sender=Goal)
+def publish_goal_progress(sender, instance, created, raw=False, **kwargs):
+    """Push a goal's new progress to its coach's live stream"""
+    if raw or not (created or instance.progress_changed()):
+        return
+    instance._loaded_progress = instance.progress
+    publish_progress(goal_ids=[instance.pk])
+
+
+@receiver(post_save, sender=ProcessGoal)
+def publish_process_goal_progress(sender, instance, created, raw=False, **kwargs):
+    """Push a process goal's new progress, and its goal's rollup, to the coach"""
+    if raw or not (created or instance.progress_changed()):
+        return
+    instance._loaded_progress = instance.progress
+    publish_progress(process_goal_ids=[instance.pk])
+
+
+@receiver(post_save, sender=User)
+def touch_synced_player(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The sync API returns a player's name and email, so a change to them changes the player"""
+    if raw or (update_fields is not None and not {'first_name', 'last_name', 'email'} & set(update_fields)):
+        return
+    Player.objects.filter(user=instance).update(updated_at=timezone.now())
+
+
+# Registered before refresh_goal_player_stats, which resets _loaded_player_id
+@receiver(post_save, sender=Goal)
+def record_goal_move(sender, instance, raw=False, **kwargs):
+    """Tell the sync clients of a goal's previous coach or player that it left their view"""
+    if raw:
+        return
+    record_moved_goal(instance)
+    instance._loaded_coach_id = instance.coach_id
+
+
+@receiver(post_save, sender=Goal)
+def refresh_goal_player_stats(sender, instance, raw=False, **kwargs):
+    """Recompute the stats of the goal's player, and of its previous player if it moved"""
+    if raw:
+        return
+    mark_stale(player_ids={instance.player_id, getattr(instance, '_loaded_player_id', None)} - {None})
+    instance._loaded_player_id = instance.player_id
+
+
+@receiver(post_save, sender=ProcessGoal)
+def refresh_process_goal_player_stats(sender, instance, raw=False, **kwargs):
+    """A process goal changes its goal's completion percentage"""
+    if not raw:
+        mark_stale(goal_ids=[instance.main_goal_id])
+
+
+@receiver(post_save, sender=Player)
+def record_player_move(sender, instance, raw=False, **kwargs):
+    """Tell the sync clients of a player's previous coach that the player left their view"""
+    if raw:
+        return
+    record_moved_player(instance)
+    instance._loaded_coach_id = instance.coach_id
+
+
+@receiver(post_save, sender=Player)
+def refresh_player_stats_row(sender, instance, raw=False, **kwargs):
+    """Create the stats row of a new player and keep its copy of the coach current"""
+    if not raw:
+        mark_stale(player_ids=[instance.pk])
+
+
+# fast_delete's callers record these with sync.record_deletions
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Goal)
+@receiver(post_delete, sender=ProcessGoal)
+@set_based
+def record_sync_deletion(sender, instance, **kwargs):
+    """Tell the sync clients that could see a deleted player, goal or process goal"""
+    record_deletion(instance)
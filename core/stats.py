@@ -0,0 +1,143 @@
+"""Materialized per-player goal statistics (``PlayerStats``).
+
+Ranking a squad by goal completion would otherwise mean computing
+``Goal.get_completion_percentage`` for every goal of every player. Instead
+each change marks the players it affects as stale (``mark_stale``), and when
+the transaction commits their rows are recomputed in one query and written
+with one upsert. Saves are caught by the receivers in core/signals.py;
+set-based updates and deletions (core/bulk.py, core/archive.py, the admin)
+call ``mark_stale`` themselves, as they do for the progress events.
+
+``overdue_goals`` only changes on a save or when a target date passes, so
+``rebuild_player_stats`` should also run daily to pick up the latter.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .deletion import cascade_querysets
+from .models import PROGRESS_PERCENTAGES, Goal, Player, PlayerStats, ProcessGoal
+
+STAT_FIELDS = ('coach', 'goals_total', 'goals_completed', 'average_completion', 'overdue_goals')
+
+# ?sort= value -> (label, ordering); each ordering has a matching PlayerStats index
+LEADERBOARD_ORDERS = {
+    'completion': ('Average completion', ('-average_completion', '-goals_completed')),
+    'completed': ('Goals completed', ('-goals_completed', '-average_completion')),
+    'goals': ('Total goals', ('-goals_total', '-average_completion')),
+    'overdue': ('Overdue goals', ('-overdue_goals', 'average_completion')),
+}
+DEFAULT_LEADERBOARD_ORDER = 'completion'
+
+
+def compute_stats(player_ids):
+    """``{player_id: PlayerStats}`` for the existing players among ``player_ids``"""
+    today = timezone.now().date()
+    stats = {
+        pk: PlayerStats(player_id=pk, coach_id=coach_id)
+        for pk, coach_id in Player.objects.filter(pk__in=player_ids).values_list('pk', 'coach_id')
+    }
+    percentages = defaultdict(list)
+    goals = (
+        Goal.objects.filter(player_id__in=stats)
+        .order_by()
+        .annotate(
+            steps=Count('process_goals'),
+            steps_completed=Count('process_goals', filter=Q(process_goals__progress='completed')),
+        )
+        .values('player_id', 'progress', 'target_date', 'steps', 'steps_completed')
+    )
+    for goal in goals:
+        row = stats[goal['player_id']]
+        row.goals_total += 1
+        if goal['progress'] == 'completed':
+            row.goals_completed += 1
+        elif goal['target_date'] and goal['target_date'] < today:
+            row.overdue_goals += 1
+        # Same rule as Goal.get_completion_percentage
+        if goal['steps']:
+            percentages[goal['player_id']].append(int(goal['steps_completed'] / goal['steps'] * 100))
+        else:
+            percentages[goal['player_id']].append(PROGRESS_PERCENTAGES.get(goal['progress'], 0))
+    for player_id, values in percentages.items():
+        stats[player_id].average_completion = sum(values) / len(values)
+    return stats
+
+
+def refresh_player_stats(player_ids):
+    """Recompute the stats rows of ``player_ids``; returns how many were written"""
+    player_ids = set(player_ids)
+    stats = compute_stats(player_ids)
+    now = timezone.now()
+    for row in stats.values():
+        # bulk_create skips auto_now on the update path
+        row.refreshed_at = now
+    PlayerStats.objects.bulk_create(
+        stats.values(), update_conflicts=True, unique_fields=['player'],
+        update_fields=[*STAT_FIELDS, 'refreshed_at'],
+    )
+    # Players deleted since they were marked take their row with them
+    PlayerStats.objects.filter(player_id__in=player_ids - set(stats)).delete()
+    return len(stats)
+
+
+def rebuild_player_stats(batch_size=500):
+    """Recompute every player's row, ``batch_size`` players per transaction"""
+    player_ids = list(Player.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(player_ids), batch_size):
+        with transaction.atomic():
+            refresh_player_stats(player_ids[start:start + batch_size])
+    PlayerStats.objects.exclude(player_id__in=Player.objects.values('pk')).delete()
+    return len(player_ids)
+
+
+def _flush(connection):
+    pending = connection.__dict__.pop('_stale_player_stats', None)
+    if not pending:
+        return
+    player_ids = set(pending['players'])
+    if pending['goals']:
+        player_ids.update(Goal.objects.filter(pk__in=pending['goals']).values_list('player_id', flat=True))
+    refresh_player_stats(player_ids)
+
+
+def mark_stale(player_ids=(), goal_ids=(), using=None):
+    """Refresh the stats of these players (and the owners of these goals) on commit.
+
+    Everything marked in one transaction is refreshed together, once.
+    """
+    connection = transaction.get_connection(using)
+    pending = connection.__dict__.setdefault('_stale_player_stats', {'players': set(), 'goals': set()})
+    pending['players'].update(player_ids)
+    pending['goals'].update(goal_ids)
+    # Outside a transaction this runs at once. Extra callbacks find nothing
+    # left to do, and ids left behind by a rollback are refreshed next time.
+    transaction.on_commit(lambda: _flush(connection), using=using)
+
+
+def mark_stale_for_deletion(queryset):
+    """Mark the players whose stats change when ``queryset`` and its cascade are deleted"""
+    for related in cascade_querysets(queryset):
+        # Read the players now; the goals may be gone when the stats are refreshed
+        if related.model is Goal:
+            mark_stale(player_ids=related.values_list('player_id', flat=True).distinct())
+        elif related.model is ProcessGoal:
+            mark_stale(player_ids=related.values_list('main_goal__player_id', flat=True).distinct())
+
+
+def leaderboard(stats, order=DEFAULT_LEADERBOARD_ORDER):
+    """``stats`` (a ``PlayerStats`` queryset) ranked by ``order``, with the players loaded"""
+    _label, ordering = LEADERBOARD_ORDERS.get(order, LEADERBOARD_ORDERS[DEFAULT_LEADERBOARD_ORDER])
+    return stats.filter(player__is_active=True).select_related('player__user').order_by(*ordering)
+
+
+def player_ordering(order):
+    """``Player`` ordering for a leaderboard ``order``; players without stats sort last"""
+    _label, ordering = LEADERBOARD_ORDERS[order]
+    return [
+        F(f'stats__{name.lstrip("-")}').desc(nulls_last=True) if name.startswith('-')
+        else F(f'stats__{name}').asc(nulls_last=True)
+        for name in ordering
+    ]
@@ -0,0 +1,245 @@
+"""Delta sync for the mobile clients (``GET /api/v1/sync/``).
+
+A client sends the cursor from its last sync and gets back the players,
+goals and process goals it can see that changed since then. It also gets the
+ids of the rows that were deleted or moved out of its view; those are read
+from ``Tombstone``. Changes are found by ``updated_at`` (``removed_at`` for
+tombstones) within a window ``(since, until]``. ``until`` trails the clock by
+``SYNC_LAG_SECONDS``, so a row saved by a transaction that has not committed
+yet, or by a server whose clock runs slightly behind, falls into the next
+window instead of being skipped.
+
+The window is walked in ``(timestamp, id)`` order, tombstones first, at most
+``limit`` rows per response. Each response's cursor resumes the walk. The
+last one (``has_more`` false) starts the next sync where this one ended, so
+a cursor never moves backwards.
+
+``update()`` skips ``auto_now``, so set-based changes set ``updated_at``
+themselves (core/bulk.py, core/ordering.py). Deletions are recorded by the
+``post_delete`` receivers in core/signals.py, except those made with
+``fast_delete``, which sends no signals; its callers call
+``record_deletions`` first. Code that moves rows to another coach or player
+in bulk records their tombstones through this module too.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .deletion import can_fast_delete, cascade_querysets
+from .models import Coach, Goal, Player, ProcessGoal, Tombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Model -> (tombstone kind, values_list() of id, coach id and player id)
+TRACKED = {
+    Player: (Tombstone.Kind.PLAYER, ('pk', 'coach_id', 'pk')),
+    Goal: (Tombstone.Kind.GOAL, ('pk', 'coach_id', 'player_id')),
+    ProcessGoal: (Tombstone.Kind.PROCESS_GOAL, ('pk', 'main_goal__coach_id', 'main_goal__player_id')),
+}
+
+# Kind -> key of the response's "deleted" object
+DELETED_KEYS = {
+    Tombstone.Kind.PLAYER: 'players',
+    Tombstone.Kind.GOAL: 'goals',
+    Tombstone.Kind.PROCESS_GOAL: 'process_goals',
+}
+
+
+class CursorError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _bury(kind, rows, deleted=True, coach=True, player=True):
+    Tombstone.objects.bulk_create([
+        Tombstone(
+            kind=kind, object_id=object_id, deleted=deleted,
+            coach_id=coach_id if coach else None, player_id=player_id if player else None,
+        )
+        for object_id, coach_id, player_id in rows
+        if deleted or (coach and coach_id) or (player and player_id)
+    ], batch_size=500)
+
+
+def record_deletion(instance):
+    """Tombstone for a deleted player, goal or process goal"""
+    if isinstance(instance, Player):
+        row = (instance.pk, instance.coach_id, instance.pk)
+    elif isinstance(instance, Goal):
+        row = (instance.pk, instance.coach_id, instance.player_id)
+    else:
+        # A goal's steps are deleted before the goal itself
+        owners = Goal.objects.filter(pk=instance.main_goal_id).values_list('coach_id', 'player_id').first()
+        row = (instance.pk, *(owners or (None, None)))
+    _bury(TRACKED[type(instance)][0], [row])
+
+
+def record_deletions(queryset):
+    """Tombstones for the players, goals and process goals ``fast_delete(queryset)`` removes.
+
+    Call it before deleting. When ``fast_delete`` has to fall back to
+    ``QuerySet.delete()`` the ``post_delete`` receivers record them instead.
+    """
+    if not can_fast_delete(queryset.model):
+        return
+    for related in cascade_querysets(queryset):
+        if related.model in TRACKED:
+            kind, columns = TRACKED[related.model]
+            _bury(kind, related.values_list(*columns))
+
+
+def _move_steps(goal_ids, coach, player):
+    steps = ProcessGoal.objects.filter(main_goal_id__in=goal_ids)
+    _bury(Tombstone.Kind.PROCESS_GOAL, steps.values_list(*TRACKED[ProcessGoal][1]),
+          deleted=False, coach=coach, player=player)
+    # The steps enter the view of the goal's new coach or player with it
+    steps.update(updated_at=timezone.now())
+
+
+def record_goal_moves(goals, coach=False, player=False):
+    """Tombstones for goals (and their steps) leaving their current coach's or player's view.
+
+    Call it before the update that moves them.
+    """
+    goal_ids = list(goals.values_list('pk', flat=True))
+    _bury(Tombstone.Kind.GOAL, Goal.objects.filter(pk__in=goal_ids).values_list(*TRACKED[Goal][1]),
+          deleted=False, coach=coach, player=player)
+    _move_steps(goal_ids, coach, player)
+
+
+def record_player_moves(players):
+    """Tombstones for players leaving their current coach's view; call it before moving them"""
+    _bury(Tombstone.Kind.PLAYER, players.values_list(*TRACKED[Player][1]), deleted=False, player=False)
+
+
+def record_moved_goal(goal):
+    """Tombstones for a saved goal that was loaded with another coach or player"""
+    coach_id = getattr(goal, '_loaded_coach_id', None)
+    player_id = getattr(goal, '_loaded_player_id', None)
+    moved_from_coach = coach_id not in (None, goal.coach_id)
+    moved_from_player = player_id not in (None, goal.player_id)
+    if not (moved_from_coach or moved_from_player):
+        return
+    rows = [(goal.pk, coach_id, player_id)]
+    _bury(Tombstone.Kind.GOAL, rows, deleted=False, coach=moved_from_coach, player=moved_from_player)
+    steps = goal.process_goals.all()
+    _bury(Tombstone.Kind.PROCESS_GOAL, [(pk, coach_id, player_id) for pk in steps.values_list('pk', flat=True)],
+          deleted=False, coach=moved_from_coach, player=moved_from_player)
+    steps.update(updated_at=timezone.now())
+
+
+def record_moved_player(player):
+    """Tombstone for a saved player that was loaded with another coach"""
+    coach_id = getattr(player, '_loaded_coach_id', None)
+    if coach_id not in (None, player.coach_id):
+        _bury(Tombstone.Kind.PLAYER, [(player.pk, coach_id, None)], deleted=False, player=False)
+
+
+def _micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def _moment(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``[since]`` after a finished sync, ``[since, until, part, after_time, after_id]`` within one"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorError('Invalid cursor')
+    if not (
+        isinstance(state, list) and len(state) in (1, 5)
+        and all(value is None or type(value) is int for value in state)
+        and (len(state) == 1 or (state[1] is not None and state[2] is not None))
+    ):
+        raise CursorError('Invalid cursor')
+    return state
+
+
+def tombstones(user):
+    """Tombstones of the rows that left ``user``'s view, with ``changed_at``"""
+    if user.is_admin():
+        # Admins see every row, so only real deletions leave their view
+        queryset = Tombstone.objects.filter(deleted=True)
+    elif user.is_coach():
+        queryset = Tombstone.objects.filter(coach__in=Coach.objects.filter(user=user).values('pk'))
+    else:
+        queryset = Tombstone.objects.filter(player__in=Player.objects.filter(user=user).values('pk'))
+    return queryset.values('id', 'kind', 'object_id').annotate(changed_at=F('removed_at'))
+
+
+def _window(queryset, since, until, after_time, after_id):
+    queryset = queryset.filter(changed_at__lte=_moment(until))
+    if since is not None:
+        queryset = queryset.filter(changed_at__gt=_moment(since))
+    if after_time is not None:
+        moment = _moment(after_time)
+        queryset = queryset.filter(Q(changed_at__gt=moment) | Q(changed_at=moment, id__gt=after_id))
+    return queryset.order_by('changed_at', 'id')
+
+
+def changes(parts, cursor, limit):
+    """The next ``limit`` changed rows of ``parts`` after ``cursor``.
+
+    ``parts`` is a list of ``(key, queryset)``. The first is the user's
+    ``tombstones()``; the others are ``values()`` querysets annotated with
+    ``changed_at``. Returns the response body.
+    """
+    now = timezone.now()
+    state = decode_cursor(cursor) if cursor else [None]
+    if state[0] is not None and _moment(state[0]) < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise CursorError('The cursor is older than the kept deletions; sync again without a cursor', status=410)
+    if len(state) == 1:
+        # A new sync: fix the end of its window, never before the start. A
+        # first sync sends every row, so it skips the tombstones.
+        since = state[0]
+        until = max(_micros(now - timedelta(seconds=settings.SYNC_LAG_SECONDS)), since or 0)
+        state = [since, until, 0 if since is not None else 1, None, None]
+    since, until, part, after_time, after_id = state
+
+    body = {key: [] for key, _queryset in parts[1:]}
+    body['deleted'] = {key: [] for key in DELETED_KEYS.values()}
+    remaining = limit
+    for index in range(part, len(parts)):
+        key, queryset = parts[index]
+        rows = list(_window(queryset, since, until, after_time, after_id)[:remaining + 1])
+        more = len(rows) > remaining
+        rows = rows[:remaining]
+        remaining -= len(rows)
+        if rows:
+            after_time, after_id = _micros(rows[-1]['changed_at']), rows[-1]['id']
+        for row in rows:
+            del row['changed_at']
+            if index == 0:
+                body['deleted'][DELETED_KEYS[row['kind']]].append(row['object_id'])
+            else:
+                body[key].append(row)
+        if more:
+            body.update(cursor=encode_cursor([since, until, index, after_time, after_id]), has_more=True)
+            return body
+        after_time = after_id = None
+    body.update(cursor=encode_cursor([until]), has_more=False)
+    return body
+
+
+def purge_tombstones(batch_size=5000):
+    """Delete tombstones older than ``SYNC_TOMBSTONE_DAYS`` in batches; returns how many"""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted = 0
+    while True:
+        ids = list(Tombstone.objects.filter(removed_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Tombstone.objects.filter(pk__in=ids).delete()[0]
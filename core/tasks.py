@@ -0,0 +1,12 @@
+"""Handlers for background tasks run by ``manage.py run_worker``"""
+from django.core.files.storage import default_storage
+
+from .queue import task
+from .thumbnails import record_thumbnails, render_thumbnails
+
+
+@task('generate_thumbnails')
+def generate_thumbnails(name):
+    """Render the avatar variants for the stored image ``name`` and record them on its users"""
+    if default_storage.exists(name):
+        record_thumbnails(name, render_thumbnails(default_storage.path(name)))
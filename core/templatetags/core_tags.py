@@ -0,0 +1,23 @@
+from django import template
+from django.utils.html import format_html_join
+
+from ..assets import bundle_urls
+from ..thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(image, size='small'):
+    """Usage: ``{{ user.profile_picture|thumbnail:'medium' }}``"""
+    return thumbnail_url(image, size)
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """Usage: ``{% asset_bundle 'app.js' %}``; bundles are defined in core/assets.py"""
+    if name.endswith('.css'):
+        tag = '<link href="{}" rel="stylesheet">'
+    else:
+        tag = '<script src="{}"></script>'
+    return format_html_join('\n', tag, ((url,) for url in bundle_urls(name)))
@@ -1,3 +1,1374 @@
-from django.test import TestCase
+import io
+import os
+import runpy
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from PIL import Image
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_delete
+from django.http import Http404
+from django.test import (
+    AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings,
+    skipUnlessDBFeature,
+)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import bulk, events, queue, thumbnails
+from .admin import CoachAdmin
+from .api import encode_cursor as encode_api_cursor
+from .archive import archivable_goals
+from .async_utils import run_concurrently
+from .deletion import can_fast_delete, cascade_counts, fast_delete
+from .digests import build_digests, send_digests
+from .forms import PlayerPicker
+from .media import RangeFile, serve_media
+from .models import (
+    COMMENT_MAX_LENGTH, Area, Coach, Goal, GoalComment, GoalTemplate, Player, PlayerStats, ProcessGoal,
+    ProcessGoalComment, ProcessGoalTemplate, Progress, Task, User,
+)
+from .ordering import GAP, OrderingError, move_process_goal
+from .sync import CursorError, _micros, decode_cursor, encode_cursor
+from .throttle import TokenBucket, parse_rate, take_token
+
+
+def make_coach(username):
+    user = User.objects.create_user(username, password='pw', role=User.Role.COACH)
+    return Coach.objects.create(user=user)
+
+
+def make_player(username, coach=None):
+    user = User.objects.create_user(username, password='pw', role=User.Role.PLAYER)
+    return Player.objects.create(user=user, coach=coach)
+
+
+def make_goal(player, coach, steps=0, **fields):
+    goal = Goal.objects.create(name='Goal', player=player, coach=coach, **fields)
+    for index in range(steps):
+        ProcessGoal.objects.create(name=f'Step {index + 1}', main_goal=goal, order=(index + 1) * GAP)
+    return goal
+
+
+class FastDeleteTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.players = [make_player(f'player-{index}', self.coach) for index in range(2)]
+        for player in self.players:
+            goal = make_goal(player, self.coach, steps=2)
+            GoalComment.objects.create(goal=goal, author=self.coach.user, body='Note')
+            ProcessGoalComment.objects.create(process_goal=goal.process_goals.first(), body='Note')
+
+    def test_removes_children_before_parents(self):
+        fast_delete(User.objects.filter(pk=self.coach.user.pk))
+        # Every remaining foreign key still points at an existing row
+        connection.check_constraints()
+        self.assertFalse(Coach.objects.exists())
+        self.assertFalse(Goal.objects.exists())
+        self.assertFalse(ProcessGoal.objects.exists())
+        self.assertFalse(GoalComment.objects.exists())
+        self.assertFalse(ProcessGoalComment.objects.exists())
+        # Player.coach is SET_NULL, so the players stay without a coach
+        self.assertEqual(Player.objects.filter(coach=None).count(), 2)
+
+    def test_returns_what_queryset_delete_returns(self):
+        queryset = User.objects.filter(pk=self.coach.user.pk)
+        with transaction.atomic():
+            expected = queryset.delete()
+            transaction.set_rollback(True)
+        self.assertEqual(fast_delete(queryset), expected)
+
+    def test_cascade_counts_match_deleted_rows(self):
+        queryset = User.objects.filter(pk=self.coach.user.pk)
+        counts = {model._meta.label: count for model, count in cascade_counts(queryset).items() if count}
+        _deleted, per_model = fast_delete(queryset)
+        self.assertEqual(counts, per_model)
+
+    def test_falls_back_when_a_receiver_needs_the_objects(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        goal_ids = set(Goal.objects.values_list('pk', flat=True))
+        post_delete.connect(receiver, sender=Goal)
+        try:
+            self.assertFalse(can_fast_delete(Coach))
+            fast_delete(Coach.objects.filter(pk=self.coach.pk))
+        finally:
+            post_delete.disconnect(receiver, sender=Goal)
+        self.assertEqual(set(deleted), goal_ids)
+        self.assertFalse(Goal.objects.exists())
+
+    def test_set_based_receivers_keep_the_fast_path(self):
+        # core.signals records sync tombstones with post_delete receivers
+        # registered through deletion.set_based
+        self.assertTrue(can_fast_delete(User))
+
+
+class GoalAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        self.coach = make_coach('coach')
+        self.active = make_player('active', self.coach)
+        self.inactive = make_player('inactive', self.coach)
+        Player.objects.filter(pk=self.inactive.pk).update(is_active=False)
+
+    def test_goal_form_rejects_an_inactive_player(self):
+        data = {
+            'name': 'Goal', 'area': 'technical', 'timeframe': 'medium_term', 'progress': 'not_started',
+            'coach': self.coach.pk,
+        }
+        response = self.client.post(reverse('admin:core_goal_add'), {**data, 'player': self.inactive.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('player', response.context['adminform'].form.errors)
+        response = self.client.post(reverse('admin:core_goal_add'), {**data, 'player': self.active.pk})
+        self.assertEqual(response.status_code, 302)
+
+    def test_player_filters_find_inactive_players(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'goal', 'field_name': 'player', 'term': '',
+        })
+        ids = {int(result['id']) for result in response.json()['results']}
+        self.assertEqual(ids, {self.active.pk, self.inactive.pk})
+
+
+class BulkAdminActionTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        self.coach = make_coach('coach')
+        self.players = [make_player(f'player-{index}', self.coach) for index in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.goals = [make_goal(player, self.coach, steps=2) for player in self.players]
+            self.goals[0].process_goals.filter(order=GAP).update(progress='completed')
+
+    def act(self, model, action, objects, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(f'admin:core_{model}_changelist'), {
+                'action': action, '_selected_action': [obj.pk for obj in objects], **data,
+            })
+
+    def progress(self, model=Goal):
+        return dict(model.objects.values_list('pk', 'progress'))
+
+    def test_goal_actions_update_the_goals_and_their_steps(self):
+        before = Goal.objects.get(pk=self.goals[0].pk).updated_at
+        self.act('goal', 'mark_completed', self.goals[:1])
+        self.assertEqual(self.progress()[self.goals[0].pk], 'completed')
+        self.assertEqual(set(self.goals[0].process_goals.values_list('progress', flat=True)), {'completed'})
+        self.assertGreater(Goal.objects.get(pk=self.goals[0].pk).updated_at, before)
+        self.assertEqual(self.progress()[self.goals[1].pk], 'not_started')
+        self.assertEqual(PlayerStats.objects.get(player=self.players[0]).goals_completed, 1)
+
+        self.act('goal', 'reset_process_goals', self.goals[:1])
+        self.assertEqual(self.progress()[self.goals[0].pk], 'not_started')
+        self.assertEqual(set(self.goals[0].process_goals.values_list('progress', flat=True)), {'not_started'})
+        self.assertEqual(PlayerStats.objects.get(player=self.players[0]).goals_completed, 0)
+
+    def test_process_goal_actions_roll_up_to_the_goal(self):
+        steps = list(self.goals[0].process_goals.all())
+        self.act('processgoal', 'mark_completed', steps)
+        self.assertEqual(self.progress()[self.goals[0].pk], 'completed')
+        stats = PlayerStats.objects.get(player=self.players[0])
+        self.assertEqual((stats.goals_completed, stats.average_completion), (1, 100))
+
+        self.act('processgoal', 'reset_progress', steps[1:])
+        self.assertEqual(self.progress(ProcessGoal)[steps[1].pk], 'not_started')
+        self.assertEqual(self.progress()[self.goals[0].pk], 'in_progress')
+        self.assertEqual(PlayerStats.objects.get(player=self.players[0]).average_completion, 50)
+
+    def test_player_actions(self):
+        self.act('player', 'deactivate_players', self.players[:1])
+        self.assertEqual(dict(Player.objects.values_list('pk', 'is_active')), {
+            self.players[0].pk: False, self.players[1].pk: True,
+        })
+        self.act('player', 'activate_players', self.players)
+        self.assertTrue(all(Player.objects.values_list('is_active', flat=True)))
+
+    def test_reassign_coach_asks_for_the_coach_first(self):
+        other = make_coach('other')
+        response = self.act('player', 'reassign_coach', self.players[:1])
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin/core/player/reassign_coach.html')
+        self.assertEqual(Player.objects.get(pk=self.players[0].pk).coach, self.coach)
+
+        self.act(
+            'player', 'reassign_coach', self.players[:1], apply='1', coach=other.pk, transfer_open_goals='on',
+        )
+        self.assertEqual(Player.objects.get(pk=self.players[0].pk).coach, other)
+        self.assertEqual(Goal.objects.get(pk=self.goals[0].pk).coach, other)
+        self.assertEqual(Goal.objects.get(pk=self.goals[1].pk).coach, self.coach)
+        self.assertEqual(PlayerStats.objects.get(player=self.players[0]).coach, other)
+
+
+class TokenBucketTests(TestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('3/hour'), (3, 3600))
+        with self.assertRaises(ValueError):
+            parse_rate('10 per minute')
+
+    def test_refills_evenly_up_to_capacity(self):
+        bucket = TokenBucket('key', '10/m')
+        self.assertEqual(bucket.refill(None, 100.0), 10)
+        self.assertEqual(bucket.refill((0, 100.0), 106.0), 1)
+        self.assertEqual(bucket.refill((5, 100.0), 1000.0), 10)
+        self.assertEqual(bucket.wait(0.5), 3)
+
+    def test_takes_from_every_bucket_or_none(self):
+        cache = caches['default']
+        cache.clear()
+        take = async_to_sync(take_token)
+        roomy, tight = TokenBucket('roomy', '5/m'), TokenBucket('tight', '1/m')
+        self.assertEqual(take(cache, [roomy, tight]), 0)
+        self.assertAlmostEqual(take(cache, [roomy, tight]), 60, delta=1)
+        # The refused request left the roomy bucket's token alone
+        self.assertAlmostEqual(cache.get('roomy')[0], 4, delta=0.1)
+
+
+@override_settings(THROTTLE_CACHE='default', PROGRESS_RATE_PER_USER='100/m', PROGRESS_RATE_PER_OBJECT='2/m')
+class ProgressThrottleTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.coach = make_coach('coach')
+        self.goal = make_goal(make_player('player', self.coach), self.coach)
+
+    def post(self, user, progress='in_progress'):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('core:goal_progress_update', args=[self.goal.pk]), {'progress': progress},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_limits_updates_of_one_goal(self):
+        self.assertEqual(self.post(self.coach.user, 'in_progress').status_code, 200)
+        self.assertEqual(self.post(self.coach.user, 'completed').status_code, 200)
+        response = self.post(self.coach.user, 'not_started')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_refused_updates_leave_the_goal_bucket_alone(self):
+        stranger = make_player('stranger').user
+        for _ in range(3):
+            self.assertEqual(self.post(stranger).status_code, 403)
+        self.assertEqual(self.post(self.coach.user).status_code, 200)
+
+    def test_replays_a_repeat_from_the_same_user_only(self):
+        admin = User.objects.create_user('admin', password='pw', role=User.Role.ADMIN)
+        self.assertEqual(self.post(self.coach.user, 'completed').status_code, 200)
+        self.assertEqual(self.post(self.coach.user, 'completed')['Idempotent-Replayed'], 'true')
+        response = self.post(admin, 'completed')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+
+@override_settings(TASKS_EAGER=True)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = make_player('player').user
+
+    def upload(self, user, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), color).save(buffer, 'PNG')
+        user.profile_picture = SimpleUploadedFile('me.png', buffer.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        return User.objects.get(pk=user.pk)
+
+    def test_variants_are_recorded_and_rendered_without_a_storage_lookup(self):
+        user = self.upload(self.user, 'red')
+        variants = user.profile_thumbnails
+        self.assertEqual(variants['source'], user.profile_picture.name)
+        for size in thumbnails.THUMBNAIL_SIZES:
+            self.assertTrue(default_storage.exists(variants[size]))
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('storage lookup')):
+            url = thumbnails.thumbnail_url(user.profile_picture, 'small')
+            self.assertEqual(url, default_storage.url(variants['small']))
+            # Until its variants are recorded a picture is shown as it is
+            user.profile_thumbnails = {**variants, 'source': 'profile_pictures/other.png'}
+            self.assertEqual(thumbnails.thumbnail_url(user.profile_picture, 'small'), user.profile_picture.url)
+            self.assertEqual(thumbnails.thumbnail_url(None, 'small'), '')
+
+    def test_rendering_again_never_rewrites_a_variant(self):
+        user = self.upload(self.user, 'red')
+        source = user.profile_picture.path
+        with mock.patch('os.replace') as replace:
+            self.assertEqual(
+                thumbnails.render_thumbnails(source),
+                {size: os.path.relpath(user.profile_thumbnails[size], 'profile_pictures') for size in thumbnails.THUMBNAIL_SIZES},
+            )
+        replace.assert_not_called()
+        # Different output gets different names; the old files stay for cached pages
+        options = {**thumbnails.SAVE_OPTIONS, thumbnails.THUMBNAIL_FORMAT: {'quality': 40}}
+        with mock.patch.object(thumbnails, 'SAVE_OPTIONS', options):
+            variants = thumbnails.render_thumbnails(source)
+        self.assertNotEqual(variants['large'], os.path.relpath(user.profile_thumbnails['large'], 'profile_pictures'))
+        self.assertTrue(default_storage.exists(user.profile_thumbnails['large']))
+
+    def test_backfill_records_missing_variants(self):
+        user = self.upload(self.user, 'red')
+        recorded = user.profile_thumbnails
+        User.objects.filter(pk=user.pk).update(profile_thumbnails={})
+        output = io.StringIO()
+        call_command('backfill_thumbnails', '--workers', '1', stdout=output)
+        self.assertIn('Processed 1 pictures: 1 rendered, 0 failed.', output.getvalue())
+        self.assertEqual(User.objects.get(pk=user.pk).profile_thumbnails, recorded)
+        call_command('backfill_thumbnails', '--workers', '1', stdout=output)
+        self.assertIn('Processed 0 pictures', output.getvalue())
+
+    def test_replaced_pictures_lose_their_variants(self):
+        user = self.upload(self.user, 'red')
+        old = user.profile_thumbnails
+        user = self.upload(user, 'blue')
+        self.assertNotEqual(user.profile_thumbnails['source'], old['source'])
+        for size in thumbnails.THUMBNAIL_SIZES:
+            self.assertFalse(default_storage.exists(old[size]))
+            self.assertTrue(default_storage.exists(user.profile_thumbnails[size]))
+
+
+@override_settings(THROTTLE_CACHE='default')
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.coach = make_coach('coach')
+        self.player = make_player('player', self.coach)
+        self.goal = make_goal(self.player, self.coach)
+
+    def asgi(self, method, *args, user=None, **kwargs):
+        client = AsyncClient()
+        if user is not None:
+            client.force_login(user)
+
+        async def request():
+            return await getattr(client, method)(*args, **kwargs)
+        return async_to_sync(request)()
+
+    def test_login_required_redirects_anonymous_users(self):
+        expected = f"{reverse('core:login')}?next={reverse('core:dashboard')}"
+        self.assertRedirects(self.client.get(reverse('core:dashboard')), expected, fetch_redirect_response=False)
+        response = self.asgi('get', reverse('core:dashboard'))
+        self.assertRedirects(response, expected, fetch_redirect_response=False)
+
+    def test_admin_dashboard(self):
+        self.client.force_login(User.objects.create_user('admin', password='pw', role=User.Role.ADMIN))
+        response = self.client.get(reverse('core:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['total_users'], response.context['total_players']), (3, 1))
+        self.assertEqual(response.context['recent_players'], [self.player])
+
+    def test_coach_dashboard(self):
+        self.client.force_login(self.coach.user)
+        response = self.client.get(reverse('core:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['players'], [self.player])
+        self.assertEqual(response.context['total_players'], 1)
+
+    def test_player_dashboard_under_asgi(self):
+        response = self.asgi('get', reverse('core:dashboard'), user=self.player.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['coach'], self.coach)
+
+    def test_queries_run_in_parallel_only_under_asgi(self):
+        def current_thread():
+            return threading.get_ident()
+
+        caller = threading.get_ident()
+        request = RequestFactory().get('/')
+        threads = async_to_sync(run_concurrently)(request, first=current_thread, second=current_thread)
+        self.assertEqual(threads, {'first': caller, 'second': caller})
+        request = AsyncRequestFactory().get('/')
+        threads = async_to_sync(run_concurrently)(request, first=current_thread, second=current_thread)
+        self.assertNotIn(caller, threads.values())
+
+    def test_progress_update_under_asgi(self):
+        response = self.asgi(
+            'post', reverse('core:goal_progress_update', args=[self.goal.pk]), {'progress': 'completed'},
+            user=self.coach.user, headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Goal.objects.get(pk=self.goal.pk).progress, 'completed')
+
+    def test_progress_stream_needs_a_coach_and_asgi(self):
+        self.client.force_login(self.player.user)
+        self.assertEqual(self.client.get(reverse('core:progress_stream')).status_code, 403)
+        self.client.force_login(self.coach.user)
+        self.assertEqual(self.client.get(reverse('core:progress_stream')).status_code, 204)
+
+
+class CodedChoiceFieldTests(TestCase):
+    def setUp(self):
+        coach = make_coach('coach')
+        player = make_player('player', coach)
+        self.goals = {
+            progress: make_goal(player, coach, progress=progress)
+            for progress in ('not_started', 'good_progress', 'completed')
+        }
+
+    def test_stores_the_enum_value_and_loads_the_code(self):
+        goal = self.goals['completed']
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT progress, area FROM core_goal WHERE id = %s', [goal.pk])
+            self.assertEqual(cursor.fetchone(), (Progress.COMPLETED, Area.TECHNICAL))
+        goal.refresh_from_db()
+        self.assertEqual((goal.progress, goal.area), ('completed', 'technical'))
+        self.assertEqual(goal.get_progress_display(), 'Completed')
+        self.assertEqual(Goal.objects.filter(pk=goal.pk).values_list('progress', flat=True).get(), 'completed')
+
+    def test_lookups_take_codes(self):
+        def matching(**lookup):
+            return set(Goal.objects.filter(**lookup).values_list('progress', flat=True))
+
+        self.assertEqual(matching(progress='completed'), {'completed'})
+        self.assertEqual(matching(progress__in=['not_started', 'completed']), {'not_started', 'completed'})
+        self.assertEqual(matching(progress__gte='good_progress'), {'good_progress', 'completed'})
+        self.assertEqual(matching(progress=Progress.GOOD_PROGRESS), {'good_progress'})
+
+    def test_to_python(self):
+        field = Goal._meta.get_field('progress')
+        self.assertEqual(field.to_python('completed'), 'completed')
+        self.assertEqual(field.to_python('4'), 'completed')
+        for value in ('finished', '9', 'x'):
+            with self.assertRaises(ValidationError):
+                field.to_python(value)
+        self.assertEqual(field.clean('good_progress', None), 'good_progress')
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Migrates between ``before`` and ``after`` and back to the latest state afterwards"""
+    before = after = None
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def make_coach_and_player(self, apps):
+        User, Coach, Player = (apps.get_model('core', name) for name in ('User', 'Coach', 'Player'))
+        coach = Coach.objects.create(user=User.objects.create(username='coach', role='coach'))
+        return coach, Player.objects.create(user=User.objects.create(username='player', role='player'), coach=coach)
+
+
+class CodedChoiceMigrationTests(MigrationTestCase):
+    before = [('core', '0007_goal_archive')]
+    after = [('core', '0008_coded_choice_fields')]
+
+    def test_rows_keep_their_meaning_both_ways(self):
+        apps = self.migrate(self.before)
+        Goal = apps.get_model('core', 'Goal')
+        coach, player = self.make_coach_and_player(apps)
+        rows = {
+            ('mental', 'long_term', 'excellent_progress'),
+            ('physical', 'short_term', 'not_started'),
+            ('tactical', 'medium_term', 'completed'),
+        }
+        for area, timeframe, progress in rows:
+            Goal.objects.create(
+                name='Goal', player=player, coach=coach, area=area, timeframe=timeframe, progress=progress,
+            )
+
+        Goal = self.migrate(self.after).get_model('core', 'Goal')
+        self.assertEqual(set(Goal.objects.values_list('area', 'timeframe', 'progress')), rows)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT progress FROM core_goal WHERE area = %s", [Area.MENTAL])
+            self.assertEqual(cursor.fetchall(), [(Progress.EXCELLENT_PROGRESS,)])
+
+        Goal = self.migrate(self.before).get_model('core', 'Goal')
+        self.assertEqual(set(Goal.objects.values_list('area', 'timeframe', 'progress')), rows)
+
+
+class NotesMigrationTests(MigrationTestCase):
+    before = [('core', '0009_player_stats')]
+    after = [('core', '0010_goal_comments')]
+
+    def test_notes_become_the_first_note_of_each_thread(self):
+        apps = self.migrate(self.before)
+        Goal, ProcessGoal = apps.get_model('core', 'Goal'), apps.get_model('core', 'ProcessGoal')
+        coach, player = self.make_coach_and_player(apps)
+        noted = Goal.objects.create(name='Noted', player=player, coach=coach, notes='Work on the weak foot')
+        silent = Goal.objects.create(name='Silent', player=player, coach=coach)
+        step = ProcessGoal.objects.create(name='Step', main_goal=silent, notes='Twice a week')
+
+        apps = self.migrate(self.after)
+        GoalComment, ProcessGoalComment = apps.get_model('core', 'GoalComment'), apps.get_model('core', 'ProcessGoalComment')
+        comment = GoalComment.objects.get()
+        self.assertEqual((comment.goal_id, comment.body, comment.author_id), (noted.pk, 'Work on the weak foot', None))
+        self.assertEqual(comment.created_at, noted.updated_at)
+        self.assertEqual(list(ProcessGoalComment.objects.values_list('process_goal_id', 'body')), [(step.pk, 'Twice a week')])
+        GoalComment.objects.create(goal_id=noted.pk, body='Better already')
+
+        apps = self.migrate(self.before)
+        notes = dict(apps.get_model('core', 'Goal').objects.values_list('pk', 'notes'))
+        self.assertEqual(notes, {noted.pk: 'Work on the weak foot\n\nBetter already', silent.pk: ''})
+        self.assertEqual(apps.get_model('core', 'ProcessGoal').objects.get().notes, 'Twice a week')
+
+
+@override_settings(THROTTLE_CACHE='default')
+class ProgressNotesTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.coach = make_coach('coach')
+        self.goal = make_goal(make_player('player', self.coach), self.coach, steps=1)
+        self.step = self.goal.process_goals.get()
+        self.client.force_login(self.coach.user)
+
+    def post(self, name, pk, progress='in_progress', notes=None):
+        data = {'progress': progress} if notes is None else {'progress': progress, 'notes': notes}
+        return self.client.post(reverse(name, args=[pk]), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_notes_are_appended_to_the_goal_thread(self):
+        GoalComment.objects.create(goal=self.goal, body='Earlier')
+        self.assertEqual(self.post('core:goal_progress_update', self.goal.pk, notes='  Good week  ').status_code, 200)
+        self.assertEqual(self.post('core:goal_progress_update', self.goal.pk, 'completed', notes='').status_code, 200)
+        comments = list(self.goal.comments.order_by('id').values_list('body', 'author'))
+        self.assertEqual(comments, [('Earlier', None), ('Good week', self.coach.user.pk)])
+
+    def test_notes_are_appended_to_the_process_goal_thread(self):
+        response = self.post('core:process_goal_progress_update', self.step.pk, notes='Keep going')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.step.comments.values_list('body', 'author')), [('Keep going', self.coach.user.pk)])
+
+    def test_overlong_notes_are_refused_without_saving(self):
+        notes = 'x' * (COMMENT_MAX_LENGTH + 1)
+        self.assertEqual(self.post('core:goal_progress_update', self.goal.pk, notes=notes).status_code, 400)
+        self.assertEqual(self.post('core:process_goal_progress_update', self.step.pk, notes=notes).status_code, 400)
+        self.assertEqual(Goal.objects.get(pk=self.goal.pk).progress, 'not_started')
+        self.assertEqual(ProcessGoal.objects.get(pk=self.step.pk).progress, 'not_started')
+        self.assertFalse(GoalComment.objects.exists() or ProcessGoalComment.objects.exists())
+
+
+@override_settings(TASKS_EAGER=False, TASK_MAX_ATTEMPTS=3, TASK_RETRY_BACKOFF=10, TASK_RETRY_BACKOFF_MAX=60)
+class TaskQueueTests(TransactionTestCase):
+    # Transactional, because pool threads and locks need committed rows
+
+    def setUp(self):
+        self.calls = []
+        registry = mock.patch.dict(queue.REGISTRY, {'test.ok': self.calls.append, 'test.fail': self.fail_task})
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def fail_task(self, value):
+        raise ValueError(value)
+
+    def enqueue(self, name='test.ok', value=1, **kwargs):
+        return queue.enqueue(name, args=[value], **kwargs)
+
+    def test_claims_due_tasks_once(self):
+        due = [self.enqueue(value=index) for index in range(3)]
+        later = self.enqueue(delay=60)
+        first = queue.claim_tasks('first', 2)
+        self.assertEqual(first, [task.pk for task in due[:2]])
+        self.assertEqual(queue.claim_tasks('second', 5), [due[2].pk])
+        self.assertEqual(queue.claim_tasks('third', 5), [])
+        claimed = Task.objects.get(pk=first[0])
+        self.assertEqual((claimed.status, claimed.locked_by), (Task.Status.RUNNING, 'first'))
+        self.assertEqual(Task.objects.get(pk=later.pk).status, Task.Status.QUEUED)
+
+    def test_reclaims_tasks_of_a_dead_worker(self):
+        task = self.enqueue()
+        queue.claim_tasks('dead', 1)
+        self.assertEqual(queue.claim_tasks('alive', 1), [])
+        Task.objects.filter(pk=task.pk).update(started_at=timezone.now() - timedelta(seconds=601))
+        with override_settings(TASK_LEASE_SECONDS=600):
+            self.assertEqual(queue.claim_tasks('alive', 1), [task.pk])
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_skips_rows_locked_by_another_worker(self):
+        locked, free = self.enqueue(), self.enqueue()
+        holding, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    list(Task.objects.select_for_update().filter(pk=locked.pk))
+                    holding.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            holding.wait(10)
+            self.assertEqual(queue.claim_tasks('worker', 5), [free.pk])
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(queue.claim_tasks('worker', 5), [locked.pk])
+
+    def test_successful_task_is_done(self):
+        task = self.enqueue(value='hello')
+        queue.claim_tasks('worker', 1)
+        self.assertTrue(queue.execute_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.Status.DONE, 1))
+        self.assertEqual(self.calls, ['hello'])
+
+    def test_failed_task_is_retried_with_backoff(self):
+        task = self.enqueue('test.fail', 'boom')
+        queue.claim_tasks('worker', 1)
+        before = timezone.now()
+        self.assertFalse(queue.execute_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.locked_by), (Task.Status.QUEUED, 1, ''))
+        self.assertIn('ValueError: boom', task.last_error)
+        # TASK_RETRY_BACKOFF with 20% jitter
+        self.assertGreaterEqual(task.run_at, before + timedelta(seconds=8))
+        self.assertLessEqual(task.run_at, timezone.now() + timedelta(seconds=12))
+        self.assertEqual(queue.claim_tasks('worker', 1), [])
+
+    def test_backoff_doubles_up_to_the_maximum(self):
+        for attempts, low, high in [(1, 8, 12), (2, 16, 24), (3, 32, 48), (6, 48, 72)]:
+            for _ in range(20):
+                self.assertTrue(low <= queue.retry_delay(attempts) <= high, attempts)
+
+    def test_gives_up_after_max_attempts(self):
+        task = self.enqueue('test.fail', max_attempts=2)
+        Task.objects.filter(pk=task.pk).update(attempts=1)
+        queue.claim_tasks('worker', 1)
+        self.assertFalse(queue.execute_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.Status.FAILED, 2))
+        self.assertIsNotNone(task.finished_at)
+
+    def test_unknown_tasks_fail(self):
+        with self.assertRaises(KeyError):
+            self.enqueue('test.missing')
+        task = Task.objects.create(name='test.missing', run_at=timezone.now(), max_attempts=1)
+        self.assertFalse(queue.execute_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.FAILED)
+        self.assertIn('Unknown task', task.last_error)
+
+    def test_eager_mode_runs_inline(self):
+        with override_settings(TASKS_EAGER=True):
+            self.assertIsNone(self.enqueue(value='now'))
+        self.assertEqual(self.calls, ['now'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_worker_drains_due_tasks(self):
+        tasks = [self.enqueue(value=index) for index in range(5)]
+        failing = self.enqueue('test.fail')
+        later = self.enqueue(delay=60)
+        output = io.StringIO()
+        # The command installs signal handlers; keep the test runner's. One
+        # thread at a time, as SQLite's shared test database locks on writes.
+        with mock.patch('signal.signal'):
+            call_command('run_worker', '--once', '--pool', 'thread', '--concurrency', '1', stdout=output)
+        self.assertIn('stopped after 6 tasks', output.getvalue())
+        self.assertEqual(sorted(self.calls), list(range(5)))
+        statuses = dict(Task.objects.values_list('pk', 'status'))
+        self.assertEqual({statuses[task.pk] for task in tasks}, {Task.Status.DONE})
+        self.assertEqual(statuses[failing.pk], Task.Status.QUEUED)
+        self.assertEqual(statuses[later.pk], Task.Status.QUEUED)
+
+
+class MediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name, MEDIA_SENDFILE_BACKEND='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root.name
+        os.makedirs(os.path.join(media_root.name, 'profile_pictures'))
+        self.path = 'profile_pictures/picture.jpg'
+        with open(os.path.join(media_root.name, self.path), 'wb') as file:
+            file.write(bytes(range(100)))
+        self.user = make_player('player').user
+
+    def get(self, path=None, user=None, **headers):
+        request = RequestFactory().get('/media/', headers=headers)
+        request.user = user or self.user
+        return serve_media(request, path or self.path)
+
+    def test_serves_the_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+
+    def test_partial_content(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        response = self.get(Range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+        # A stale If-Range gets the whole file
+        response = self.get(Range='bytes=10-19', If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=100-', 'bytes=50-40', 'bytes=-0'):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_not_modified(self):
+        response = self.get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+        self.assertEqual(self.get(If_Modified_Since=last_modified).status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=http_date(0)).status_code, 200)
+
+    def test_range_file_stops_at_its_length(self):
+        with open(os.path.join(self.media_root, self.path), 'rb') as file:
+            range_file = RangeFile(file, 90, 5)
+            self.assertEqual(range_file.read(3), bytes(range(90, 93)))
+            self.assertEqual(range_file.read(), bytes(range(93, 95)))
+            self.assertEqual(range_file.read(), b'')
+            self.assertEqual(range_file.fileno(), file.fileno())
+
+    def test_only_signed_in_users_get_media(self):
+        self.assertEqual(self.get(user=AnonymousUser()).status_code, 403)
+        self.assertEqual(self.get(user=AnonymousUser(), If_None_Match='"any"').status_code, 403)
+
+    def test_stays_inside_media_root(self):
+        for path in ('../settings.py', '/etc/passwd', 'profile_pictures', 'missing.jpg'):
+            with self.assertRaises(Http404, msg=path):
+                self.get(path)
+
+    def test_hands_the_transfer_to_the_proxy(self):
+        with override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.get()
+            self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.path}')
+            self.assertEqual(response.content, b'')
+            self.assertEqual(self.get(user=AnonymousUser()).status_code, 403)
+
+
+class DigestTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.coach = make_coach('coach')
+        self.idle_coach = make_coach('idle')
+        self.player = make_player('player', self.coach)
+        self.other = make_player('other', self.coach)
+        self.inactive = make_player('inactive', self.coach)
+        Player.objects.filter(pk=self.inactive.pk).update(is_active=False)
+        for index, profile in enumerate([self.coach, self.idle_coach, self.player, self.other, self.inactive]):
+            User.objects.filter(pk=profile.user_id).update(email=f'user{index}@example.com')
+        self.no_email = make_player('no-email', self.coach)
+
+        def due(days, player=None, **fields):
+            return make_goal(player or self.player, self.coach, target_date=self.today + timedelta(days=days), **fields)
+
+        self.overdue = due(-1)
+        self.upcoming = due(7)
+        due(8)
+        due(-3, progress='completed')
+        self.other_upcoming = due(2, player=self.other)
+        # The coach still hears about players who get no digest themselves
+        self.inactive_goal = due(-1, player=self.inactive)
+        self.no_email_goal = due(-1, player=self.no_email)
+        undated = make_goal(self.player, self.coach)
+        self.step = ProcessGoal.objects.create(
+            name='Step', main_goal=undated, order=GAP, target_date=self.today - timedelta(days=2),
+        )
+
+    def ids(self, items):
+        return [item['id'] for item in items]
+
+    def test_groups_items_by_recipient(self):
+        with self.assertNumQueries(6):
+            coach_digests, player_digests = build_digests(self.today)
+        self.assertEqual(set(coach_digests), {self.coach.pk, self.idle_coach.pk})
+        # Inactive players and users without an email get nothing
+        self.assertEqual(set(player_digests), {self.player.pk, self.other.pk})
+
+        coach = coach_digests[self.coach.pk]
+        self.assertEqual(set(self.ids(coach.overdue_goals)), {self.overdue.pk, self.inactive_goal.pk, self.no_email_goal.pk})
+        self.assertEqual(self.ids(coach.upcoming_goals), [self.other_upcoming.pk, self.upcoming.pk])
+        self.assertEqual(self.ids(coach.overdue_process_goals), [self.step.pk])
+        self.assertEqual(coach.overdue_process_goals[0]['player_name'], '')
+
+        player = player_digests[self.player.pk]
+        self.assertEqual(self.ids(player.overdue_goals), [self.overdue.pk])
+        self.assertEqual(self.ids(player.upcoming_goals), [self.upcoming.pk])
+        self.assertEqual(self.ids(player.overdue_process_goals), [self.step.pk])
+        # Every unfinished goal counts, dated or not
+        self.assertEqual((player.pending_goals, player.pending_process_goals), (4, 1))
+        self.assertEqual(self.ids(player_digests[self.other.pk].upcoming_goals), [self.other_upcoming.pk])
+
+    def test_recipients_without_activity_get_no_email(self):
+        coach_digests, _player_digests = build_digests(self.today)
+        self.assertFalse(coach_digests[self.idle_coach.pk].has_items())
+        self.assertEqual(send_digests(self.today), 3)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [
+            'user0@example.com', 'user2@example.com', 'user3@example.com',
+        ])
+
+    def test_nothing_due(self):
+        Goal.objects.update(progress='completed')
+        ProcessGoal.objects.update(progress='completed')
+        coach_digests, player_digests = build_digests(self.today)
+        self.assertFalse(any(digest.has_items() for digest in [*coach_digests.values(), *player_digests.values()]))
+        self.assertEqual(send_digests(self.today), 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_role_filter(self):
+        coach_digests, player_digests = build_digests(self.today, players=False)
+        self.assertEqual(player_digests, {})
+        self.assertEqual(send_digests(self.today, coaches=False, dry_run=True), 2)
+
+
+class GoalFormPlayerTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.player = make_player('player', self.coach)
+        self.inactive = make_player('inactive', self.coach)
+        Player.objects.filter(pk=self.inactive.pk).update(is_active=False)
+        self.stranger = make_player('stranger', make_coach('other'))
+        self.goal = make_goal(self.player, self.coach)
+        self.client.force_login(self.coach.user)
+
+    def data(self, player, **fields):
+        return {
+            'name': 'Goal', 'player': player.pk, 'area': 'technical', 'timeframe': 'medium_term',
+            'description': '', 'target_date': '', **fields,
+        }
+
+    def test_create_only_accepts_the_coachs_active_players(self):
+        for player in (self.stranger, self.inactive):
+            response = self.client.post(reverse('core:goal_create'), self.data(player))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('player', response.context['form'].errors)
+        self.assertEqual(Goal.objects.count(), 1)
+        response = self.client.post(reverse('core:goal_create'), self.data(self.player, name='New'))
+        self.assertRedirects(response, reverse('core:goal_list'), fetch_redirect_response=False)
+        self.assertEqual(Goal.objects.get(name='New').player, self.player)
+
+    def test_update_only_accepts_the_coachs_active_players(self):
+        url = reverse('core:goal_update', args=[self.goal.pk])
+        for player in (self.stranger, self.inactive):
+            response = self.client.post(url, self.data(player))
+            self.assertIn('player', response.context['form'].errors)
+        self.assertEqual(Goal.objects.get(pk=self.goal.pk).player, self.player)
+
+    def test_picker_renders_only_the_chosen_player(self):
+        response = self.client.get(reverse('core:goal_update', args=[self.goal.pk]))
+        widget = response.context['form'].fields['player'].widget
+        self.assertIsInstance(widget, PlayerPicker)
+        html = response.content.decode()
+        self.assertIn(f'<option value="{self.player.pk}" selected>', html)
+        self.assertNotIn(f'value="{self.inactive.pk}"', html)
+        self.assertIn(f'data-player-picker="{reverse("core:api_player_search")}"', html)
+
+
+class ArchiveTests(TestCase):
+    def test_archivable_goals_end_at_midnight_of_the_cutoff(self):
+        coach = make_coach('coach')
+        player = make_player('player', coach)
+        cutoff = date(2025, 8, 1)
+        midnight = timezone.make_aware(datetime.combine(cutoff, time.min))
+        goals = {}
+        for name, updated_at, progress in [
+            ('before', midnight - timedelta(microseconds=1), 'completed'),
+            ('at', midnight, 'completed'),
+            ('open', midnight - timedelta(days=30), 'in_progress'),
+        ]:
+            goals[name] = make_goal(player, coach, progress=progress)
+            Goal.objects.filter(pk=goals[name].pk).update(updated_at=updated_at)
+        self.assertEqual(list(archivable_goals(cutoff)), [goals['before']])
+        # Compared on the bare column, not cast to a date
+        self.assertIn('"core_goal"."updated_at" <', str(archivable_goals(cutoff).query))
+
+
+class GoalTemplateTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.players = [make_player(f'player-{index}', self.coach) for index in range(2)]
+        self.template = GoalTemplate.objects.create(name='Sprint', coach=self.coach, area='physical')
+        # Saved out of order, with the ungapped orders of older templates
+        for order, name in [(2, 'Third'), (0, 'First'), (1, 'Second')]:
+            ProcessGoalTemplate.objects.create(template=self.template, name=name, order=order)
+
+    def test_assign_to_copies_the_steps_in_gapped_order(self):
+        target_date = timezone.localdate() + timedelta(days=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            goals = self.template.assign_to(self.players, target_date=target_date)
+        self.assertEqual(len(goals), 2)
+        for goal, player in zip(goals, self.players):
+            goal = Goal.objects.get(pk=goal.pk)
+            self.assertEqual(
+                (goal.player, goal.coach, goal.area, goal.target_date), (player, self.coach, 'physical', target_date),
+            )
+            steps = list(goal.process_goals.order_by('order').values_list('name', 'order'))
+            self.assertEqual(steps, [('First', GAP), ('Second', 2 * GAP), ('Third', 3 * GAP)])
+            # A step can be moved between two copied ones without a rebalance
+            first, _second, third = goal.process_goals.order_by('order')
+            self.assertEqual(move_process_goal(third, after=first.pk), (GAP + GAP // 2, False))
+        # bulk_create sends no signals, so the stats are refreshed explicitly
+        self.assertEqual(list(PlayerStats.objects.order_by('player').values_list('player', 'goals_total')), [
+            (self.players[0].pk, 1), (self.players[1].pk, 1),
+        ])
+
+    def test_from_goal_keeps_the_step_order(self):
+        goal = make_goal(self.players[0], self.coach, steps=3)
+        template = GoalTemplate.from_goal(goal)
+        self.assertEqual(list(template.steps.values_list('name', 'order')), [
+            ('Step 1', GAP), ('Step 2', 2 * GAP), ('Step 3', 3 * GAP),
+        ])
+
+    def post_assign(self, template, players, user=None):
+        self.client.force_login(user or self.coach.user)
+        return self.client.post(
+            reverse('core:goal_template_assign', args=[template.pk]), {'players': [player.pk for player in players]},
+        )
+
+    def test_assign_view_only_accepts_the_coachs_active_players(self):
+        stranger = make_player('stranger', make_coach('other'))
+        inactive = make_player('inactive', self.coach)
+        Player.objects.filter(pk=inactive.pk).update(is_active=False)
+        for player in (stranger, inactive):
+            response = self.post_assign(self.template, [self.players[0], player])
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('players', response.context['form'].errors)
+        self.assertFalse(Goal.objects.exists())
+
+        response = self.post_assign(self.template, self.players)
+        self.assertRedirects(response, reverse('core:goal_list'), fetch_redirect_response=False)
+        self.assertEqual(set(Goal.objects.values_list('player', flat=True)), {player.pk for player in self.players})
+
+    def test_assign_view_only_finds_the_coachs_templates(self):
+        other = make_coach('other')
+        other_template = GoalTemplate.objects.create(name='Other', coach=other)
+        self.assertEqual(self.post_assign(other_template, [make_player('theirs', other)]).status_code, 404)
+        self.assertEqual(self.post_assign(self.template, self.players, user=self.players[0].user).status_code, 403)
+        self.assertFalse(Goal.objects.exists())
+
+
+class ProcessGoalOrderingTests(TestCase):
+    def setUp(self):
+        coach = make_coach('coach')
+        self.goal = make_goal(make_player('player', coach), coach, steps=3)
+        self.first, self.second, self.third = self.goal.process_goals.all()
+
+    def steps(self):
+        return list(self.goal.process_goals.order_by('order').values_list('pk', flat=True))
+
+    def test_moves_into_the_gap_without_touching_the_others(self):
+        before = dict(self.goal.process_goals.values_list('pk', 'updated_at'))
+        order, rebalanced = move_process_goal(self.third, after=self.first.pk)
+        self.assertEqual((order, rebalanced), (GAP + GAP // 2, False))
+        self.assertEqual(self.steps(), [self.first.pk, self.third.pk, self.second.pk])
+        after = dict(self.goal.process_goals.values_list('pk', 'updated_at'))
+        self.assertEqual([pk for pk in before if before[pk] != after[pk]], [self.third.pk])
+
+    def test_moves_to_the_top_and_the_bottom(self):
+        self.assertEqual(move_process_goal(self.third), (GAP // 2, False))
+        self.assertEqual(move_process_goal(self.first, after=self.second.pk), (3 * GAP, False))
+        self.assertEqual(self.steps(), [self.third.pk, self.second.pk, self.first.pk])
+
+    def test_rebalances_when_the_neighbours_leave_no_gap(self):
+        ProcessGoal.objects.filter(pk=self.first.pk).update(order=1)
+        ProcessGoal.objects.filter(pk=self.second.pk).update(order=2)
+        order, rebalanced = move_process_goal(self.third, before=self.second.pk)
+        self.assertTrue(rebalanced)
+        self.assertEqual(order, 2 * GAP)
+        self.assertEqual(
+            list(self.goal.process_goals.order_by('order').values_list('pk', 'order')),
+            [(self.first.pk, GAP), (self.third.pk, 2 * GAP), (self.second.pk, 3 * GAP)],
+        )
+
+    def test_repeated_moves_into_one_spot_stay_ordered(self):
+        expected = self.steps()
+        for _ in range(12):
+            # Keep squeezing the last step in right after the first
+            last = ProcessGoal.objects.get(pk=expected[-1])
+            move_process_goal(last, after=expected[0])
+            expected.insert(1, expected.pop())
+            self.assertEqual(self.steps(), expected)
+
+    def test_rejects_a_step_of_another_goal(self):
+        other = make_goal(self.goal.player, self.goal.coach, steps=1).process_goals.get()
+        with self.assertRaises(OrderingError):
+            move_process_goal(self.first, after=other.pk)
+
+
+class ProcessGoalMoveViewTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.goal = make_goal(make_player('player', self.coach), self.coach, steps=15)
+        self.steps = list(self.goal.process_goals.values_list('pk', flat=True))
+
+    def move(self, user, pk, **data):
+        self.client.force_login(user)
+        return self.client.post(reverse('core:process_goal_move', args=[pk]), data)
+
+    def test_lists_every_step_on_one_page(self):
+        self.client.force_login(self.coach.user)
+        response = self.client.get(reverse('core:process_goal_list', args=[self.goal.pk]))
+        self.assertEqual(len(response.context['process_goals']), 15)
+
+    def test_moves_a_step_across_the_whole_list(self):
+        response = self.move(self.coach.user, self.steps[-1], before=self.steps[0])
+        self.assertEqual(response.json(), {'success': True, 'order': GAP // 2, 'rebalanced': False})
+        self.assertEqual(self.goal.process_goals.order_by('order').first().pk, self.steps[-1])
+
+    def test_rebalances_through_the_view(self):
+        ProcessGoal.objects.filter(pk=self.steps[1]).update(order=GAP + 1)
+        response = self.move(self.coach.user, self.steps[-1], after=self.steps[0])
+        self.assertTrue(response.json()['rebalanced'])
+        self.assertEqual(
+            list(self.goal.process_goals.order_by('order').values_list('order', flat=True)),
+            [(index + 1) * GAP for index in range(15)],
+        )
+
+    def test_only_the_goals_coach_or_an_admin_may_move(self):
+        self.assertEqual(self.move(make_coach('other').user, self.steps[0]).status_code, 403)
+        self.assertEqual(self.move(self.goal.player.user, self.steps[0]).status_code, 403)
+        admin_user = User.objects.create_user('admin', password='pw', role=User.Role.ADMIN)
+        self.assertEqual(self.move(admin_user, self.steps[0]).status_code, 200)
+        self.assertEqual(self.move(self.coach.user, 0).status_code, 404)
+
+    def test_rejects_bad_neighbours(self):
+        foreign = make_goal(self.goal.player, self.coach, steps=1).process_goals.get()
+        for data in ({'after': foreign.pk}, {'before': 'first'}, {'after': self.steps[1], 'before': self.steps[2]}):
+            self.assertEqual(self.move(self.coach.user, self.steps[0], **data).status_code, 400)
+        self.assertEqual(list(self.goal.process_goals.order_by('order').values_list('pk', flat=True)), self.steps)
+
+
+class RecordingBroadcaster:
+    def __init__(self, channels=()):
+        self.channels = set(channels)
+        self.published = []
+
+    def has_listeners(self, channel=None):
+        return bool(self.channels) if channel is None else channel in self.channels
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+
+
+class ProgressEventTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.other_coach = make_coach('other')
+        self.goal = make_goal(make_player('player', self.coach), self.coach, steps=1)
+        self.other_goal = make_goal(make_player('other-player', self.other_coach), self.other_coach)
+
+    def save_progress(self, broadcaster):
+        with mock.patch.object(events, '_broadcaster', broadcaster):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                step = self.goal.process_goals.get()
+                step.progress = 'completed'
+                step.save()
+                self.other_goal.progress = 'in_progress'
+                self.other_goal.save()
+        return callbacks
+
+    def test_nothing_is_queried_without_listeners(self):
+        broadcaster = RecordingBroadcaster()
+        callbacks = self.save_progress(broadcaster)
+        # The saves still refresh the stats, but no event query is queued
+        self.assertFalse([callback for callback in callbacks if callback.__module__ == events.__name__])
+        self.assertEqual(broadcaster.published, [])
+
+    def test_publishes_only_to_listening_coaches(self):
+        broadcaster = RecordingBroadcaster([events.coach_channel(self.coach.pk)])
+        self.save_progress(broadcaster)
+        published = {(channel, event['type'], event['id']) for channel, event in broadcaster.published}
+        channel = events.coach_channel(self.coach.pk)
+        step = self.goal.process_goals.get()
+        self.assertEqual(published, {(channel, 'process_goal', step.pk), (channel, 'goal', self.goal.pk)})
+
+    def test_in_process_broadcaster_tracks_listeners(self):
+        broadcaster = events.InProcessBroadcaster()
+        channel = events.coach_channel(self.coach.pk)
+
+        async def listen():
+            subscription = broadcaster.subscribe(channel)
+            listening = broadcaster.has_listeners(), broadcaster.has_listeners(channel)
+            subscription.close()
+            return listening
+
+        self.assertEqual(async_to_sync(listen)(), (True, True))
+        self.assertFalse(broadcaster.has_listeners())
+        self.assertFalse(broadcaster.has_listeners(channel))
+
+
+class GunicornConfigTests(TestCase):
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+            config['on_exit'](None)
+        return config
+
+    def start(self, config, workers):
+        config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    def test_in_process_events_run_a_single_asgi_worker(self):
+        config = self.load(SERVER_MODE='asgi', EVENTS_BROADCASTER='core.events.InProcessBroadcaster')
+        self.assertEqual(config['workers'], 1)
+        self.start(config, 1)
+        with self.assertRaises(RuntimeError):
+            self.start(config, 2)
+
+    def test_shared_broadcaster_allows_several_workers(self):
+        config = self.load(SERVER_MODE='asgi', EVENTS_BROADCASTER='example.SharedBroadcaster', WEB_CONCURRENCY='4')
+        self.assertEqual(config['workers'], 4)
+        self.start(config, 4)
+        # WSGI never streams, so the broadcaster does not limit it
+        self.start(self.load(SERVER_MODE='wsgi', EVENTS_BROADCASTER='core.events.InProcessBroadcaster'), 4)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.other_coach = make_coach('other')
+        self.players = [make_player(f'player-{index}', self.coach) for index in range(5)]
+        self.stranger = make_player('stranger', self.other_coach)
+        self.goal = make_goal(self.players[0], self.coach, steps=2)
+        self.other_goal = make_goal(self.stranger, self.other_coach)
+
+    def get(self, name, user, *args, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse(name, args=args), params)
+
+    def ids(self, response):
+        return [row['id'] for row in response.json()['results']]
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse('core:api_player_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Authentication required'})
+
+    def test_cursor_pagination(self):
+        self.client.force_login(self.coach.user)
+        url, pages = f"{reverse('core:api_player_list')}?limit=2", []
+        while url:
+            body = self.client.get(url).json()
+            pages.append([row['id'] for row in body['results']])
+            url = body['next']
+        self.assertEqual(pages, [
+            [self.players[0].pk, self.players[1].pk],
+            [self.players[2].pk, self.players[3].pk],
+            [self.players[4].pk],
+        ])
+
+    def test_invalid_cursor_and_limit(self):
+        for params, error in [
+            ({'cursor': '***'}, 'Invalid cursor'),
+            ({'cursor': encode_api_cursor('x')}, 'Invalid cursor'),
+            ({'limit': 'ten'}, 'limit must be an integer'),
+        ]:
+            response = self.get('core:api_player_list', self.coach.user, **params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()['error'], error)
+        # Limits are clamped rather than refused
+        self.assertEqual(len(self.ids(self.get('core:api_player_list', self.coach.user, limit=0))), 1)
+
+    def test_fields_selects_columns(self):
+        response = self.get('core:api_player_list', self.coach.user, fields='last_name, first_name,last_name')
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'last_name', 'first_name'])
+        response = self.get('core:api_goal_detail', self.coach.user, self.goal.pk, fields='progress,process_goals')
+        body = response.json()
+        self.assertEqual((body['progress'], body['progress_percentage']), ('not_started', 0))
+        self.assertEqual([step['name'] for step in body['process_goals']], ['Step 1', 'Step 2'])
+
+        response = self.get('core:api_player_list', self.coach.user, fields='first_name,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['error'].startswith('Unknown field(s): password. Available: id, '))
+
+    def test_etag_round_trip(self):
+        self.client.force_login(self.coach.user)
+        url = reverse('core:api_goal_detail', args=[self.goal.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        Goal.objects.filter(pk=self.goal.pk).update(progress='completed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_role_visibility(self):
+        coach, player = self.coach.user, self.players[0].user
+        admin = User.objects.create_user('admin', password='pw', role=User.Role.ADMIN)
+        self.assertEqual(self.ids(self.get('core:api_player_list', coach)), [p.pk for p in self.players])
+        self.assertEqual(self.ids(self.get('core:api_player_list', player)), [self.players[0].pk])
+        self.assertEqual(len(self.ids(self.get('core:api_player_list', admin))), 6)
+        self.assertEqual(self.ids(self.get('core:api_coach_list', player)), [self.coach.pk])
+        self.assertEqual(self.ids(self.get('core:api_coach_list', coach)), [self.coach.pk])
+        self.assertEqual(self.ids(self.get('core:api_goal_list', coach)), [self.goal.pk])
+        self.assertEqual(self.ids(self.get('core:api_goal_list', self.players[1].user)), [])
+        self.assertEqual(len(self.ids(self.get('core:api_goal_list', admin))), 2)
+
+        for name, pk in [
+            ('core:api_player_detail', self.stranger.pk),
+            ('core:api_coach_detail', self.other_coach.pk),
+            ('core:api_goal_detail', self.other_goal.pk),
+            ('core:api_goal_comments', self.other_goal.pk),
+        ]:
+            self.assertEqual(self.get(name, coach, pk).status_code, 404, name)
+            self.assertEqual(self.get(name, admin, pk).status_code, 200, name)
+        step = self.goal.process_goals.first()
+        self.assertEqual(self.get('core:api_process_goal_comments', self.players[1].user, step.pk).status_code, 404)
+        self.assertEqual(self.get('core:api_process_goal_comments', player, step.pk).status_code, 200)
+
+
+class SyncCursorTests(TestCase):
+    def test_round_trip(self):
+        for state in ([None], [123], [1, 2, 0, None, None], [1, 2, 3, 4, 5]):
+            self.assertEqual(decode_cursor(encode_cursor(state)), state)
+
+    def test_rejects_malformed_cursors(self):
+        for cursor in (
+            'not base64!', encode_cursor([1, 2]), encode_cursor(['1']), encode_cursor({'since': 1}),
+            encode_cursor([True]), encode_cursor([1, None, 0, None, None]),
+        ):
+            with self.assertRaises(CursorError):
+                decode_cursor(cursor)
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.player = make_player('player', self.coach)
+        self.goals = [make_goal(self.player, self.coach, steps=2) for _ in range(3)]
+
+    def sync(self, cursor=None, user=None, **params):
+        self.client.force_login(user or self.coach.user)
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(reverse('core:api_sync'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def sync_all(self, cursor=None, user=None, **params):
+        rows = {'players': [], 'goals': [], 'process_goals': [], 'deleted': {}}
+        while True:
+            body = self.sync(cursor, user, **params)
+            for key in ('players', 'goals', 'process_goals'):
+                rows[key] += [row['id'] for row in body[key]]
+                rows['deleted'].setdefault(key, []).extend(body['deleted'][key])
+            cursor = body['cursor']
+            if not body['has_more']:
+                return rows, cursor
+
+    def test_chunks_cover_rows_changed_at_the_same_moment_once(self):
+        now = timezone.now()
+        Goal.objects.update(updated_at=now)
+        ProcessGoal.objects.update(updated_at=now)
+        rows, _cursor = self.sync_all(limit=2)
+        self.assertEqual(rows['players'], [self.player.pk])
+        self.assertCountEqual(rows['goals'], [goal.pk for goal in self.goals])
+        self.assertCountEqual(rows['process_goals'], ProcessGoal.objects.values_list('pk', flat=True))
+
+    def test_returns_only_what_changed_since_the_cursor(self):
+        _rows, cursor = self.sync_all()
+        changed, deleted, _untouched = self.goals
+        changed.name = 'Renamed'
+        changed.save()
+        deleted_pk, steps = deleted.pk, list(deleted.process_goals.values_list('pk', flat=True))
+        deleted.delete()
+        rows, cursor = self.sync_all(cursor)
+        self.assertEqual(rows['goals'], [changed.pk])
+        self.assertEqual(rows['process_goals'], [])
+        self.assertEqual(rows['deleted']['goals'], [deleted_pk])
+        self.assertCountEqual(rows['deleted']['process_goals'], steps)
+        rows, _cursor = self.sync_all(cursor)
+        self.assertEqual(rows['goals'] + rows['deleted']['goals'], [])
+
+    def test_moved_goal_leaves_the_old_coach_and_reaches_the_new_one(self):
+        other = make_coach('other')
+        _rows, cursor = self.sync_all()
+        _rows, other_cursor = self.sync_all(user=other.user)
+        goal = self.goals[0]
+        goal.coach = other
+        goal.save()
+        rows, _cursor = self.sync_all(cursor)
+        self.assertEqual(rows['deleted']['goals'], [goal.pk])
+        rows, _cursor = self.sync_all(other_cursor, user=other.user)
+        self.assertEqual(rows['goals'], [goal.pk])
+        self.assertCountEqual(rows['process_goals'], goal.process_goals.values_list('pk', flat=True))
+
+    @override_settings(SYNC_LAG_SECONDS=60)
+    def test_window_trails_the_clock(self):
+        rows, cursor = self.sync_all()
+        # Everything was saved in the last minute, so it belongs to a later window
+        self.assertEqual(rows['goals'], [])
+        with override_settings(SYNC_LAG_SECONDS=0):
+            rows, _cursor = self.sync_all(cursor)
+        self.assertEqual(len(rows['goals']), 3)
+
+    def test_cursor_never_moves_backwards(self):
+        since = _micros(timezone.now() + timedelta(hours=1))
+        body = self.sync(encode_cursor([since]))
+        self.assertEqual(decode_cursor(body['cursor']), [since])
+
+    @override_settings(SYNC_TOMBSTONE_DAYS=1)
+    def test_rejects_expired_and_malformed_cursors(self):
+        self.client.force_login(self.coach.user)
+        expired = encode_cursor([_micros(timezone.now() - timedelta(days=2))])
+        self.assertEqual(self.client.get(reverse('core:api_sync'), {'cursor': expired}).status_code, 410)
+        self.assertEqual(self.client.get(reverse('core:api_sync'), {'cursor': 'junk'}).status_code, 400)
+
+
+class PlayerStatsTests(TestCase):
+    def setUp(self):
+        self.coach = make_coach('coach')
+        self.players = [make_player(f'player-{index}', self.coach) for index in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.goals = [make_goal(self.players[0], self.coach, steps=2) for _ in range(2)]
+
+    def stats(self, player):
+        return PlayerStats.objects.get(player=player)
+
+    def test_goal_moved_to_another_player_updates_both(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            goal = Goal.objects.get(pk=self.goals[0].pk)
+            goal.player = self.players[1]
+            goal.save()
+        self.assertEqual(self.stats(self.players[0]).goals_total, 1)
+        self.assertEqual(self.stats(self.players[1]).goals_total, 1)
+
+    def test_bulk_progress_actions_refresh_the_owners(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.complete_goals(Goal.objects.filter(pk=self.goals[0].pk))
+        stats = self.stats(self.players[0])
+        self.assertEqual((stats.goals_completed, stats.average_completion), (1, 50))
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.set_process_goals_progress(ProcessGoal.objects.filter(main_goal=self.goals[1]), 'completed')
+        self.assertEqual(self.stats(self.players[0]).goals_completed, 2)
+
+    def test_reassignment_moves_the_stats_to_the_new_coach(self):
+        other = make_coach('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.reassign_players(Player.objects.filter(pk=self.players[0].pk), other, transfer_open_goals=True)
+        self.assertEqual(self.stats(self.players[0]).coach, other)
+        self.assertEqual(self.stats(self.players[1]).coach, self.coach)
+
+    def test_deleting_a_coach_refreshes_the_players_of_its_goals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CoachAdmin(Coach, admin.site).delete_queryset(None, Coach.objects.filter(pk=self.coach.pk))
+        self.assertEqual(self.stats(self.players[0]).goals_total, 0)
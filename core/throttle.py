@@ -0,0 +1,185 @@
+"""Rate limits and duplicate suppression for the AJAX progress endpoints.
+
+Every update takes one token from two buckets in the ``throttle`` cache: one
+per user and one per goal or process goal. Each bucket refills at the rate set
+in settings (``PROGRESS_RATE_PER_USER``, ``PROGRESS_RATE_PER_OBJECT``) and
+holds at most that many tokens. When either bucket is empty the request gets
+a 429 with ``Retry-After`` and nothing is written. The decorator charges the
+user's bucket; the view charges the object's with ``take_object_token`` once
+it has checked the user may update the object, so requests that are refused
+cannot use up another user's updates.
+
+A repeat of the last successful update to an object (same user, same form
+data) within ``PROGRESS_DUPLICATE_WINDOW`` seconds is answered from the cache
+instead of being saved again; so is a retry that sends the same
+``Idempotency-Key`` header within ``IDEMPOTENCY_KEY_TTL``. A duplicate that
+arrives while the first request is still running waits for its result.
+
+The buckets are read and written without a lock, so concurrent requests in
+different workers can each spend the same token. That is fine for damping a
+retry loop or a double click; it is not a hard quota.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from .logs import log_event
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600}
+
+# How long a duplicate waits for the request it duplicates, and how often it looks
+IN_FLIGHT_WAIT_SECONDS = 5
+IN_FLIGHT_POLL_SECONDS = 0.05
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``: bucket size and the seconds it takes to refill"""
+    count, _, period = rate.partition('/')
+    try:
+        return int(count), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate {rate!r}; expected '<count>/<s|m|h>'")
+
+
+class TokenBucket:
+    """A bucket of ``capacity`` tokens refilled evenly over ``period`` seconds"""
+
+    def __init__(self, key, rate):
+        self.key = key
+        self.capacity, self.period = parse_rate(rate)
+
+    def refill(self, state, now):
+        """Tokens available at ``now`` given the stored ``(tokens, timestamp)``"""
+        if state is None:
+            return float(self.capacity)
+        tokens, updated = state
+        return min(self.capacity, tokens + (now - updated) * self.capacity / self.period)
+
+    def wait(self, tokens):
+        """Seconds until a bucket holding ``tokens`` has a whole token again"""
+        return (1 - tokens) * self.period / self.capacity
+
+
+async def take_token(cache, buckets):
+    """Spend a token from every bucket, or from none; returns the seconds to wait"""
+    now = time.time()
+    states = await cache.aget_many([bucket.key for bucket in buckets])
+    tokens = {bucket.key: bucket.refill(states.get(bucket.key), now) for bucket in buckets}
+    retry_after = max((bucket.wait(tokens[bucket.key]) for bucket in buckets if tokens[bucket.key] < 1), default=0)
+    for bucket in buckets:
+        if not retry_after:
+            tokens[bucket.key] -= 1
+        # A bucket left alone for a full period is full again, which is what
+        # an expired key reads as
+        await cache.aset(bucket.key, (tokens[bucket.key], now), timeout=bucket.period)
+    return retry_after
+
+
+def throttled(request, kind, pk, retry_after):
+    retry_after = math.ceil(retry_after)
+    log_event(
+        'progress_throttled', request, level=logging.WARNING,
+        kind=kind, object_id=pk, retry_after=retry_after,
+    )
+    response = JsonResponse(
+        {'error': f'Too many progress updates; try again in {retry_after} seconds'}, status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+async def take_object_token(request, kind, pk):
+    """Charge the object's bucket for an authorized update; returns a 429 response or ``None``"""
+    bucket = TokenBucket(f'bucket:{kind}:{pk}', settings.PROGRESS_RATE_PER_OBJECT)
+    retry_after = await take_token(caches[settings.THROTTLE_CACHE], [bucket])
+    return throttled(request, kind, pk, retry_after) if retry_after else None
+
+
+def fingerprint(request, kind, pk):
+    body = json.dumps(sorted(request.POST.lists()))
+    return hashlib.sha256(f'{request.user.pk}:{kind}:{pk}:{body}'.encode()).hexdigest()
+
+
+def replay(entry):
+    response = HttpResponse(entry['content'], status=entry['status'], content_type='application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+async def wait_for_result(cache, key, request_fingerprint):
+    """The response stored under ``key`` by the request already running, if it finishes"""
+    deadline = time.monotonic() + IN_FLIGHT_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(IN_FLIGHT_POLL_SECONDS)
+        entry = await cache.aget(key)
+        if entry is None or entry['fingerprint'] != request_fingerprint:
+            return None
+        if entry['content'] is not None:
+            return entry
+    return None
+
+
+def throttle_progress_updates(kind):
+    """Rate-limit an async progress endpoint per user and coalesce duplicate updates.
+
+    The view must call ``take_object_token`` after its permission check.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, pk, *args, **kwargs):
+            if request.method != 'POST':
+                return await view(request, pk, *args, **kwargs)
+            cache = caches[settings.THROTTLE_CACHE]
+            request_fingerprint = fingerprint(request, kind, pk)
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if idempotency_key:
+                key = f'idempotency:{kind}:{request.user.pk}:{idempotency_key}'
+                ttl = settings.IDEMPOTENCY_KEY_TTL
+            else:
+                # Only a user's latest update of an object is remembered, so
+                # going back to an earlier value is saved rather than replayed
+                key = f'last-update:{kind}:{request.user.pk}:{pk}'
+                ttl = settings.PROGRESS_DUPLICATE_WINDOW
+            pending = {'fingerprint': request_fingerprint, 'status': None, 'content': None}
+
+            if not await cache.aadd(key, pending, ttl):
+                entry = await cache.aget(key)
+                if entry is not None and entry['fingerprint'] == request_fingerprint:
+                    if entry['content'] is None:
+                        entry = await wait_for_result(cache, key, request_fingerprint)
+                        if entry is None:
+                            return JsonResponse({'error': 'The same update is still being processed'}, status=409)
+                    return replay(entry)
+                if idempotency_key and entry is not None:
+                    return JsonResponse({'error': 'Idempotency-Key was already used for a different update'}, status=422)
+                await cache.aset(key, pending, ttl)
+
+            retry_after = await take_token(cache, [
+                TokenBucket(f'bucket:user:{request.user.pk}', settings.PROGRESS_RATE_PER_USER),
+            ])
+            if retry_after:
+                await cache.adelete(key)
+                return throttled(request, kind, pk, retry_after)
+
+            try:
+                response = await view(request, pk, *args, **kwargs)
+            except BaseException:
+                await cache.adelete(key)
+                raise
+            if response.status_code == 200:
+                pending.update(status=response.status_code, content=response.content)
+                await cache.aset(key, pending, ttl)
+            else:
+                # Errors are not replayed; a corrected retry must get through
+                await cache.adelete(key)
+            return response
+        return wrapper
+    return decorator
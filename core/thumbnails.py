@@ -0,0 +1,116 @@
+"""Profile picture thumbnail generation.
+
+Uploaded profile pictures are resized into a handful of square variants so
+that list pages and dashboards do not ship full-size originals into small
+avatar slots. Resizing is CPU bound, so it runs in the task worker (use
+``run_worker --pool process``) rather than in the request.
+
+Variants are named after a hash of their own bytes, so a file is never
+rewritten under a URL that browsers cache forever, and the names are
+recorded on the users (``User.profile_thumbnails``) so rendering a page
+never has to ask the storage whether a variant exists.
+"""
+import hashlib
+import io
+import os
+
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .models import User
+
+# Variant name -> edge length in pixels (covers 2x density for the slot sizes
+# used in the templates: 30-32px, 50px and 100-150px)
+THUMBNAIL_SIZES = {
+    'small': 64,
+    'medium': 128,
+    'large': 320,
+}
+
+THUMBNAIL_DIR = 'thumbs'
+
+if features.check('webp'):
+    THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = 'WEBP', 'webp'
+else:
+    THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = 'JPEG', 'jpg'
+
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 82, 'method': 4},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def thumbnail_url(image, size):
+    """URL of the ``size`` variant, falling back to the original until one is recorded"""
+    if not image:
+        return ''
+    variants = getattr(image.instance, 'profile_thumbnails', None) or {}
+    # A record left from a replaced picture does not apply
+    if variants.get('source') == image.name and size in variants:
+        return default_storage.url(variants[size])
+    return image.url
+
+
+def has_thumbnails(user):
+    """Whether the variants of the user's current picture are recorded"""
+    variants = user.profile_thumbnails or {}
+    if variants.get('source') != user.profile_picture.name:
+        return False
+    return all(size in variants for size in THUMBNAIL_SIZES)
+
+
+def render_thumbnails(source_path):
+    """Write every variant for the image at ``source_path``.
+
+    Runs inside worker processes, so it only touches the filesystem and
+    Pillow. Returns ``{size: file name}``, relative to the image's
+    directory; a variant whose file already exists is not written again.
+    """
+    directory, filename = os.path.split(source_path)
+    stem = os.path.splitext(filename)[0]
+    os.makedirs(os.path.join(directory, THUMBNAIL_DIR), exist_ok=True)
+
+    variants = {}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if THUMBNAIL_FORMAT == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+
+        # Resize from largest to smallest so each step works on a smaller input
+        for size in sorted(THUMBNAIL_SIZES, key=THUMBNAIL_SIZES.get, reverse=True):
+            edge = THUMBNAIL_SIZES[size]
+            image = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, THUMBNAIL_FORMAT, **SAVE_OPTIONS[THUMBNAIL_FORMAT])
+            digest = hashlib.sha256(buffer.getvalue()).hexdigest()[:12]
+            variants[size] = os.path.join(THUMBNAIL_DIR, f"{stem}_{size}_{digest}.{THUMBNAIL_EXTENSION}")
+            path = os.path.join(directory, variants[size])
+            if not os.path.exists(path):
+                with open(f"{path}.tmp", 'wb') as file:
+                    file.write(buffer.getvalue())
+                os.replace(f"{path}.tmp", path)
+    return variants
+
+
+def record_thumbnails(name, variants):
+    """Point every user whose picture is ``name`` at its rendered ``variants``"""
+    directory = os.path.dirname(name)
+    record = {'source': name, **{size: os.path.join(directory, variant) for size, variant in variants.items()}}
+    return User.objects.filter(profile_picture=name).update(profile_thumbnails=record)
+
+
+def delete_thumbnails(variants):
+    """Remove the variants recorded in ``variants`` (a ``profile_thumbnails`` value) from storage"""
+    for size in THUMBNAIL_SIZES:
+        if size in variants:
+            default_storage.delete(variants[size])
+
+
+def schedule_thumbnails(image):
+    """Queue generation of the variants for ``image`` without blocking the request"""
+    from .queue import enqueue
+
+    if image:
+        enqueue('generate_thumbnails', args=[image.name])
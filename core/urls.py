@@ -1,6 +1,6 @@
 from django.urls import path
 from django.shortcuts import redirect
-from . import views
+from . import api, views
 
 app_name = 'core'
 
@@ -30,11 +30,35 @@ urlpatterns = [
     path('goals/create/', views.GoalCreateView.as_view(), name='goal_create'),
     path('goals/<int:pk>/', views.GoalDetailView.as_view(), name='goal_detail'),
     path('goals/<int:pk>/edit/', views.GoalUpdateView.as_view(), name='goal_update'),
+    path('goals/<int:pk>/workspace/', views.GoalWorkspaceView.as_view(), name='goal_workspace'),
     path('goals/<int:pk>/progress/', views.goal_progress_update, name='goal_progress_update'),
+    path('goals/<int:pk>/save-as-template/', views.goal_save_as_template, name='goal_save_as_template'),
+    path('goals/<int:pk>/comments/', views.goal_comment_create, name='goal_comment_create'),
+    
+    # Goal template views
+    path('goal-templates/', views.GoalTemplateListView.as_view(), name='goal_template_list'),
+    path('goal-templates/<int:pk>/assign/', views.GoalTemplateAssignView.as_view(), name='goal_template_assign'),
     
     # Process Goal views
     path('goals/<int:goal_id>/process-goals/', views.ProcessGoalListView.as_view(), name='process_goal_list'),
     path('goals/<int:goal_id>/process-goals/create/', views.ProcessGoalCreateView.as_view(), name='process_goal_create'),
     path('process-goals/<int:pk>/edit/', views.ProcessGoalUpdateView.as_view(), name='process_goal_update'),
+    path('process-goals/<int:pk>/move/', views.process_goal_move, name='process_goal_move'),
     path('process-goals/<int:pk>/progress/', views.process_goal_progress_update, name='process_goal_progress_update'),
+    path('process-goals/<int:pk>/comments/', views.process_goal_comment_create, name='process_goal_comment_create'),
+    
+    # Live progress (Server-Sent Events, ASGI only)
+    path('events/progress/', views.progress_stream, name='progress_stream'),
+    
+    # Read-only JSON API
+    path('api/v1/players/', api.player_list, name='api_player_list'),
+    path('api/v1/players/search/', api.player_search, name='api_player_search'),
+    path('api/v1/players/<int:pk>/', api.player_detail, name='api_player_detail'),
+    path('api/v1/coaches/', api.coach_list, name='api_coach_list'),
+    path('api/v1/coaches/<int:pk>/', api.coach_detail, name='api_coach_detail'),
+    path('api/v1/goals/', api.goal_list, name='api_goal_list'),
+    path('api/v1/goals/<int:pk>/', api.goal_detail, name='api_goal_detail'),
+    path('api/v1/goals/<int:pk>/comments/', api.goal_comments, name='api_goal_comments'),
+    path('api/v1/process-goals/<int:pk>/comments/', api.process_goal_comments, name='api_process_goal_comments'),
+    path('api/v1/sync/', api.sync_changes, name='api_sync'),
 ] 
\ No newline at end of file
@@ -1,13 +1,34 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.contrib.auth import logout
-from django.views.generic import ListView, DetailView, UpdateView, CreateView
+from django.views.generic import ListView, DetailView, UpdateView, CreateView, FormView
+from django.views.decorators.http import require_POST
 from django.urls import reverse_lazy
-from django.db.models import Q
-from django.http import JsonResponse
-from .models import User, Coach, Player, Goal, ProcessGoal
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from .access import visible_goals, visible_players
+from .async_utils import async_login_required, run_concurrently
+from .deferral import defer_large_text
+from .events import coach_channel, get_broadcaster
+from .logs import log_event
+from .metrics import GOAL_AUTO_COMPLETIONS, count_progress_updates
+from .throttle import take_object_token, throttle_progress_updates
+from .forms import AssignGoalTemplateForm, use_player_picker
+from .models import (
+    COMMENT_MAX_LENGTH, User, Coach, Player, PlayerStats, Goal, ProcessGoal, GoalTemplate, GoalComment,
+    ProcessGoalComment,
+)
+from .ordering import OrderingError, move_process_goal, next_order
+from .stats import DEFAULT_LEADERBOARD_ORDER, LEADERBOARD_ORDERS, leaderboard, player_ordering
 
 
 def login_view(request):
@@ -32,62 +53,76 @@ def login_view(request):
     return render(request, 'core/login.html')
 
 
-@login_required
-def dashboard(request):
+@async_login_required
+async def dashboard(request):
     """Role-based dashboard"""
     user = request.user
     
     if user.is_admin():
-        return admin_dashboard(request)
+        return await admin_dashboard(request)
     elif user.is_coach():
-        return coach_dashboard(request)
+        return await coach_dashboard(request)
     elif user.is_player():
-        return player_dashboard(request)
+        return await player_dashboard(request)
     else:
         messages.error(request, 'Invalid user role.')
         return redirect('core:login')
 
 
-def admin_dashboard(request):
+async def admin_dashboard(request):
     """Admin dashboard with overview of all users"""
-    context = {
-        'total_users': User.objects.count(),
-        'total_coaches': Coach.objects.count(),
-        'total_players': Player.objects.count(),
-        'active_players': Player.objects.filter(is_active=True).count(),
-        'recent_players': Player.objects.select_related('user', 'coach__user').order_by('-join_date')[:5],
-        'recent_coaches': Coach.objects.select_related('user').order_by('-hire_date')[:5],
-    }
-    return render(request, 'core/admin_dashboard.html', context)
-
-
-def coach_dashboard(request):
+    # The counts and lists are independent, so under ASGI they run in parallel
+    context = await run_concurrently(
+        request,
+        total_users=User.objects.count,
+        total_coaches=Coach.objects.count,
+        total_players=Player.objects.count,
+        active_players=Player.objects.filter(is_active=True).count,
+        recent_players=lambda: list(
+            defer_large_text(Player.objects.select_related('user', 'coach__user')).order_by('-join_date')[:5]
+        ),
+        recent_coaches=lambda: list(defer_large_text(Coach.objects.select_related('user')).order_by('-hire_date')[:5]),
+    )
+    return await sync_to_async(render)(request, 'core/admin_dashboard.html', context)
+
+
+async def coach_dashboard(request):
     """Coach dashboard with assigned players"""
     try:
-        coach = request.user.coach_profile
-        context = {
-            'coach': coach,
-            'players': coach.players.select_related('user').filter(is_active=True),
-            'total_players': coach.get_players_count(),
-        }
-        return render(request, 'core/coach_dashboard.html', context)
+        coach = await Coach.objects.select_related('user').aget(user=request.user)
     except Coach.DoesNotExist:
         messages.error(request, 'Coach profile not found. Please contact administrator.')
         return redirect('core:login')
-
-
-def player_dashboard(request):
+    order = request.GET.get('leaderboard')
+    if order not in LEADERBOARD_ORDERS:
+        order = DEFAULT_LEADERBOARD_ORDER
+    context = await run_concurrently(
+        request,
+        players=lambda: list(coach.players.select_related('user').filter(is_active=True)),
+        total_players=coach.get_players_count,
+        # Read in index order from the materialized stats, not computed per goal
+        leaderboard=lambda: list(leaderboard(PlayerStats.objects.filter(coach=coach), order)[:10]),
+    )
+    context.update({
+        'coach': coach,
+        'leaderboard_order': order,
+        'leaderboard_orders': [(key, label) for key, (label, _ordering) in LEADERBOARD_ORDERS.items()],
+    })
+    return await sync_to_async(render)(request, 'core/coach_dashboard.html', context)
+
+
+async def player_dashboard(request):
     """Player dashboard with personal information"""
     try:
-        player = request.user.player_profile
-        context = {
-            'player': player,
-            'coach': player.coach,
-        }
-        return render(request, 'core/player_dashboard.html', context)
+        player = await Player.objects.select_related('user', 'coach__user').aget(user=request.user)
     except Player.DoesNotExist:
         messages.error(request, 'Player profile not found. Please contact administrator.')
         return redirect('core:login')
+    context = {
+        'player': player,
+        'coach': player.coach,
+    }
+    return await sync_to_async(render)(request, 'core/player_dashboard.html', context)
 
 
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -116,7 +151,7 @@ class CoachListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        queryset = Coach.objects.select_related('user').order_by('user__first_name')
+        queryset = defer_large_text(Coach.objects.select_related('user')).order_by('user__first_name')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -136,21 +171,8 @@ class PlayerListView(LoginRequiredMixin, ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_admin():
-            # Admin sees all players
-            queryset = Player.objects.select_related('user', 'coach__user')
-        elif user.is_coach():
-            # Coach sees only assigned players
-            try:
-                coach = user.coach_profile
-                queryset = coach.players.select_related('user')
-            except Coach.DoesNotExist:
-                queryset = Player.objects.none()
-        else:
-            # Players see only themselves
-            queryset = Player.objects.filter(user=user)
+        # Admins see all players, coaches their assigned players, players themselves
+        queryset = defer_large_text(visible_players(self.request.user).select_related('user', 'coach__user', 'stats'))
         
         # Apply search filter
         search = self.request.GET.get('search')
@@ -162,11 +184,15 @@ class PlayerListView(LoginRequiredMixin, ListView):
                 Q(jersey_number__icontains=search)
             )
         
+        sort = self.request.GET.get('sort')
+        if sort in LEADERBOARD_ORDERS:
+            return queryset.order_by(*player_ordering(sort), 'user__first_name', 'user__last_name')
         return queryset.order_by('user__first_name', 'user__last_name')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['user_role'] = self.request.user.role
+        context['sort_orders'] = [(key, label) for key, (label, _ordering) in LEADERBOARD_ORDERS.items()]
         return context
 
 
@@ -177,21 +203,7 @@ class PlayerDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'player'
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_admin():
-            # Admin can see all players
-            return Player.objects.select_related('user', 'coach__user')
-        elif user.is_coach():
-            # Coach can see only assigned players
-            try:
-                coach = user.coach_profile
-                return coach.players.select_related('user')
-            except Coach.DoesNotExist:
-                return Player.objects.none()
-        else:
-            # Players can see only themselves
-            return Player.objects.filter(user=user).select_related('user', 'coach__user')
+        return visible_players(self.request.user).select_related('user', 'coach__user')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -247,49 +259,37 @@ class GoalListView(LoginRequiredMixin, ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_admin():
-            # Admin sees all goals
-            queryset = Goal.objects.select_related('player__user', 'coach__user')
-        elif user.is_coach():
-            # Coach sees goals they assigned
-            try:
-                coach = user.coach_profile
-                queryset = coach.assigned_goals.select_related('player__user')
-            except Coach.DoesNotExist:
-                queryset = Goal.objects.none()
-        else:
-            # Players see only their own goals
-            try:
-                player = user.player_profile
-                queryset = player.goals.select_related('coach__user')
-            except Player.DoesNotExist:
-                queryset = Goal.objects.none()
+        # Admins see all goals, coaches the goals they assigned, players their own
+        # Cards show the start of the description only
+        queryset = defer_large_text(
+            visible_goals(self.request.user).select_related('player__user', 'coach__user'), excerpt=True,
+        )
         
         # Apply search filter
         search = self.request.GET.get('search')
         if search:
+            # Area is stored as an integer; match the search against its codes instead
+            areas = [code for code, label in Goal.AREA_CHOICES if search.lower() in code]
             queryset = queryset.filter(
                 Q(name__icontains=search) |
                 Q(player__user__first_name__icontains=search) |
                 Q(player__user__last_name__icontains=search) |
-                Q(area__icontains=search)
+                Q(area__in=areas)
             )
         
         # Apply area filter
         area = self.request.GET.get('area')
-        if area:
+        if area in dict(Goal.AREA_CHOICES):
             queryset = queryset.filter(area=area)
         
         # Apply progress filter
         progress = self.request.GET.get('progress')
-        if progress:
+        if progress in dict(Goal.PROGRESS_CHOICES):
             queryset = queryset.filter(progress=progress)
         
         # Apply timeframe filter
         timeframe = self.request.GET.get('timeframe')
-        if timeframe:
+        if timeframe in dict(Goal.TIMEFRAME_CHOICES):
             queryset = queryset.filter(timeframe=timeframe)
         
         return queryset.order_by('-created_at')
@@ -314,12 +314,12 @@ class GoalCreateView(LoginRequiredMixin, CoachRequiredMixin, CreateView):
     
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
-        # Only show players assigned to this coach
+        # Only accept players assigned to this coach
         try:
             coach = self.request.user.coach_profile
-            form.fields['player'].queryset = coach.players.filter(is_active=True)
+            use_player_picker(form.fields['player'], coach.players.filter(is_active=True))
         except Coach.DoesNotExist:
-            form.fields['player'].queryset = Player.objects.none()
+            use_player_picker(form.fields['player'], Player.objects.none())
         return form
 
 
@@ -327,32 +327,17 @@ class GoalUpdateView(LoginRequiredMixin, UpdateView):
     """Update goal - coaches can update all fields, players can update progress only"""
     model = Goal
     template_name = 'core/goal_form.html'
-    fields = ['name', 'player', 'area', 'timeframe', 'description', 'target_date', 'notes', 'progress']
+    fields = ['name', 'player', 'area', 'timeframe', 'description', 'target_date', 'progress']
     
     def get_fields(self):
         user = self.request.user
         if user.is_coach():
-            return ['name', 'player', 'area', 'timeframe', 'description', 'target_date', 'notes']
+            return ['name', 'player', 'area', 'timeframe', 'description', 'target_date']
         else:
-            return ['progress', 'notes']
+            return ['progress']
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_admin():
-            return Goal.objects.all()
-        elif user.is_coach():
-            try:
-                coach = user.coach_profile
-                return coach.assigned_goals.all()
-            except Coach.DoesNotExist:
-                return Goal.objects.none()
-        else:
-            try:
-                player = user.player_profile
-                return player.goals.all()
-            except Player.DoesNotExist:
-                return Goal.objects.none()
+        return visible_goals(self.request.user)
     
     def get_success_url(self):
         messages.success(self.request, 'Goal updated successfully!')
@@ -363,12 +348,14 @@ class GoalUpdateView(LoginRequiredMixin, UpdateView):
         user = self.request.user
         
         if user.is_coach():
-            # Only show players assigned to this coach
+            # Only accept players assigned to this coach
             try:
                 coach = user.coach_profile
-                form.fields['player'].queryset = coach.players.filter(is_active=True)
+                use_player_picker(form.fields['player'], coach.players.filter(is_active=True))
             except Coach.DoesNotExist:
-                form.fields['player'].queryset = Player.objects.none()
+                use_player_picker(form.fields['player'], Player.objects.none())
+        else:
+            use_player_picker(form.fields['player'], form.fields['player'].queryset)
         
         return form
 
@@ -380,22 +367,7 @@ class GoalDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'goal'
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_admin():
-            return Goal.objects.select_related('player__user', 'coach__user')
-        elif user.is_coach():
-            try:
-                coach = user.coach_profile
-                return coach.assigned_goals.select_related('player__user')
-            except Coach.DoesNotExist:
-                return Goal.objects.none()
-        else:
-            try:
-                player = user.player_profile
-                return player.goals.select_related('coach__user')
-            except Player.DoesNotExist:
-                return Goal.objects.none()
+        return visible_goals(self.request.user).select_related('player__user', 'coach__user')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -403,48 +375,98 @@ class GoalDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-@login_required
-def goal_progress_update(request, pk):
+class GoalWorkspaceView(LoginRequiredMixin, DetailView):
+    """Goal with all its process goals on one page, with inline progress edits"""
+    model = Goal
+    template_name = 'core/goal_workspace.html'
+    context_object_name = 'goal'
+    
+    def get_queryset(self):
+        return (
+            visible_goals(self.request.user)
+            .select_related('player__user', 'coach__user')
+            .prefetch_related('process_goals')
+        )
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Rollups come from the prefetched rows; the template must not query again
+        process_goals = list(self.object.process_goals.all())
+        context.update({
+            'process_goals': process_goals,
+            'process_goals_completed': sum(1 for step in process_goals if step.progress == 'completed'),
+            'process_goals_overdue': sum(1 for step in process_goals if step.is_overdue()),
+            'progress_choices': Goal.PROGRESS_CHOICES,
+            'user_role': self.request.user.role,
+        })
+        return context
+
+
+async def _profile_id(model, user):
+    """Primary key of the user's coach or player profile, or ``None``"""
+    return await model.objects.filter(user=user).values_list('pk', flat=True).afirst()
+
+
+@async_login_required
+@count_progress_updates('goal')
+@throttle_progress_updates('goal')
+async def goal_progress_update(request, pk):
     """AJAX endpoint for updating goal progress"""
     if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        goal = get_object_or_404(Goal, pk=pk)
+        try:
+            goal = await Goal.objects.aget(pk=pk)
+        except Goal.DoesNotExist:
+            raise Http404('No Goal matches the given query.')
         
         # Check if user has permission to update this goal
         user = request.user
         can_update = False
         error_message = None
+        profile_id = None
         
         if user.is_admin():
             can_update = True
         elif user.is_coach():
-            try:
-                can_update = goal.coach == user.coach_profile
-            except Coach.DoesNotExist:
+            profile_id = await _profile_id(Coach, user)
+            if profile_id is None:
                 error_message = 'Coach profile not found'
-                can_update = False
+            else:
+                can_update = goal.coach_id == profile_id
         else:
-            try:
-                can_update = goal.player == user.player_profile
-            except Player.DoesNotExist:
+            profile_id = await _profile_id(Player, user)
+            if profile_id is None:
                 error_message = 'Player profile not found'
-                can_update = False
+            else:
+                can_update = goal.player_id == profile_id
         
         if not can_update:
+            log_event(
+                'permission_denied', request, level=logging.WARNING, headers=True,
+                goal_id=goal.pk, reason=error_message or 'Permission denied',
+            )
             return JsonResponse({
                 'error': error_message or 'Permission denied',
                 'user_role': user.role,
-                'goal_player_id': goal.player.id if goal.player else None,
-                'user_profile_id': user.player_profile.id if hasattr(user, 'player_profile') else None
+                'goal_player_id': goal.player_id,
+                'user_profile_id': profile_id if user.is_player() else None
             }, status=403)
         
+        response = await take_object_token(request, 'goal', goal.pk)
+        if response is not None:
+            return response
+        
         progress = request.POST.get('progress')
-        notes = request.POST.get('notes', '')
+        notes = request.POST.get('notes', '').strip()
+        if len(notes) > COMMENT_MAX_LENGTH:
+            return JsonResponse({'error': f'Notes are limited to {COMMENT_MAX_LENGTH} characters'}, status=400)
         
         if progress in dict(Goal.PROGRESS_CHOICES):
+            previous = goal.progress
             goal.progress = progress
+            await goal.asave()
             if notes:
-                goal.notes = notes
-            goal.save()
+                await GoalComment.objects.acreate(goal=goal, author=user, body=notes)
+            log_event('progress_changed', request, goal_id=goal.pk, previous=previous, progress=progress)
             
             return JsonResponse({
                 'success': True,
@@ -458,17 +480,84 @@ def goal_progress_update(request, pk):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+# Goal template views
+class GoalTemplateListView(LoginRequiredMixin, CoachRequiredMixin, ListView):
+    """List the coach's reusable goal templates"""
+    model = GoalTemplate
+    template_name = 'core/goal_template_list.html'
+    context_object_name = 'goal_templates'
+    paginate_by = 10
+    
+    def get_queryset(self):
+        try:
+            coach = self.request.user.coach_profile
+        except Coach.DoesNotExist:
+            return GoalTemplate.objects.none()
+        return coach.goal_templates.annotate(steps_count=Count('steps')).order_by('name')
+
+
+@login_required
+@require_POST
+def goal_save_as_template(request, pk):
+    """Save a goal and its process goals as a reusable template - coaches only"""
+    try:
+        coach = request.user.coach_profile
+    except Coach.DoesNotExist:
+        messages.error(request, 'Only coaches can create goal templates.')
+        return redirect('core:goal_detail', pk=pk)
+    
+    goal = get_object_or_404(coach.assigned_goals, pk=pk)
+    template = GoalTemplate.from_goal(goal)
+    messages.success(request, f'Template "{template.name}" saved with {template.steps.count()} process goals.')
+    return redirect('core:goal_template_list')
+
+
+class GoalTemplateAssignView(LoginRequiredMixin, CoachRequiredMixin, FormView):
+    """Assign a goal template to many players in one request"""
+    form_class = AssignGoalTemplateForm
+    template_name = 'core/goal_template_assign.html'
+    success_url = reverse_lazy('core:goal_list')
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and request.user.is_coach():
+            self.coach = get_object_or_404(Coach, user=request.user)
+            self.goal_template = get_object_or_404(
+                self.coach.goal_templates.prefetch_related('steps'), pk=self.kwargs['pk']
+            )
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['coach'] = self.coach
+        return kwargs
+    
+    def form_valid(self, form):
+        # The form only accepts this coach's active players, so no per-player check is needed
+        players = form.cleaned_data['players']
+        goals = self.goal_template.assign_to(players, target_date=form.cleaned_data['target_date'])
+        messages.success(
+            self.request,
+            f'Assigned "{self.goal_template.name}" to {len(goals)} player(s).'
+        )
+        return super().form_valid(form)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['goal_template'] = self.goal_template
+        return context
+
+
 # Process Goal views
 class ProcessGoalListView(LoginRequiredMixin, ListView):
     """List process goals for a specific main goal"""
     model = ProcessGoal
     template_name = 'core/process_goal_list.html'
     context_object_name = 'process_goals'
-    paginate_by = 10
+    # Not paginated: a step can only be dragged next to steps on the same page
     
     def get_queryset(self):
         goal_id = self.kwargs.get('goal_id')
-        goal = get_object_or_404(Goal, pk=goal_id)
+        goal = self.goal = get_object_or_404(Goal.objects.select_related('coach', 'player'), pk=goal_id)
         
         # Check permissions
         user = self.request.user
@@ -487,12 +576,12 @@ class ProcessGoalListView(LoginRequiredMixin, ListView):
             except Player.DoesNotExist:
                 return ProcessGoal.objects.none()
         
-        return goal.process_goals.all()
+        # Cards show the start of the description only
+        return defer_large_text(goal.process_goals.all(), excerpt=True)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        goal_id = self.kwargs.get('goal_id')
-        context['goal'] = get_object_or_404(Goal, pk=goal_id)
+        context['goal'] = self.goal
         context['user_role'] = self.request.user.role
         return context
 
@@ -501,7 +590,7 @@ class ProcessGoalCreateView(LoginRequiredMixin, CoachRequiredMixin, CreateView):
     """Create new process goal - coaches only"""
     model = ProcessGoal
     template_name = 'core/process_goal_form.html'
-    fields = ['name', 'description', 'target_date', 'order', 'progress']
+    fields = ['name', 'description', 'target_date', 'progress']
     success_url = reverse_lazy('core:goal_list')
     
     def form_valid(self, form):
@@ -518,6 +607,8 @@ class ProcessGoalCreateView(LoginRequiredMixin, CoachRequiredMixin, CreateView):
             return self.form_invalid(form)
         
         form.instance.main_goal = goal
+        # New steps go last; drag and drop on the list reorders them
+        form.instance.order = next_order(goal)
         # Set default progress to not_started for new process goals
         if not form.instance.progress:
             form.instance.progress = 'not_started'
@@ -540,14 +631,14 @@ class ProcessGoalUpdateView(LoginRequiredMixin, UpdateView):
     """Update process goal - coaches can update all fields, players can update progress only"""
     model = ProcessGoal
     template_name = 'core/process_goal_form.html'
-    fields = ['name', 'description', 'target_date', 'order', 'progress', 'notes']
+    fields = ['name', 'description', 'target_date', 'progress']
     
     def get_fields(self):
         user = self.request.user
         if user.is_coach():
-            return ['name', 'description', 'target_date', 'order']
+            return ['name', 'description', 'target_date']
         else:
-            return ['progress', 'notes']
+            return ['progress']
     
     def get_queryset(self):
         user = self.request.user
@@ -578,15 +669,46 @@ class ProcessGoalUpdateView(LoginRequiredMixin, UpdateView):
 
 
 @login_required
-def process_goal_progress_update(request, pk):
-    """AJAX endpoint for updating process goal progress"""
-    print(f"Process goal progress update called for pk: {pk}")
-    print(f"Request method: {request.method}")
-    print(f"Request headers: {request.headers}")
+@require_POST
+def process_goal_move(request, pk):
+    """AJAX endpoint moving a process goal next to another one - coaches and admins"""
+    process_goal = get_object_or_404(ProcessGoal.objects.select_related('main_goal__coach'), pk=pk)
+    user = request.user
+    if not (user.is_admin() or (user.is_coach() and process_goal.main_goal.coach.user_id == user.pk)):
+        log_event(
+            'permission_denied', request, level=logging.WARNING, headers=True,
+            process_goal_id=process_goal.pk, reason='Only the goal\'s coach can reorder its steps',
+        )
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    anchors = {}
+    for name in ('after', 'before'):
+        value = request.POST.get(name)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({'error': f'{name} must be a process goal id'}, status=400)
+            anchors[name] = int(value)
+    if len(anchors) > 1:
+        return JsonResponse({'error': 'Send either after or before, not both'}, status=400)
     
+    try:
+        order, rebalanced = move_process_goal(process_goal, **anchors)
+    except OrderingError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'success': True, 'order': order, 'rebalanced': rebalanced})
+
+
+@async_login_required
+@count_progress_updates('process_goal')
+@throttle_progress_updates('process_goal')
+async def process_goal_progress_update(request, pk):
+    """AJAX endpoint for updating process goal progress"""
     if request.method == 'POST' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        process_goal = get_object_or_404(ProcessGoal, pk=pk)
-        print(f"Found process goal: {process_goal}")
+        try:
+            process_goal = await ProcessGoal.objects.select_related('main_goal').aget(pk=pk)
+        except ProcessGoal.DoesNotExist:
+            raise Http404('No ProcessGoal matches the given query.')
+        main_goal = process_goal.main_goal
         
         # Check if user has permission to update this process goal
         user = request.user
@@ -596,38 +718,55 @@ def process_goal_progress_update(request, pk):
         if user.is_admin():
             can_update = True
         elif user.is_coach():
-            try:
-                can_update = process_goal.main_goal.coach == user.coach_profile
-            except Coach.DoesNotExist:
+            profile_id = await _profile_id(Coach, user)
+            if profile_id is None:
                 error_message = 'Coach profile not found'
-                can_update = False
+            else:
+                can_update = main_goal.coach_id == profile_id
         else:
-            try:
-                can_update = process_goal.main_goal.player == user.player_profile
-            except Player.DoesNotExist:
+            profile_id = await _profile_id(Player, user)
+            if profile_id is None:
                 error_message = 'Player profile not found'
-                can_update = False
+            else:
+                can_update = main_goal.player_id == profile_id
         
         if not can_update:
+            log_event(
+                'permission_denied', request, level=logging.WARNING, headers=True,
+                process_goal_id=process_goal.pk, reason=error_message or 'Permission denied',
+            )
             return JsonResponse({
                 'error': error_message or 'Permission denied',
                 'user_role': user.role,
             }, status=403)
         
+        response = await take_object_token(request, 'process_goal', process_goal.pk)
+        if response is not None:
+            return response
+        
         progress = request.POST.get('progress')
-        notes = request.POST.get('notes', '')
+        notes = request.POST.get('notes', '').strip()
+        if len(notes) > COMMENT_MAX_LENGTH:
+            return JsonResponse({'error': f'Notes are limited to {COMMENT_MAX_LENGTH} characters'}, status=400)
         
         if progress in dict(ProcessGoal.PROGRESS_CHOICES):
+            previous = process_goal.progress
             process_goal.progress = progress
+            await process_goal.asave()
             if notes:
-                process_goal.notes = notes
-            process_goal.save()
+                await ProcessGoalComment.objects.acreate(process_goal=process_goal, author=user, body=notes)
+            log_event(
+                'progress_changed', request,
+                process_goal_id=process_goal.pk, goal_id=main_goal.pk, previous=previous, progress=progress,
+            )
             
             # Check if main goal should be auto-completed
-            main_goal = process_goal.main_goal
-            if main_goal.should_auto_complete():
+            if await sync_to_async(main_goal.should_auto_complete)():
+                if main_goal.progress != 'completed':
+                    GOAL_AUTO_COMPLETIONS.labels('progress_update').inc()
+                    log_event('goal_auto_completed', request, goal_id=main_goal.pk, source='progress_update')
                 main_goal.progress = 'completed'
-                main_goal.save()
+                await main_goal.asave()
             
             return JsonResponse({
                 'success': True,
@@ -640,3 +779,83 @@ def process_goal_progress_update(request, pk):
         return JsonResponse({'error': 'Invalid progress value'}, status=400)
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
+
+
+# Notes
+
+
+def _add_comment(request, comment):
+    """Save ``comment`` with the posted body; notes are never edited afterwards"""
+    body = request.POST.get('body', '').strip()
+    if not body:
+        return JsonResponse({'error': 'The note is empty'}, status=400)
+    if len(body) > COMMENT_MAX_LENGTH:
+        return JsonResponse({'error': f'Notes are limited to {COMMENT_MAX_LENGTH} characters'}, status=400)
+    comment.author = request.user
+    comment.body = body
+    comment.save()
+    # Same shape as the rows of the API's comments lists
+    return JsonResponse({
+        'success': True,
+        'comment': {
+            'id': comment.pk,
+            'body': comment.body,
+            'created_at': comment.created_at,
+            'author_id': request.user.pk,
+            'author': request.user.get_full_name() or None,
+        },
+    }, status=201)
+
+
+@login_required
+@require_POST
+def goal_comment_create(request, pk):
+    """AJAX endpoint adding a note to a goal - anyone who can see the goal"""
+    goal = get_object_or_404(visible_goals(request.user).only('pk'), pk=pk)
+    return _add_comment(request, GoalComment(goal=goal))
+
+
+@login_required
+@require_POST
+def process_goal_comment_create(request, pk):
+    """AJAX endpoint adding a note to a process goal - anyone who can see its goal"""
+    process_goal = get_object_or_404(
+        ProcessGoal.objects.filter(main_goal__in=visible_goals(request.user)).only('pk'), pk=pk,
+    )
+    return _add_comment(request, ProcessGoalComment(process_goal=process_goal))
+
+
+# Live progress stream
+
+
+def _sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@async_login_required
+async def progress_stream(request):
+    """Server-Sent Events stream of progress changes on the coach's goals"""
+    coach_id = await _profile_id(Coach, request.user) if request.user.is_coach() else None
+    if coach_id is None:
+        return HttpResponseForbidden('Live progress is only available to coaches')
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the whole stream; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    
+    async def stream():
+        subscription = get_broadcaster().subscribe(coach_channel(coach_id))
+        # Django 4.2 keeps iterating after a client leaves, so bound the stream's life
+        deadline = time.monotonic() + settings.SSE_MAX_STREAM_SECONDS
+        try:
+            yield 'retry: 3000\n\n'
+            while (remaining := deadline - time.monotonic()) > 0:
+                event = await subscription.get(timeout=min(settings.SSE_HEARTBEAT_SECONDS, remaining))
+                # The comment line keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n' if event is None else _sse(event)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
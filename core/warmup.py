@@ -0,0 +1,72 @@
+"""Work done once at server start instead of on the first requests.
+
+gunicorn.conf.py calls ``warm_up`` in the master after the application is
+preloaded, so the compiled templates and populated URL resolvers are
+inherited by every worker through fork(). Database connections cannot be
+shared across fork(); ``connect_databases`` opens them in each worker.
+"""
+import logging
+import os
+import time
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Every template name the Django engine ``engine`` can load"""
+    names = set()
+    for directory in engine.template_dirs:
+        for root, _dirs, files in os.walk(directory):
+            for filename in files:
+                names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def compile_templates():
+    """Load every template through the cached loader; returns how many compiled"""
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                # Not every file under a templates/ directory is a Django template
+                logger.debug('Not precompiling %s: %s', name, error)
+                continue
+            compiled += 1
+    return compiled
+
+
+def populate_urls(resolver=None):
+    """Import every view and build the reverse() lookup tables; returns the resolver count"""
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 1
+    for _prefix, namespace in resolver.namespace_dict.values():
+        count += populate_urls(namespace)
+    return count
+
+
+def warm_up():
+    started = time.perf_counter()
+    templates = compile_templates()
+    resolvers = populate_urls()
+    # Nothing above should have connected, and a connection must not cross fork()
+    connections.close_all()
+    logger.info(
+        'Warmed up %d templates and %d URL resolvers in %.2fs',
+        templates, resolvers, time.perf_counter() - started,
+    )
+
+
+def connect_databases():
+    """Open (and so check) every configured database connection in this process"""
+    for connection in connections.all():
+        connection.ensure_connection()
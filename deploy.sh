@@ -7,13 +7,15 @@ echo "🚀 Starting deployment process..."
 echo "📦 Installing dependencies..."
 pip install -r requirements.txt
 
-# Collect static files
+# Build asset bundles and collect static files
 echo "📁 Collecting static files..."
+python manage.py build_assets
 python manage.py collectstatic --noinput
 
 # Run migrations
 echo "🗄️ Running database migrations..."
 python manage.py migrate
+python manage.py rebuild_player_stats
 
 # Create superuser if needed
 echo "👤 Creating superuser..."
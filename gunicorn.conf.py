@@ -0,0 +1,100 @@
+"""Gunicorn settings, loaded automatically from the project root.
+
+``SERVER_MODE=asgi`` serves ``pms.asgi`` with uvicorn workers so the async
+views (dashboards, progress endpoints) wait on the database without holding
+a whole worker; the default stays the synchronous ``pms.wsgi`` application.
+
+The application is imported once in the master (``preload_app``) and warmed
+up there (core/warmup.py), so workers start with Django, the templates and
+the URL resolvers already loaded. Command-line options still override these.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from decouple import config
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'pms.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'pms.wsgi:application'
+else:
+    raise RuntimeError(f"SERVER_MODE must be 'wsgi' or 'asgi', not {SERVER_MODE!r}")
+
+# The in-process broadcaster only reaches live progress streams served by
+# the same worker (core/events.py), so ASGI must then run a single one
+IN_PROCESS_EVENTS = config(
+    'EVENTS_BROADCASTER', default='core.events.InProcessBroadcaster',
+) == 'core.events.InProcessBroadcaster'
+
+if SERVER_MODE == 'asgi':
+    # Async workers wait on I/O without blocking, so fewer of them are needed
+    default_workers = 1 if IN_PROCESS_EVENTS else multiprocessing.cpu_count()
+else:
+    default_workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.environ.get('WEB_CONCURRENCY', default_workers))
+# More than one thread switches the wsgi mode to the gthread worker
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers to cap slow leaks; the jitter keeps them from all
+# restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# Workers write their metrics to files here so /metrics/ can add them up
+# (core/metrics.py). This file is read before preload_app imports the
+# application, whose metrics need the directory to exist. Unless one is
+# given, each master makes a fresh directory and exports it to its workers,
+# so neither a previous run nor another instance on the host adds to its
+# totals. A directory given in the environment is used as it is: whoever
+# supplies it has to empty it between runs.
+METRICS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if METRICS_DIR is None:
+    METRICS_DIR = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='pms-metrics-')
+    # Survives the config being re-read on HUP, when the variable is already set
+    os.environ['PMS_METRICS_DIR_CREATED'] = METRICS_DIR
+else:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+def on_starting(server):
+    # Checked on the final settings so that -w on the command line is caught too
+    if SERVER_MODE == 'asgi' and IN_PROCESS_EVENTS and server.cfg.workers > 1:
+        raise RuntimeError(
+            'EVENTS_BROADCASTER=core.events.InProcessBroadcaster only reaches streams in '
+            f'the same worker; run one ASGI worker, not {server.cfg.workers}, or use a shared broadcaster'
+        )
+
+
+def when_ready(server):
+    # Runs in the master once the listening sockets are open and before any
+    # worker is forked; without preload_app each worker warms up instead
+    if server.cfg.preload_app:
+        from core.warmup import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    from core.warmup import connect_databases, warm_up
+    if not worker.cfg.preload_app:
+        warm_up()
+    connect_databases()
+
+
+def on_exit(server):
+    # Only the directory this master created is removed, and only the
+    # workers' sample files in it
+    if os.environ.get('PMS_METRICS_DIR_CREATED') != METRICS_DIR:
+        return
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.db')):
+        os.remove(path)
+    try:
+        os.rmdir(METRICS_DIR)
+    except OSError:
+        pass
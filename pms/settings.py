@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -59,6 +61,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Load tests (run_workload) read per-request query counts from this header
+QUERY_COUNT_HEADER = config('QUERY_COUNT_HEADER', default=False, cast=bool)
+if QUERY_COUNT_HEADER:
+    MIDDLEWARE.insert(0, 'core.querycount.QueryCountMiddleware')
+
+# Prometheus metrics (core/metrics.py), served at /metrics/ to staff users and
+# to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+if METRICS_ENABLED:
+    # After WhiteNoise, so static files are not timed
+    MIDDLEWARE.insert(MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware') + 1, 'core.metrics.MetricsMiddleware')
+
 ROOT_URLCONF = 'pms.urls'
 
 TEMPLATES = [
@@ -86,7 +101,11 @@ import dj_database_url
 
 DATABASES = {
     'default': dj_database_url.config(
-        default=config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'))
+        default=config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'db.sqlite3')),
+        # Seconds a connection is kept between requests; 0 closes it after each.
+        # Keep 0 with SERVER_MODE=asgi, where connections are not reused.
+        conn_max_age=config('DB_CONN_MAX_AGE', default=0, cast=int),
+        conn_health_checks=True,
     )
 }
 
@@ -109,6 +128,63 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# New password hashes use PASSWORD_HASH_ITERATIONS rounds of PBKDF2. Hashes
+# made with another count still verify and are re-hashed on the next login.
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=600000, cast=int)
+PASSWORD_HASHERS = [
+    'core.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Sessions. SESSION_PROFILE picks where they live:
+#   db             - a django_session query on every request (Django's default)
+#   cached_db      - reads come from the "sessions" cache, falling back to the
+#                    table; writes go to both
+#   signed_cookies - nothing stored server side, but a session cannot be
+#                    revoked before it expires
+SESSION_PROFILE = config('SESSION_PROFILE', default='db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_PROFILE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f"SESSION_PROFILE must be one of {', '.join(SESSION_ENGINES)}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# The file cache is shared by every worker on a host. A locmem session cache
+# is per process, so a logout would not reach the other workers' copies.
+# The core.metrics backends count hits and misses under METRICS_NAME.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.metrics.LocMemCache',
+        'METRICS_NAME': 'default',
+    },
+    'sessions': {
+        'BACKEND': config('SESSION_CACHE_BACKEND', default='core.metrics.FileBasedCache'),
+        'LOCATION': config('SESSION_CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'pms-sessions')),
+        'METRICS_NAME': 'sessions',
+    },
+    # Rate-limit buckets and idempotency keys; must be shared by every worker
+    'throttle': {
+        'BACKEND': config('THROTTLE_CACHE_BACKEND', default='core.metrics.FileBasedCache'),
+        'LOCATION': config('THROTTLE_CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'pms-throttle')),
+        'METRICS_NAME': 'throttle',
+    },
+}
+THROTTLE_CACHE = 'throttle'
+
+# AJAX progress updates: token buckets per user and per goal/process goal
+# ('<count>/<s|m|h>'), and how long duplicates are answered from the cache
+PROGRESS_RATE_PER_USER = config('PROGRESS_RATE_PER_USER', default='60/m')
+PROGRESS_RATE_PER_OBJECT = config('PROGRESS_RATE_PER_OBJECT', default='10/m')
+PROGRESS_DUPLICATE_WINDOW = config('PROGRESS_DUPLICATE_WINDOW', default=10, cast=int)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -146,13 +222,90 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# WhiteNoise configuration for static files
+# WhiteNoise configuration for static files. With Brotli installed,
+# collectstatic writes .br as well as .gz copies of every hashed file.
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Serve the unminified sources of each bundle (core/assets.py) instead of the
+# files build_assets writes to static/dist/
+ASSETS_DEBUG = config('ASSETS_DEBUG', default=DEBUG, cast=bool)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media serving when DEBUG is off. MEDIA_SENDFILE_BACKEND is 'nginx'
+# (X-Accel-Redirect), 'sendfile' (X-Sendfile for Apache/lighttpd) or empty to
+# stream from Django.
+SERVE_MEDIA = config('SERVE_MEDIA', default=True, cast=bool)
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+# Content-addressed uploads never change, so they are cached as immutable
+MEDIA_IMMUTABLE_PREFIXES = ('profile_pictures/',)
+
+# Default process count for the backfill_thumbnails command
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+
+# Month a season starts in; archive_goals counts seasons from here
+SEASON_START_MONTH = config('SEASON_START_MONTH', default=1, cast=int)
+
+# Live progress events (see core/events.py). The in-process broadcaster only
+# reaches streams served by the same process, so run a single ASGI worker or
+# point this at a shared backend.
+EVENTS_BROADCASTER = config('EVENTS_BROADCASTER', default='core.events.InProcessBroadcaster')
+SSE_HEARTBEAT_SECONDS = config('SSE_HEARTBEAT_SECONDS', default=15, cast=int)
+SSE_MAX_STREAM_SECONDS = config('SSE_MAX_STREAM_SECONDS', default=300, cast=int)
+
+# Delta sync API (see core/sync.py). A sync window ends this many seconds in
+# the past so rows from transactions still in flight are not skipped.
+# Deletions are kept for SYNC_TOMBSTONE_DAYS; older cursors must resync.
+SYNC_LAG_SECONDS = config('SYNC_LAG_SECONDS', default=5, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=90, cast=int)
+
+# Background task queue (see core/queue.py). Eager mode runs tasks inline so
+# development works without a worker process.
+TASKS_EAGER = config('TASKS_EAGER', default=DEBUG, cast=bool)
+TASK_WORKER_POOL = config('TASK_WORKER_POOL', default='thread')
+TASK_WORKER_CONCURRENCY = config('TASK_WORKER_CONCURRENCY', default=4, cast=int)
+TASK_MAX_ATTEMPTS = config('TASK_MAX_ATTEMPTS', default=3, cast=int)
+TASK_RETRY_BACKOFF = 10
+TASK_RETRY_BACKOFF_MAX = 3600
+TASK_LEASE_SECONDS = config('TASK_LEASE_SECONDS', default=600, cast=int)
+
+# Email (digests). Use the file backend with EMAIL_FILE_PATH for testing.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@pms.local')
+
+# Logging. Records go through core.logs.BackgroundHandler, which only puts
+# them on a queue; a listener thread writes them to stderr as JSON lines.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'background': {
+            'class': 'core.logs.BackgroundHandler',
+            'formatter': 'json',
+            'stream': 'ext://sys.stderr',
+            'maxsize': config('LOG_QUEUE_SIZE', default=10000, cast=int),
+        },
+    },
+    'loggers': {
+        'core': {'handlers': ['background'], 'level': LOG_LEVEL, 'propagate': False},
+        'django': {'handlers': ['background'], 'level': config('DJANGO_LOG_LEVEL', default='WARNING')},
+    },
+}
+
 # Login/Logout URLs
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
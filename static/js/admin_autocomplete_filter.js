@@ -0,0 +1,13 @@
+// Navigate the admin changelist when an autocomplete list filter changes
+'use strict';
+{
+    const $ = django.jQuery;
+    $(document).on('change', 'select.admin-autocomplete-filter', function() {
+        const container = this.closest('.autocomplete-filter');
+        const url = new URL(container.dataset.clearUrl, window.location.href);
+        if (this.value) {
+            url.searchParams.set(this.dataset.lookup, this.value);
+        }
+        window.location.href = url.toString();
+    });
+}
@@ -0,0 +1,140 @@
+// Player Management System - note threads
+//
+// Each [data-comment-thread] reads its notes from the JSON API in
+// data-list-url, newest first, once it first becomes visible, and follows the
+// API's next link for older pages. New notes are posted to data-post-url and
+// shown at the top without a reload.
+
+(function() {
+    var threads = document.querySelectorAll('[data-comment-thread]');
+    if (!threads.length) {
+        return;
+    }
+
+    function csrfToken() {
+        var input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function part(thread, role) {
+        return thread.querySelector('[data-role="' + role + '"]');
+    }
+
+    function render(comment) {
+        var item = document.createElement('div');
+        item.className = 'border-bottom py-2';
+        var meta = document.createElement('div');
+        meta.className = 'small text-muted';
+        meta.textContent = (comment.author || 'Unknown') + ' · ' + new Date(comment.created_at).toLocaleString();
+        var body = document.createElement('div');
+        body.style.whiteSpace = 'pre-line';
+        body.textContent = comment.body;
+        item.appendChild(meta);
+        item.appendChild(body);
+        return item;
+    }
+
+    function setStatus(thread, text) {
+        var status = part(thread, 'comment-status');
+        status.textContent = text;
+        status.classList.toggle('d-none', !text);
+    }
+
+    function load(thread, url) {
+        var more = part(thread, 'comment-more');
+        more.disabled = true;
+        fetch(url, {headers: {'Accept': 'application/json'}})
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP error! status: ' + response.status);
+            }
+            return response.json();
+        })
+        .then(function(data) {
+            var list = part(thread, 'comment-list');
+            data.results.forEach(function(comment) {
+                list.appendChild(render(comment));
+            });
+            setStatus(thread, list.children.length ? '' : 'No notes yet.');
+            thread.dataset.nextUrl = data.next || '';
+            more.classList.toggle('d-none', !data.next);
+            more.disabled = false;
+        })
+        .catch(function(error) {
+            console.error('Error:', error);
+            setStatus(thread, 'Notes could not be loaded.');
+        });
+    }
+
+    function post(thread, form) {
+        var textarea = form.querySelector('[name=body]');
+        var button = form.querySelector('[type=submit]');
+        button.disabled = true;
+        fetch(thread.dataset.postUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken()
+            },
+            body: 'body=' + encodeURIComponent(textarea.value)
+        })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                if (!response.ok || !data.success) {
+                    throw new Error(data.error || 'HTTP error! status: ' + response.status);
+                }
+                return data;
+            });
+        })
+        .then(function(data) {
+            var list = part(thread, 'comment-list');
+            list.insertBefore(render(data.comment), list.firstChild);
+            setStatus(thread, '');
+            textarea.value = '';
+        })
+        .catch(function(error) {
+            alert('Error adding note: ' + error.message);
+        })
+        .then(function() {
+            button.disabled = false;
+        });
+    }
+
+    function start(thread) {
+        if (thread.dataset.started) {
+            return;
+        }
+        thread.dataset.started = 'true';
+        load(thread, thread.dataset.listUrl);
+    }
+
+    threads.forEach(function(thread) {
+        part(thread, 'comment-more').addEventListener('click', function() {
+            if (thread.dataset.nextUrl) {
+                load(thread, thread.dataset.nextUrl);
+            }
+        });
+        part(thread, 'comment-form').addEventListener('submit', function(event) {
+            event.preventDefault();
+            post(thread, event.target);
+        });
+    });
+
+    if (!('IntersectionObserver' in window)) {
+        threads.forEach(start);
+        return;
+    }
+    // Threads in a collapsed section start when it is opened
+    var observer = new IntersectionObserver(function(entries) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                start(entry.target);
+            }
+        });
+    }, {rootMargin: '200px'});
+    threads.forEach(function(thread) {
+        observer.observe(thread);
+    });
+})();
@@ -0,0 +1,13 @@
+// Player Management System - "select all" on the goal template assign page
+
+(function() {
+    var toggle = document.getElementById('select-all-players');
+    if (!toggle) {
+        return;
+    }
+    toggle.addEventListener('change', function() {
+        document.querySelectorAll('.player-checklist input[type="checkbox"]').forEach(function(checkbox) {
+            checkbox.checked = toggle.checked;
+        });
+    });
+})();
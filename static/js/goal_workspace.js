@@ -0,0 +1,109 @@
+// Player Management System - inline progress edits on the goal workspace
+//
+// Each progress <select> posts to the AJAX progress endpoints named in the
+// workspace's data-goal-url / data-process-goal-url (0 stands in for the id)
+// and the goal's rollup is recomputed from the selects on the page.
+
+(function() {
+    var workspace = document.querySelector('[data-workspace]');
+    if (!workspace) {
+        return;
+    }
+
+    function csrfToken() {
+        var input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function setText(container, role, text) {
+        container.querySelectorAll('[data-role="' + role + '"]').forEach(function(el) {
+            el.textContent = text;
+        });
+    }
+
+    function setBar(container, percentage) {
+        container.querySelectorAll('[data-role="progress-bar"]').forEach(function(el) {
+            el.style.width = percentage + '%';
+        });
+    }
+
+    function setOverdue(container, overdue) {
+        container.querySelectorAll('[data-role="overdue"]').forEach(function(el) {
+            el.classList.toggle('d-none', !overdue);
+        });
+    }
+
+    function refreshRollup(goalCard) {
+        var steps = workspace.querySelectorAll('[data-inline-progress="process_goal"]');
+        if (!steps.length) {
+            return;
+        }
+        var completed = [].filter.call(steps, function(step) {
+            return step.value === 'completed';
+        }).length;
+        var percentage = Math.floor(completed * 100 / steps.length);
+        setBar(goalCard, percentage);
+        setText(goalCard, 'progress-percentage', percentage + '% (' + completed + '/' + steps.length + ')');
+        setText(goalCard, 'progress-summary', completed + ' of ' + steps.length + ' process goals completed');
+    }
+
+    workspace.addEventListener('change', function(event) {
+        var select = event.target.closest('[data-inline-progress]');
+        if (!select) {
+            return;
+        }
+        var kind = select.dataset.inlineProgress;
+        var template = kind === 'goal' ? workspace.dataset.goalUrl : workspace.dataset.processGoalUrl;
+        var goalCard = workspace.querySelector('[data-goal-id]');
+        var hasSteps = workspace.querySelector('[data-inline-progress="process_goal"]') !== null;
+
+        select.disabled = true;
+        fetch(template.replace('/0/', '/' + select.dataset.id + '/'), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken()
+            },
+            body: 'progress=' + encodeURIComponent(select.value)
+        })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                if (!response.ok || !data.success) {
+                    throw new Error(data.error || 'HTTP error! status: ' + response.status);
+                }
+                return data;
+            });
+        })
+        .then(function(data) {
+            select.dataset.value = select.value;
+            var label = select.options[select.selectedIndex].text;
+            if (kind === 'goal') {
+                setOverdue(goalCard, data.is_overdue);
+                if (!hasSteps) {
+                    // Without process goals the goal's own progress is the rollup
+                    setBar(goalCard, data.progress_percentage);
+                    setText(goalCard, 'progress-percentage', data.progress_percentage + '%');
+                    setText(goalCard, 'progress-summary', label);
+                }
+                return;
+            }
+            var row = select.closest('[data-process-goal-id]');
+            setBar(row, data.progress_percentage);
+            setOverdue(row, data.is_overdue);
+            refreshRollup(goalCard);
+            if (data.main_goal_completed) {
+                var goalSelect = goalCard.querySelector('[data-inline-progress="goal"]');
+                goalSelect.value = goalSelect.dataset.value = 'completed';
+                setOverdue(goalCard, false);
+            }
+        })
+        .catch(function(error) {
+            select.value = select.dataset.value;
+            alert('Error updating progress: ' + error.message);
+        })
+        .finally(function() {
+            select.disabled = false;
+        });
+    });
+})();
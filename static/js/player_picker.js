@@ -0,0 +1,185 @@
+// Player Management System - typeahead for the goal form's player field
+//
+// The server renders the player <select> with only the chosen player. This
+// hides it behind a search box that asks the URL in data-player-picker for
+// matching players (debounced) and puts the picked one into the <select>,
+// which is what the form submits.
+
+(function() {
+    var DEBOUNCE_MS = 250;
+    var PAGE_SIZE = 10;
+
+    function setupPicker(select) {
+        var wrapper = document.createElement('div');
+        wrapper.className = 'position-relative';
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control';
+        input.placeholder = 'Search players by name or #number';
+        input.autocomplete = 'off';
+        input.setAttribute('role', 'combobox');
+        input.setAttribute('aria-expanded', 'false');
+        input.required = select.required;
+        var chosen = select.options[select.selectedIndex];
+        input.value = chosen && chosen.value ? chosen.text : '';
+        var results = document.createElement('div');
+        results.className = 'list-group position-absolute w-100 shadow-sm player-picker-results';
+        results.setAttribute('role', 'listbox');
+        results.hidden = true;
+
+        // The select stays in the form so its value is what gets posted
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(input);
+        wrapper.appendChild(results);
+        wrapper.appendChild(select);
+        select.hidden = true;
+        select.required = false;
+        if (select.id) {
+            document.querySelectorAll('label[for="' + select.id + '"]').forEach(function(label) {
+                label.htmlFor = select.id + '-search';
+            });
+            input.id = select.id + '-search';
+        }
+
+        var timer = null;
+        var latest = 0;
+        var active = -1;
+
+        function close() {
+            results.hidden = true;
+            input.setAttribute('aria-expanded', 'false');
+            active = -1;
+        }
+
+        function choose(player) {
+            [].slice.call(select.options).forEach(function(option) {
+                if (option.value) {
+                    option.remove();
+                }
+            });
+            select.add(new Option(player.label, player.id, true, true));
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+            input.value = player.label;
+            close();
+        }
+
+        function highlight(index) {
+            var items = results.querySelectorAll('[data-player-id]');
+            if (!items.length) {
+                return;
+            }
+            active = (index + items.length) % items.length;
+            items.forEach(function(item, i) {
+                item.classList.toggle('active', i === active);
+            });
+            items[active].scrollIntoView({block: 'nearest'});
+        }
+
+        function render(data, append) {
+            if (!append) {
+                results.innerHTML = '';
+                active = -1;
+            }
+            var more = results.querySelector('[data-next]');
+            if (more) {
+                more.remove();
+            }
+            data.results.forEach(function(player) {
+                var item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action';
+                item.setAttribute('role', 'option');
+                item.dataset.playerId = player.id;
+                item.textContent = player.label;
+                if (player.position) {
+                    var position = document.createElement('small');
+                    position.className = 'text-muted ms-2';
+                    position.textContent = player.position;
+                    item.appendChild(position);
+                }
+                item.addEventListener('click', function() {
+                    choose(player);
+                });
+                results.appendChild(item);
+            });
+            if (data.next) {
+                var next = document.createElement('button');
+                next.type = 'button';
+                next.className = 'list-group-item list-group-item-action text-primary small';
+                next.dataset.next = data.next;
+                next.textContent = 'More results…';
+                next.addEventListener('click', function() {
+                    search(data.next, true);
+                });
+                results.appendChild(next);
+            }
+            if (!results.children.length) {
+                var empty = document.createElement('div');
+                empty.className = 'list-group-item text-muted small';
+                empty.textContent = 'No matching players';
+                results.appendChild(empty);
+            }
+            results.hidden = false;
+            input.setAttribute('aria-expanded', 'true');
+        }
+
+        function search(url, append) {
+            var request = ++latest;
+            fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('HTTP error! status: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                // Answers to older keystrokes arrive late; only the newest counts
+                if (request === latest) {
+                    render(data, append);
+                }
+            })
+            .catch(function(error) {
+                console.error('Player search failed:', error);
+            });
+        }
+
+        input.addEventListener('input', function() {
+            // Typing invalidates the previous pick until a new one is made
+            select.value = '';
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                search(select.dataset.playerPicker + '?q=' + encodeURIComponent(input.value.trim()) +
+                       '&limit=' + PAGE_SIZE, false);
+            }, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('focus', function() {
+            if (!select.value && !input.value) {
+                search(select.dataset.playerPicker + '?limit=' + PAGE_SIZE, false);
+            }
+        });
+
+        input.addEventListener('keydown', function(event) {
+            if (results.hidden) {
+                return;
+            }
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                results.querySelectorAll('[data-player-id]')[active].click();
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+
+        // Keep focus in the input while clicking a result so blur does not close first
+        results.addEventListener('mousedown', function(event) {
+            event.preventDefault();
+        });
+        input.addEventListener('blur', close);
+    }
+
+    document.querySelectorAll('select[data-player-picker]').forEach(setupPicker);
+})();
@@ -0,0 +1,119 @@
+// Player Management System - drag and drop ordering of process goals
+//
+// Dropping a card posts only the moved step and its new neighbour to the URL
+// in data-reorder-url (0 stands in for the id); the server fits it in between
+// (core/ordering.py). The step numbers on the page are then recounted.
+
+(function() {
+    var list = document.querySelector('[data-reorder-url]');
+    if (!list) {
+        return;
+    }
+    var dragged = null;
+    var origin = null;
+
+    function csrfToken() {
+        var input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function items() {
+        return list.querySelectorAll('[data-reorder-item]');
+    }
+
+    function renumber() {
+        items().forEach(function(item, index) {
+            item.querySelectorAll('[data-role="step-number"]').forEach(function(el) {
+                el.textContent = index + 1;
+            });
+        });
+    }
+
+    function restore(item, next) {
+        list.insertBefore(item, next);
+        renumber();
+    }
+
+    function save(item, next) {
+        var previous = item.previousElementSibling;
+        var following = item.nextElementSibling;
+        var body;
+        if (previous && previous.dataset.reorderItem) {
+            body = 'after=' + encodeURIComponent(previous.dataset.reorderItem);
+        } else if (following && following.dataset.reorderItem) {
+            body = 'before=' + encodeURIComponent(following.dataset.reorderItem);
+        } else {
+            return;
+        }
+        renumber();
+        fetch(list.dataset.reorderUrl.replace('/0/', '/' + item.dataset.reorderItem + '/'), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken()
+            },
+            body: body
+        })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                if (!response.ok || !data.success) {
+                    throw new Error(data.error || 'HTTP error! status: ' + response.status);
+                }
+            });
+        })
+        .catch(function(error) {
+            restore(item, next);
+            alert('Error reordering process goals: ' + error.message);
+        });
+    }
+
+    list.addEventListener('dragstart', function(event) {
+        var item = event.target.closest('[data-reorder-item]');
+        if (!item) {
+            return;
+        }
+        dragged = item;
+        origin = item.nextElementSibling;
+        event.dataTransfer.effectAllowed = 'move';
+        event.dataTransfer.setData('text/plain', item.dataset.reorderItem);
+        item.classList.add('opacity-50');
+    });
+
+    list.addEventListener('dragover', function(event) {
+        if (!dragged) {
+            return;
+        }
+        event.preventDefault();
+        var target = event.target.closest('[data-reorder-item]');
+        if (!target || target === dragged) {
+            return;
+        }
+        // Cards sit in a grid, so the side of the card decides before or after
+        var rect = target.getBoundingClientRect();
+        if (event.clientX > rect.left + rect.width / 2) {
+            list.insertBefore(dragged, target.nextElementSibling);
+        } else {
+            list.insertBefore(dragged, target);
+        }
+    });
+
+    list.addEventListener('drop', function(event) {
+        if (dragged) {
+            event.preventDefault();
+        }
+    });
+
+    list.addEventListener('dragend', function() {
+        if (!dragged) {
+            return;
+        }
+        var item = dragged;
+        var next = origin;
+        dragged = origin = null;
+        item.classList.remove('opacity-50');
+        if (item.nextElementSibling !== next) {
+            save(item, next);
+        }
+    });
+})();
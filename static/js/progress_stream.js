@@ -0,0 +1,108 @@
+// Player Management System - live progress updates for coaches
+//
+// Listens to the Server-Sent Events stream named by the page's
+// data-progress-stream element and patches the goal and process goal cards on the page
+// (elements with data-goal-id / data-process-goal-id) in place.
+
+(function() {
+    var marker = document.querySelector('[data-progress-stream]');
+    if (!marker || !window.EventSource) {
+        return;
+    }
+    var streamUrl = marker.dataset.progressStream;
+    var feedSize = 10;
+
+    function setText(container, role, text) {
+        container.querySelectorAll('[data-role="' + role + '"]').forEach(function(el) {
+            el.textContent = text;
+        });
+    }
+
+    function setBar(container, percentage) {
+        container.querySelectorAll('[data-role="progress-bar"]').forEach(function(el) {
+            el.style.width = percentage + '%';
+        });
+    }
+
+    function flash(container) {
+        container.classList.add('live-updated');
+        setTimeout(function() {
+            container.classList.remove('live-updated');
+        }, 1500);
+    }
+
+    function patchGoal(goal) {
+        var hasSteps = goal.process_goals_total > 0;
+        document.querySelectorAll('[data-goal-id="' + goal.id + '"]').forEach(function(card) {
+            setBar(card, goal.completion_percentage);
+            setText(card, 'progress-percentage', hasSteps
+                ? goal.completion_percentage + '% (' + goal.process_goals_completed + '/' + goal.process_goals_total + ')'
+                : goal.progress_percentage + '%');
+            setText(card, 'progress-summary', hasSteps
+                ? goal.process_goals_completed + ' of ' + goal.process_goals_total + ' process goals completed'
+                : goal.progress_display);
+            card.querySelectorAll('[data-role="overdue"]').forEach(function(el) {
+                el.classList.toggle('d-none', !goal.is_overdue);
+            });
+            flash(card);
+        });
+        addToFeed(goal);
+    }
+
+    function patchProcessGoal(processGoal) {
+        document.querySelectorAll('[data-process-goal-id="' + processGoal.id + '"]').forEach(function(card) {
+            setBar(card, processGoal.progress_percentage);
+            setText(card, 'progress-percentage', processGoal.progress_percentage + '%');
+            setText(card, 'progress-summary', processGoal.progress_display);
+            flash(card);
+        });
+    }
+
+    function addToFeed(goal) {
+        var feed = document.getElementById('progress-feed');
+        if (!feed) {
+            return;
+        }
+        var empty = feed.querySelector('[data-role="feed-empty"]');
+        if (empty) {
+            empty.remove();
+        }
+        var item = document.createElement('li');
+        item.className = 'list-group-item d-flex justify-content-between align-items-center';
+        var label = document.createElement('span');
+        label.textContent = goal.player + ' – ' + goal.name;
+        var badge = document.createElement('span');
+        badge.className = 'badge bg-success';
+        badge.textContent = goal.progress_display;
+        item.appendChild(label);
+        item.appendChild(badge);
+        feed.insertBefore(item, feed.firstChild);
+        while (feed.children.length > feedSize) {
+            feed.removeChild(feed.lastChild);
+        }
+    }
+
+    function parse(handler) {
+        return function(message) {
+            handler(JSON.parse(message.data));
+        };
+    }
+
+    var source = new EventSource(streamUrl);
+    source.onopen = function() {
+        window.progressStreamConnected = true;
+    };
+    source.onerror = function() {
+        // Pages fall back to reloading after an update while disconnected
+        window.progressStreamConnected = false;
+    };
+    source.addEventListener('goal', parse(patchGoal));
+    source.addEventListener('process_goal', parse(patchProcessGoal));
+    source.addEventListener('resync', function() {
+        // Events were dropped while the tab was busy; start from fresh markup
+        location.reload();
+    });
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+})();
@@ -0,0 +1,105 @@
+// Player Management System - progress update modals
+//
+// Backs the "Update Progress" buttons on the goal list, goal detail and
+// process goal list pages. Each modal names its endpoint in data-update-url,
+// with 0 standing in for the goal id.
+
+(function() {
+    var currentGoalId = null;
+    var currentProcessGoalId = null;
+
+    function csrfToken() {
+        var input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function updateUrl(modalElement, id) {
+        return modalElement.dataset.updateUrl.replace('/0/', '/' + id + '/');
+    }
+
+    function postProgress(url, progress, notes) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': csrfToken()
+            },
+            body: 'progress=' + encodeURIComponent(progress) + '&notes=' + encodeURIComponent(notes)
+        })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP error! status: ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    function finish(modalElement, message) {
+        bootstrap.Modal.getOrCreateInstance(modalElement).hide();
+        alert(message);
+        // Reload page to show updated progress unless the live stream patched it
+        if (!window.progressStreamConnected) {
+            location.reload();
+        }
+    }
+
+    function failed(error) {
+        console.error('Error:', error);
+        alert('Error updating progress. Please try again.');
+    }
+
+    window.updateProgress = function(goalId) {
+        currentGoalId = goalId;
+        bootstrap.Modal.getOrCreateInstance(document.getElementById('progressModal')).show();
+    };
+
+    window.saveProgress = function() {
+        var modalElement = document.getElementById('progressModal');
+        var progress = document.getElementById('progress').value;
+        var notes = document.getElementById('notes').value;
+
+        postProgress(updateUrl(modalElement, currentGoalId), progress, notes)
+        .then(function(data) {
+            if (data.success) {
+                finish(modalElement, 'Progress updated successfully!');
+            } else {
+                alert('Error updating progress: ' + (data.error || 'Unknown error'));
+            }
+        })
+        .catch(failed);
+    };
+
+    window.updateProcessProgress = function(processGoalId) {
+        currentProcessGoalId = processGoalId;
+        var modalElement = document.getElementById('processProgressModal');
+        if (!modalElement) {
+            alert('Error: Modal not found. Please refresh the page.');
+            return;
+        }
+        bootstrap.Modal.getOrCreateInstance(modalElement).show();
+        document.getElementById('processProgressForm').reset();
+    };
+
+    window.saveProcessProgress = function() {
+        if (!currentProcessGoalId) {
+            alert('Error: No process goal selected. Please try again.');
+            return;
+        }
+        var modalElement = document.getElementById('processProgressModal');
+        var progress = document.getElementById('processProgress').value;
+        var notes = document.getElementById('processNotes').value;
+
+        postProgress(updateUrl(modalElement, currentProcessGoalId), progress, notes)
+        .then(function(data) {
+            if (data.success) {
+                finish(modalElement, data.main_goal_completed
+                    ? 'Process goal updated successfully! The main goal has been automatically completed!'
+                    : 'Process goal updated successfully!');
+            } else {
+                alert('Error updating progress: ' + (data.error || 'Unknown error'));
+            }
+        })
+        .catch(failed);
+    };
+})();